@@ -1,34 +1,181 @@
+import argparse
+import hashlib
+import json
 import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 import pandas as pd
+import matplotlib
+matplotlib.use('Agg') # Files only, no display: safe in worker processes
 import matplotlib.pyplot as plt
+from matplotlib.lines import Line2D
 import seaborn as sns
-from sqlalchemy import create_engine
 from dotenv import load_dotenv
+from correlation import FACTORS, factor_correlations, rolling_correlations, lagged_correlations
+
+# Shared database layer lives with the ingestion scripts
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'get_data'))
+from metrics import increment, run_metrics, span
 
 # --- CONFIGURATION AND CONNECTION ---
 def get_db_connection():
-    """Connects to the database using environment variables."""
+    """Connects to the database using the shared pooled engine (pre-ping, recycle, statement timeout)."""
     load_dotenv() # Loads variables from .env file
     
-    user = os.getenv("DATABASE_USER")
-    password = os.getenv("DATABASE_PASS")
-    host = os.getenv("HOSTNAME")
-    port = os.getenv("PORT")
-    dbname = os.getenv("DATABASE")
-    
-    connection_str = f'postgresql+psycopg2://{user}:{password}@{host}:{port}/{dbname}'
-    return create_engine(connection_str)
+    from db import get_engine
+    return get_engine()
+
+# Gold tables: (table, ticker column, date column)
+GOLD_TABLES = {
+    'transactions': ('gold.stock_transations', 'ticket', 'trading_date'),
+    'news': ('gold.stock_news', 'ticket', 'news_date'),
+    'insider': ('gold.stock_insider_transations', 'symbol', 'transaction_date'),
+}
+
+# Columns process_data and generate_visuals actually use (keys and dates are always added)
+DEFAULT_COLUMNS = {
+    'transactions': ['close_price', 'volume_1d', 'price_change_pct_1d', 'volume_change_1d'],
+    'news': ['daily_news_count', 'daily_sentiment_score'],
+    'insider': ['net_value_flow', 'total_shares_bought', 'total_shares_sold'],
+}
+
+# Rows fetched per round trip from the server-side cursor
+LOAD_CHUNK_SIZE = int(os.getenv('ANALYTICS_CHUNK_SIZE', '50000'))
+
+def build_query(table_key, tickers=None, start=None, end=None, columns=None, updated_after=None):
+    """Builds the SELECT for one Gold table with the column list and filters pushed into SQL (updated_after: only rows with a later updated_at)."""
+    from sqlalchemy import bindparam, text
+
+    table, ticker_col, date_col = GOLD_TABLES[table_key]
+    if columns is None:
+        columns = DEFAULT_COLUMNS[table_key]
+    if columns == '*':
+        select_list = '*'
+    else:
+        wanted = [ticker_col, date_col] + [c for c in columns if c not in (ticker_col, date_col)]
+        for column in wanted:
+            if not column.isidentifier():
+                raise ValueError(f"Invalid column name: {column}")
+        select_list = ", ".join(wanted)
 
-def load_data(engine):
-    """Loads data from Gold tables."""
+    conditions, params = [], {}
+    if tickers:
+        conditions.append(f"{ticker_col} IN :tickers")
+        params['tickers'] = [t.upper() for t in tickers]
+    if start is not None:
+        conditions.append(f"{date_col} >= :start")
+        params['start'] = pd.Timestamp(start).date()
+    if end is not None:
+        conditions.append(f"{date_col} <= :end")
+        params['end'] = pd.Timestamp(end).date()
+    if updated_after is not None:
+        conditions.append("updated_at > :updated_after")
+        params['updated_after'] = pd.Timestamp(updated_after).to_pydatetime()
+
+    sql = f"SELECT {select_list} FROM {table}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    query = text(sql)
+    if tickers:
+        query = query.bindparams(bindparam('tickers', expanding=True))
+    return query, params
+
+def downcast(df, ticker_col, date_col):
+    """Shrinks a loaded chunk: datetime64 dates, float32 metrics, smallest integer types."""
+    df[date_col] = pd.to_datetime(df[date_col])
+    for column in df.columns:
+        if column in (ticker_col, date_col):
+            continue
+        series = df[column]
+        if series.dtype == object:
+            # NUMERIC columns arrive as Decimal objects
+            series = pd.to_numeric(series, errors='coerce')
+        if pd.api.types.is_float_dtype(series):
+            df[column] = series.astype('float32')
+        elif pd.api.types.is_integer_dtype(series):
+            df[column] = pd.to_numeric(series, downcast='integer')
+        else:
+            df[column] = series
+    return df
+
+def read_gold_table(engine, table_key, tickers=None, start=None, end=None, columns=None, chunksize=LOAD_CHUNK_SIZE,
+                    updated_after=None):
+    """Streams one Gold table through a server-side cursor, downcasting chunk by chunk."""
+    _, ticker_col, date_col = GOLD_TABLES[table_key]
+    query, params = build_query(table_key, tickers, start, end, columns, updated_after)
+
+    chunks = []
+    with engine.connect().execution_options(stream_results=True) as connection:
+        for chunk in pd.read_sql(query, connection, params=params, chunksize=chunksize):
+            chunks.append(downcast(chunk, ticker_col, date_col))
+
+    if not chunks:
+        return pd.DataFrame(columns=[ticker_col, date_col])
+    df = pd.concat(chunks, ignore_index=True)
+    # Categorized after concat: per-chunk categories would not line up
+    df[ticker_col] = df[ticker_col].astype('category')
+    return df
+
+def load_data(engine, tickers=None, start=None, end=None, columns=None, chunksize=LOAD_CHUNK_SIZE):
+    """
+    Loads data from Gold tables.
+    Only the requested tickers, date range (inclusive) and columns are read; `columns` maps
+    'transactions'/'news'/'insider' to a column list ('*' for all), defaulting to DEFAULT_COLUMNS.
+    """
     print("--- Loading data from Data Warehouse ---")
-    df_trans = pd.read_sql("SELECT * FROM gold.stock_transations", engine)
-    df_news = pd.read_sql("SELECT * FROM gold.stock_news", engine)
-    df_insider = pd.read_sql("SELECT * FROM gold.stock_insider_transations", engine)
+    columns = columns or {}
+    frames = [
+        read_gold_table(engine, key, tickers, start, end, columns.get(key), chunksize)
+        for key in ('transactions', 'news', 'insider')
+    ]
+    for key, df in zip(('transactions', 'news', 'insider'), frames):
+        print(f"{GOLD_TABLES[key][0]}: {len(df)} rows, {df.memory_usage(deep=True).sum() / 1e6:.1f} MB")
+    df_trans, df_news, df_insider = frames
     return df_trans, df_news, df_insider
 
 # --- PROCESSING ---
-def process_data(df_trans, df_news, df_insider):
+# How far ahead (calendar days) a news day or insider trade may be moved to reach the next
+# trading session: covers weekends and market holidays
+ALIGN_TOLERANCE_DAYS = int(os.getenv('ALIGN_TOLERANCE_DAYS', '4'))
+
+def _aggregation(df, keys):
+    """Flow columns (daily_/total_/net_ counters) add up when several event days land on the same session; the rest keep the latest value."""
+    agg = {}
+    for column in df.columns:
+        if column in keys:
+            continue
+        additive = column.startswith(('daily_', 'total_', 'net_')) and not column.endswith('_pct')
+        agg[column] = 'sum' if additive and pd.api.types.is_numeric_dtype(df[column]) else 'last'
+    return agg
+
+def align_to_sessions(events, calendar, date_col, tolerance_days=ALIGN_TOLERANCE_DAYS):
+    """
+    Maps each event row (news day, insider trade day) to the first trading session on or after
+    its date for the same ticker, within tolerance_days, and aggregates the events that land on
+    the same session. Returns one row per (ticket, trading_date).
+    """
+    events = events.dropna(subset=[date_col]).sort_values(date_col)
+    aligned = pd.merge_asof(
+        events,
+        calendar.rename(columns={'trading_date': '_session'}),
+        left_on=date_col,
+        right_on='_session',
+        by='ticket',
+        direction='forward',
+        tolerance=pd.Timedelta(days=tolerance_days)
+    )
+    unmatched = aligned['_session'].isna().sum()
+    if unmatched:
+        print(f"{unmatched} {date_col} rows have no trading session within {tolerance_days} days and are left out")
+    aligned = aligned.dropna(subset=['_session']).rename(columns={'_session': 'trading_date'})
+
+    # Sorted by event date, so 'last' is the latest event before the session
+    keys = ['ticket', 'trading_date']
+    return aligned.groupby(keys, observed=True, sort=False).agg(_aggregation(aligned, keys)).reset_index()
+
+def process_data(df_trans, df_news, df_insider, tolerance_days=ALIGN_TOLERANCE_DAYS):
     """Cleans and prepares data for analysis."""
     print("--- Processing data ---")
     
@@ -40,10 +187,27 @@ def process_data(df_trans, df_news, df_insider):
     # Standardize columns
     if 'symbol' in df_insider.columns:
         df_insider.rename(columns={'symbol': 'ticket'}, inplace=True)
-        
-    # Master Merge (Left Join on transactions to align dates)
-    merged = pd.merge(df_trans, df_news, left_on=['ticket', 'trading_date'], right_on=['ticket', 'news_date'], how='left')
-    merged = pd.merge(merged, df_insider, left_on=['ticket', 'trading_date'], right_on=['ticket', 'transaction_date'], how='left')
+    
+    # One shared categorical for the ticker key: joins compare integer codes instead of strings
+    tickers = pd.api.types.CategoricalDtype(sorted(
+        set(df_trans['ticket'].dropna().astype(str))
+        | set(df_news['ticket'].dropna().astype(str))
+        | set(df_insider['ticket'].dropna().astype(str))
+    ))
+    for df in (df_trans, df_news, df_insider):
+        df['ticket'] = df['ticket'].astype(str).astype(tickers)
+    
+    # Sort once; the trading calendar per ticker is the as-of target
+    df_trans.sort_values(['ticket', 'trading_date'], inplace=True, ignore_index=True)
+    calendar = df_trans[['ticket', 'trading_date']].drop_duplicates().sort_values('trading_date')
+    
+    # Weekend/holiday news and insider trades roll forward to the next session instead of being dropped
+    news_by_session = align_to_sessions(df_news, calendar, 'news_date', tolerance_days)
+    insider_by_session = align_to_sessions(df_insider, calendar, 'transaction_date', tolerance_days)
+    
+    # Master Merge (Left Join on transactions; both sides are unique per ticket and session)
+    merged = pd.merge(df_trans, news_by_session, on=['ticket', 'trading_date'], how='left')
+    merged = pd.merge(merged, insider_by_session, on=['ticket', 'trading_date'], how='left')
     
     # Fill nulls for numerical calculations
     merged['daily_sentiment_score'] = merged['daily_sentiment_score'].fillna(0)
@@ -55,23 +219,14 @@ def process_data(df_trans, df_news, df_insider):
     return df_trans, df_news, df_insider, merged
 
 # --- VISUALIZATIONS ---
-def generate_visuals(df_trans, df_news, df_insider, merged_df):
-    print("--- Generating Visualizations ---")
-    
-    # Define style
-    sns.set_theme(style="whitegrid")
-    
-    # Choose a main ticker for specific analyses (e.g., META or the most frequent)
-    target_ticker = 'META' 
-    if target_ticker not in merged_df['ticket'].values:
-        target_ticker = merged_df['ticket'].mode()[0]
-        
-    print(f"Focusing individual analyses on ticker: {target_ticker}")
-    df_target = merged_df[merged_df['ticket'] == target_ticker].sort_values('trading_date')
+CHARTS_DIR = os.getenv('CHARTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'charts'))
+CHART_WORKERS = int(os.getenv('CHART_WORKERS', str(os.cpu_count() or 1)))
+CHART_MANIFEST = 'manifest.json'
 
-    # 1. Price vs Sentiment (Dual Axis)
+def plot_price_vs_sentiment(df_target, ticker, path):
+    """1. Price vs Sentiment (Dual Axis)"""
     fig, ax1 = plt.subplots(figsize=(12, 6))
-    ax1.set_title(f'{target_ticker}: Sentiment Impact on Price')
+    ax1.set_title(f'{ticker}: Sentiment Impact on Price')
     ax1.plot(df_target['trading_date'], df_target['close_price'], color='#1f77b4', linewidth=2, label='Closing Price')
     ax1.set_ylabel('Price ($)', color='#1f77b4', fontsize=12)
     ax1.tick_params(axis='y', labelcolor='#1f77b4')
@@ -81,13 +236,14 @@ def generate_visuals(df_trans, df_news, df_insider, merged_df):
     ax2.set_ylabel('Sentiment (Negative/Positive)', color='orange', fontsize=12)
     ax2.tick_params(axis='y', labelcolor='orange')
     
-    plt.tight_layout()
-    plt.savefig('1_price_vs_sentiment.png')
-    print("-> 1_price_vs_sentiment.png saved")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
 
-    # 2. Price vs Insider Flow (Dual Axis)
+def plot_price_vs_insider(df_target, ticker, path):
+    """2. Price vs Insider Flow (Dual Axis)"""
     fig, ax1 = plt.subplots(figsize=(12, 6))
-    ax1.set_title(f'{target_ticker}: Insider Trading Signals')
+    ax1.set_title(f'{ticker}: Insider Trading Signals')
     ax1.plot(df_target['trading_date'], df_target['close_price'], color='black', alpha=0.6, label='Price')
     ax1.set_ylabel('Price ($)')
     
@@ -97,81 +253,226 @@ def generate_visuals(df_trans, df_news, df_insider, merged_df):
     ax2.set_ylabel('Net Insider Flow ($)', fontsize=12)
     
     # Custom legend
-    from matplotlib.lines import Line2D
     custom_lines = [Line2D([0], [0], color='#2ca02c', lw=4), Line2D([0], [0], color='#d62728', lw=4)]
     ax2.legend(custom_lines, ['Buy', 'Sell'], loc='upper left')
     
-    plt.tight_layout()
-    plt.savefig('2_price_vs_insider.png')
-    print("-> 2_price_vs_insider.png saved")
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
 
-    # 3. Correlation Matrix
-    cols = ['close_price', 'volume_1d', 'daily_sentiment_score', 'net_value_flow', 'price_change_pct_1d']
-    corr = df_target[cols].corr()
-    
-    plt.figure(figsize=(8, 6))
-    sns.heatmap(corr, annot=True, cmap='RdBu_r', center=0, fmt=".2f", linewidths=.5)
-    plt.title(f'Factor Correlation Matrix - {target_ticker}')
-    plt.tight_layout()
-    plt.savefig('3_correlation_matrix.png')
-    print("-> 3_correlation_matrix.png saved")
+def plot_correlation_matrix(corr, ticker, path):
+    """3. Correlation Matrix (precomputed for all tickers at once, see correlation.py)"""
+    fig, ax = plt.subplots(figsize=(8, 6))
+    sns.heatmap(corr, annot=True, cmap='RdBu_r', center=0, fmt=".2f", linewidths=.5, ax=ax)
+    ax.set_title(f'Factor Correlation Matrix - {ticker}')
+    fig.tight_layout()
+    fig.savefig(path)
+    plt.close(fig)
 
-    # 4. Global: Insider Battle (Grouped Bar Chart)
-    insider_agg = df_insider.groupby('ticket')[['total_shares_bought', 'total_shares_sold']].sum().reset_index()
+def plot_insider_global_battle(df_insider, ticker, path):
+    """4. Global: Insider Battle (Grouped Bar Chart)"""
+    insider_agg = df_insider.groupby('ticket', observed=True)[['total_shares_bought', 'total_shares_sold']].sum().reset_index()
     insider_agg['total_shares_sold_abs'] = insider_agg['total_shares_sold'].abs() # Absolute for visualization
     
-    plt.figure(figsize=(10, 6))
+    fig, ax = plt.subplots(figsize=(10, 6))
     x = range(len(insider_agg))
     width = 0.35
-    plt.bar(x, insider_agg['total_shares_bought'], width, label='Buy (Shares)', color='#2ca02c')
-    plt.bar([i + width for i in x], insider_agg['total_shares_sold_abs'], width, label='Sell (Shares)', color='#d62728')
-    
-    plt.xticks([i + width/2 for i in x], insider_agg['ticket'])
-    plt.title("Global View: Insider Buy vs Sell Volume")
-    plt.ylabel("Number of Shares")
-    plt.legend()
-    plt.grid(axis='y', alpha=0.3)
-    plt.savefig('4_insider_global_battle.png')
-    print("-> 4_insider_global_battle.png saved")
-
-    # 5. Volatility vs News Intensity (Boxplot)
-    plt.figure(figsize=(10, 6))
+    ax.bar(x, insider_agg['total_shares_bought'], width, label='Buy (Shares)', color='#2ca02c')
+    ax.bar([i + width for i in x], insider_agg['total_shares_sold_abs'], width, label='Sell (Shares)', color='#d62728')
+    
+    ax.set_xticks([i + width/2 for i in x])
+    ax.set_xticklabels(insider_agg['ticket'].astype(str))
+    ax.set_title("Global View: Insider Buy vs Sell Volume")
+    ax.set_ylabel("Number of Shares")
+    ax.legend()
+    ax.grid(axis='y', alpha=0.3)
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_volatility_sentiment(merged_df, ticker, path):
+    """5. Volatility vs News Intensity (Boxplot)"""
+    fig, ax = plt.subplots(figsize=(10, 6))
     # We remove extreme outliers for better visualization if necessary, but here we keep them
-    sns.boxplot(x='sentiment_intensity', y='price_change_pct_1d', data=merged_df, palette="Blues")
-    plt.title("Impact of News Intensity on Price Volatility")
-    plt.xlabel("Sentiment Intensity (0=Neutral, >0=Strong)")
-    plt.ylabel("Daily Price Change (%)")
-    plt.axhline(0, color='gray', linestyle='--', alpha=0.5)
-    plt.savefig('5_volatility_sentiment.png')
-    print("-> 5_volatility_sentiment.png saved")
-
-    # 6. Scatter: News Volume vs Trading Volume
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(x='daily_news_count', y='volume_change_1d', data=merged_df, hue='ticket', s=100, alpha=0.8)
-    plt.title("The 'Hype' Effect: News Qty vs Trading Volume Increase")
-    plt.xlabel("Number of News Articles per Day")
-    plt.ylabel("Share Volume Change")
-    plt.grid(True, alpha=0.3)
-    plt.axhline(0, color='black', linewidth=1)
-    plt.savefig('6_news_volume_scatter.png')
-    print("-> 6_news_volume_scatter.png saved")
+    sns.boxplot(x='sentiment_intensity', y='price_change_pct_1d', data=merged_df, palette="Blues", ax=ax)
+    ax.set_title("Impact of News Intensity on Price Volatility")
+    ax.set_xlabel("Sentiment Intensity (0=Neutral, >0=Strong)")
+    ax.set_ylabel("Daily Price Change (%)")
+    ax.axhline(0, color='gray', linestyle='--', alpha=0.5)
+    fig.savefig(path)
+    plt.close(fig)
+
+def plot_news_volume_scatter(merged_df, ticker, path):
+    """6. Scatter: News Volume vs Trading Volume"""
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.scatterplot(x='daily_news_count', y='volume_change_1d', data=merged_df, hue='ticket', s=100, alpha=0.8, ax=ax)
+    ax.set_title("The 'Hype' Effect: News Qty vs Trading Volume Increase")
+    ax.set_xlabel("Number of News Articles per Day")
+    ax.set_ylabel("Share Volume Change")
+    ax.grid(True, alpha=0.3)
+    ax.axhline(0, color='black', linewidth=1)
+    fig.savefig(path)
+    plt.close(fig)
+
+# Chart file -> (plot function, scope, source columns). Per-ticker charts are rendered once per
+# ticker from the merged rows of that ticker ('correlation': from its factor matrix); global charts once per run.
+CHARTS = {
+    '1_price_vs_sentiment.png': (plot_price_vs_sentiment, 'ticker', ['trading_date', 'close_price', 'daily_sentiment_score']),
+    '2_price_vs_insider.png': (plot_price_vs_insider, 'ticker', ['trading_date', 'close_price', 'net_value_flow']),
+    '3_correlation_matrix.png': (plot_correlation_matrix, 'correlation', FACTORS),
+    '4_insider_global_battle.png': (plot_insider_global_battle, 'insider', ['ticket', 'total_shares_bought', 'total_shares_sold']),
+    '5_volatility_sentiment.png': (plot_volatility_sentiment, 'global', ['sentiment_intensity', 'price_change_pct_1d']),
+    '6_news_volume_scatter.png': (plot_news_volume_scatter, 'global', ['ticket', 'daily_news_count', 'volume_change_1d']),
+}
+
+def data_hash(chart_name, df):
+    """Content hash of a chart's source data (values, column and index labels)."""
+    digest = hashlib.sha256(chart_name.encode())
+    digest.update(",".join(map(str, df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return digest.hexdigest()
+
+def build_chart_tasks(df_insider, merged_df, tickers=None):
+    """Returns (key, chart_name, ticker, source data) for every chart to render."""
+    merged_df = merged_df.sort_values(['ticket', 'trading_date'])
+    by_ticker = dict(tuple(merged_df.groupby(merged_df['ticket'].astype(str))))
+    tickers = sorted(by_ticker) if tickers is None else [t.upper() for t in tickers]
+
+    # Every ticker's factor matrix in one batched pass
+    matrices = factor_correlations(merged_df)
+    matrices = {
+        ticker: group.pivot(index='factor_x', columns='factor_y', values='correlation').loc[FACTORS, FACTORS]
+        for ticker, group in matrices.groupby('ticket')
+    }
+
+    tasks = []
+    for chart_name, (_, scope, columns) in CHARTS.items():
+        if scope == 'correlation':
+            for ticker in tickers:
+                if ticker in matrices:
+                    tasks.append((f"{ticker}/{chart_name}", chart_name, ticker, matrices[ticker]))
+        elif scope == 'ticker':
+            for ticker in tickers:
+                if ticker in by_ticker:
+                    tasks.append((f"{ticker}/{chart_name}", chart_name, ticker, by_ticker[ticker][columns].reset_index(drop=True)))
+        elif scope == 'insider':
+            tasks.append((f"global/{chart_name}", chart_name, None, df_insider[columns].reset_index(drop=True)))
+        else:
+            tasks.append((f"global/{chart_name}", chart_name, None, merged_df[columns].reset_index(drop=True)))
+    return tasks
+
+def _init_chart_worker():
+    sns.set_theme(style="whitegrid")
+
+def _render_chart(chart_name, ticker, df, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    plot, _, _ = CHARTS[chart_name]
+    plot(df, ticker, path)
+    return path
+
+def _load_chart_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, CHART_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _reuse_chart(previous_path, path):
+    """Hard-links (or copies) an unchanged chart from a previous run into this run's folder."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    try:
+        os.link(previous_path, path)
+    except OSError:
+        shutil.copy2(previous_path, path)
+
+def generate_visuals(df_trans, df_news, df_insider, merged_df, tickers=None, output_dir=CHARTS_DIR, run_id=None, workers=CHART_WORKERS):
+    """
+    Renders every chart for every ticker (plus the global charts) into output_dir/<run_id>/<ticker|global>/.
+    Charts are rendered in a process pool; charts whose source data hash matches the last
+    run are linked from that run instead of being redrawn.
+    """
+    print("--- Generating Visualizations ---")
+    run_id = run_id or datetime.now().strftime('%Y%m%d_%H%M%S')
+    run_dir = os.path.join(output_dir, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    manifest = _load_chart_manifest(output_dir)
+
+    if 'ticket' in df_insider.columns:
+        insider = df_insider
+    else:
+        insider = df_insider.rename(columns={'symbol': 'ticket'})
+    tasks = build_chart_tasks(insider, merged_df, tickers)
+
+    to_render, reused = [], 0
+    for key, chart_name, ticker, df in tasks:
+        path = os.path.join(run_dir, key)
+        content_hash = data_hash(chart_name, df)
+        previous = manifest.get(key)
+        if previous and previous['hash'] == content_hash and os.path.exists(previous['path']):
+            _reuse_chart(previous['path'], path)
+            reused += 1
+        else:
+            to_render.append((chart_name, ticker, df, path))
+        manifest[key] = {'hash': content_hash, 'path': path}
+
+    if workers > 1 and len(to_render) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_chart_worker) as executor:
+            futures = [executor.submit(_render_chart, *task) for task in to_render]
+            for future in futures:
+                print(f"-> {future.result()} saved")
+    else:
+        _init_chart_worker()
+        for task in to_render:
+            print(f"-> {_render_chart(*task)} saved")
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, CHART_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"{len(to_render)} charts rendered, {reused} unchanged charts reused -> {run_dir}")
+    return run_dir
 
 # --- MAIN EXECUTION ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates the Gold analysis charts")
+    parser.add_argument('--tickers', nargs='*', help="Tickers to load (default: all)")
+    parser.add_argument('--start', help="First date to load (YYYY-MM-DD)")
+    parser.add_argument('--end', help="Last date to load (YYYY-MM-DD)")
+    parser.add_argument('--no-cache', action='store_true', help="Read straight from the warehouse, bypassing the local Parquet cache")
+    parser.add_argument('--offline', action='store_true', help="Use the local Parquet cache without checking the warehouse")
+    parser.add_argument('--tolerance-days', type=int, default=ALIGN_TOLERANCE_DAYS, help="Max days news/insider activity is moved forward to the next trading session")
+    parser.add_argument('--workers', type=int, default=CHART_WORKERS, help="Processes used to render the charts")
+    args = parser.parse_args()
+
     try:
-        # 1. Connect
-        engine = get_db_connection()
-        
-        # 2. Load
-        df_t, df_n, df_i = load_data(engine)
-        
-        # 3. Process
-        df_t, df_n, df_i, df_merged = process_data(df_t, df_n, df_i)
-        
-        # 4. Generate Visualizations
-        generate_visuals(df_t, df_n, df_i, df_merged)
-        
-        print("\n--- Process completed successfully! Images saved in the folder. ---")
+        with run_metrics('analytics'):
+            # 1. Connect (the engine is lazy: offline runs never open a connection)
+            engine = get_db_connection()
+            
+            # 2. Load (only the tickers, dates and columns the charts use)
+            with span('load'):
+                if args.no_cache:
+                    df_t, df_n, df_i = load_data(engine, tickers=args.tickers, start=args.start, end=args.end)
+                else:
+                    from gold_cache import load_data_cached
+                    df_t, df_n, df_i = load_data_cached(engine, tickers=args.tickers, start=args.start, end=args.end, offline=args.offline)
+            
+            # 3. Process
+            with span('process'):
+                df_t, df_n, df_i, df_merged = process_data(df_t, df_n, df_i, tolerance_days=args.tolerance_days)
+            
+            # 4. Generate Visualizations
+            with span('visuals'):
+                run_dir = generate_visuals(df_t, df_n, df_i, df_merged, tickers=args.tickers, workers=args.workers)
+            
+            # 5. Correlation results (tidy frames, one row per ticker/factor pair/date or lag)
+            with span('correlations'):
+                factor_correlations(df_merged).to_csv(os.path.join(run_dir, 'factor_correlations.csv'), index=False)
+                rolling_correlations(df_merged).to_csv(os.path.join(run_dir, 'rolling_correlations.csv'), index=False)
+                lagged_correlations(df_merged).to_csv(os.path.join(run_dir, 'lagged_correlations.csv'), index=False)
+            print(f"-> correlation tables saved in {run_dir}")
+            increment('rows_analyzed', len(df_merged))
+            
+            print(f"\n--- Process completed successfully! Images saved in {run_dir}. ---")
         
     except Exception as e:
         print(f"Fatal execution error: {e}")
\ No newline at end of file
@@ -0,0 +1,164 @@
+import numpy as np
+import pandas as pd
+
+# Factors of the per-ticker correlation matrix (merged Gold columns)
+FACTORS = ['close_price', 'volume_1d', 'daily_sentiment_score', 'net_value_flow', 'price_change_pct_1d']
+
+# Default pairs for rolling correlations and the default lagged pair (sentiment at t vs return at t+k)
+ROLLING_PAIRS = [('daily_sentiment_score', 'price_change_pct_1d'), ('net_value_flow', 'price_change_pct_1d')]
+LAG_X, LAG_Y = 'daily_sentiment_score', 'price_change_pct_1d'
+
+
+def build_panel(merged_df, factors=FACTORS, ticker_col='ticket', date_col='trading_date'):
+    """
+    Reshapes the merged frame into a dense (ticker, date, factor) float64 array.
+    Dates are the union of trading dates of all tickers; missing cells are NaN.
+    Returns (tickers, dates, panel).
+    """
+    tickers, ticker_codes = np.unique(merged_df[ticker_col].astype(str).to_numpy(), return_inverse=True)
+    dates, date_codes = np.unique(merged_df[date_col].to_numpy(), return_inverse=True)
+
+    panel = np.full((len(tickers), len(dates), len(factors)), np.nan)
+    panel[ticker_codes, date_codes, :] = merged_df[factors].to_numpy(dtype=np.float64)
+    return tickers, pd.DatetimeIndex(dates), panel
+
+
+def _pearson(x, y, min_periods):
+    """
+    Pearson correlation along the last axis over the positions where both x and y are present
+    """
+    valid = ~(np.isnan(x) | np.isnan(y))
+    n = valid.sum(axis=-1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = x.sum(axis=-1) / n
+        mean_y = y.sum(axis=-1) / n
+        dx = np.where(valid, x - mean_x[..., None], 0.0)
+        dy = np.where(valid, y - mean_y[..., None], 0.0)
+        corr = (dx * dy).sum(axis=-1) / np.sqrt((dx ** 2).sum(axis=-1) * (dy ** 2).sum(axis=-1))
+    return np.where(n >= min_periods, corr, np.nan), n
+
+
+def correlation_matrices(panel, min_periods=3):
+    """
+    Pairwise-complete Pearson matrices for every ticker at once: (T, D, F) -> (T, F, F), plus the
+    (T, F, F) count of observations behind each coefficient
+    """
+    # Broadcast every factor pair: (T, F, 1, D) against (T, 1, F, D)
+    series = np.moveaxis(panel, 1, 2)
+    return _pearson(series[:, :, None, :], series[:, None, :, :], min_periods)
+
+
+def rolling_correlation(x, y, window, min_periods=None):
+    """
+    Rolling Pearson correlation along the last axis from running sums (O(D) per series,
+    whatever the window). Each value covers the `window` positions ending at that date.
+    """
+    min_periods = window if min_periods is None else min_periods
+    valid = ~(np.isnan(x) | np.isnan(y))
+
+    # Centering each series first keeps the running sums of squares well conditioned
+    count = np.maximum(valid.sum(axis=-1, keepdims=True), 1)
+    x = np.where(valid, x, 0.0)
+    y = np.where(valid, y, 0.0)
+    x = np.where(valid, x - x.sum(axis=-1, keepdims=True) / count, 0.0)
+    y = np.where(valid, y - y.sum(axis=-1, keepdims=True) / count, 0.0)
+
+    def window_sum(values):
+        running = np.concatenate([np.zeros(values.shape[:-1] + (1,)), np.cumsum(values, axis=-1)], axis=-1)
+        end = np.arange(1, values.shape[-1] + 1)
+        start = np.maximum(0, end - window)
+        return running[..., end] - running[..., start]
+
+    n = window_sum(valid.astype(np.float64))
+    sum_x, sum_y = window_sum(x), window_sum(y)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = window_sum(x * y) - sum_x * sum_y / n
+        var_x = window_sum(x * x) - sum_x ** 2 / n
+        var_y = window_sum(y * y) - sum_y ** 2 / n
+        corr = cov / np.sqrt(var_x * var_y)
+    corr = np.clip(corr, -1.0, 1.0)
+    return np.where(n >= min_periods, corr, np.nan)
+
+
+def lagged_correlation(x, y, lags, min_periods=3):
+    """
+    Correlation of x at t with y at t+k along the last axis, for each k in lags: returns (K, ...)
+    arrays of coefficients and observation counts
+    """
+    results, counts = [], []
+    length = x.shape[-1]
+    for lag in lags:
+        shifted = np.full(y.shape, np.nan)
+        if abs(lag) >= length:
+            pass
+        elif lag >= 0:
+            shifted[..., :length - lag] = y[..., lag:]
+        else:
+            shifted[..., -lag:] = y[..., :length + lag]
+        corr, n = _pearson(x, shifted, min_periods)
+        results.append(corr)
+        counts.append(n)
+    return np.stack(results), np.stack(counts)
+
+
+def factor_correlations(merged_df, factors=FACTORS, min_periods=3):
+    """
+    Tidy per-ticker factor correlation matrix: ticket, factor_x, factor_y, correlation, n_obs
+    """
+    tickers, _, panel = build_panel(merged_df, factors)
+    corr, n = correlation_matrices(panel, min_periods)
+    t, i, j = np.meshgrid(np.arange(len(tickers)), np.arange(len(factors)), np.arange(len(factors)), indexing='ij')
+    factor_names = np.array(factors)
+    return pd.DataFrame({
+        'ticket': tickers[t.ravel()],
+        'factor_x': factor_names[i.ravel()],
+        'factor_y': factor_names[j.ravel()],
+        'correlation': corr.ravel(),
+        'n_obs': n.ravel(),
+    })
+
+
+def rolling_correlations(merged_df, pairs=ROLLING_PAIRS, window=20, min_periods=None):
+    """
+    Tidy rolling correlations for every ticker and factor pair:
+    ticket, trading_date, factor_x, factor_y, window, correlation (rows without a value are dropped)
+    """
+    factors = sorted({f for pair in pairs for f in pair})
+    tickers, dates, panel = build_panel(merged_df, factors)
+    x = np.stack([panel[:, :, factors.index(a)] for a, _ in pairs])
+    y = np.stack([panel[:, :, factors.index(b)] for _, b in pairs])
+    corr = rolling_correlation(x, y, window, min_periods) # (P, T, D)
+
+    p, t, d = np.meshgrid(np.arange(len(pairs)), np.arange(len(tickers)), np.arange(len(dates)), indexing='ij')
+    result = pd.DataFrame({
+        'ticket': tickers[t.ravel()],
+        'trading_date': dates[d.ravel()],
+        'factor_x': np.array([a for a, _ in pairs])[p.ravel()],
+        'factor_y': np.array([b for _, b in pairs])[p.ravel()],
+        'window': window,
+        'correlation': corr.ravel(),
+    })
+    return result.dropna(subset=['correlation']).reset_index(drop=True)
+
+
+def lagged_correlations(merged_df, x=LAG_X, y=LAG_Y, lags=range(0, 6), min_periods=3):
+    """
+    Tidy lead/lag correlations (x at t vs y at t+k trading days):
+    ticket, factor_x, factor_y, lag, correlation, n_obs
+    """
+    lags = list(lags)
+    tickers, _, panel = build_panel(merged_df, [x, y])
+    corr, n = lagged_correlation(panel[:, :, 0], panel[:, :, 1], lags, min_periods) # (K, T)
+
+    k, t = np.meshgrid(np.arange(len(lags)), np.arange(len(tickers)), indexing='ij')
+    return pd.DataFrame({
+        'ticket': tickers[t.ravel()],
+        'factor_x': x,
+        'factor_y': y,
+        'lag': np.array(lags)[k.ravel()],
+        'correlation': corr.ravel(),
+        'n_obs': n.ravel(),
+    })
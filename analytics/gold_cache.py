@@ -0,0 +1,202 @@
+import json
+import os
+import shutil
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from analytics import GOLD_TABLES, DEFAULT_COLUMNS, read_gold_table
+
+# Local columnar copy of the Gold tables: one Parquet file per table and ticker, plus a
+# manifest with the row count and max(updated_at) each file was written from
+CACHE_DIR = os.getenv('GOLD_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache', 'gold'))
+MANIFEST_PATH = os.path.join(CACHE_DIR, 'manifest.json')
+
+
+def _load_manifest():
+    try:
+        with open(MANIFEST_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_manifest(manifest):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def _ticker_path(table_key, ticker):
+    return os.path.join(CACHE_DIR, table_key, f"{ticker}.parquet")
+
+
+def remote_state(engine, table_key, tickers=None):
+    """
+    Cheap freshness check: row count and max(updated_at) per ticker, straight from the warehouse
+    """
+    from sqlalchemy import bindparam, text
+
+    table, ticker_col, _ = GOLD_TABLES[table_key]
+    sql = f"SELECT {ticker_col} AS ticker, COUNT(*) AS row_count, MAX(updated_at) AS max_updated_at FROM {table}"
+    params = {}
+    if tickers:
+        sql += f" WHERE {ticker_col} IN :tickers"
+        params['tickers'] = [t.upper() for t in tickers]
+    sql += f" GROUP BY {ticker_col}"
+    query = text(sql)
+    if tickers:
+        query = query.bindparams(bindparam('tickers', expanding=True))
+
+    with engine.connect() as connection:
+        rows = connection.execute(query, params).fetchall()
+    return {
+        row.ticker: {
+            'rows': int(row.row_count),
+            'max_updated_at': row.max_updated_at.isoformat() if row.max_updated_at is not None else None,
+        }
+        for row in rows if row.ticker is not None
+    }
+
+
+def _write_ticker(table_key, ticker, df, ticker_col):
+    df = df.copy()
+    df[ticker_col] = df[ticker_col].astype(str)
+    df.to_parquet(_ticker_path(table_key, ticker), index=False)
+
+
+def _merge_updates(table_key, ticker, updates, expected_rows):
+    """
+    Upserts the updated rows of one ticker into its cached file on the table's unique key
+    (ticker, date). Returns False when the merged file doesn't match the warehouse row count.
+    """
+    _, ticker_col, date_col = GOLD_TABLES[table_key]
+    cached = pd.read_parquet(_ticker_path(table_key, ticker))
+    updates = updates.copy()
+    updates[ticker_col] = updates[ticker_col].astype(str)
+    merged = (
+        pd.concat([cached, updates], ignore_index=True)
+        .drop_duplicates(subset=[ticker_col, date_col], keep='last')
+        .sort_values(date_col, ignore_index=True)
+    )
+    if len(merged) != expected_rows:
+        return False
+    _write_ticker(table_key, ticker, merged, ticker_col)
+    return True
+
+
+def refresh_table(engine, table_key, tickers=None, manifest=None):
+    """
+    Brings the cached Parquet files of one Gold table up to date.
+    Only tickers whose row count or max(updated_at) moved since the last refresh are touched:
+    rows updated after the cached watermark are fetched and merged into the file on the
+    table's unique key. A ticker whose row count went down (or whose merge doesn't add up)
+    is refetched in full. Tickers gone from the warehouse are dropped.
+    Returns the list of tickers that were refreshed.
+    """
+    manifest = _load_manifest() if manifest is None else manifest
+    cached = manifest.setdefault(table_key, {})
+    remote = remote_state(engine, table_key, tickers)
+    _, ticker_col, _ = GOLD_TABLES[table_key]
+    os.makedirs(os.path.join(CACHE_DIR, table_key), exist_ok=True)
+
+    stale = [
+        ticker for ticker, state in remote.items()
+        if cached.get(ticker) != state or not os.path.exists(_ticker_path(table_key, ticker))
+    ]
+    incremental = [
+        ticker for ticker in stale
+        if os.path.exists(_ticker_path(table_key, ticker))
+        and cached.get(ticker, {}).get('max_updated_at') is not None
+        and remote[ticker]['rows'] >= cached[ticker]['rows']
+    ]
+    full = [ticker for ticker in stale if ticker not in incremental]
+
+    if incremental:
+        # One query from the oldest watermark; each ticker then keeps only the rows past its own
+        since = min(pd.Timestamp(cached[ticker]['max_updated_at']) for ticker in incremental)
+        updates = read_gold_table(engine, table_key, tickers=incremental, columns='*', updated_after=since)
+        for ticker in incremental:
+            rows = updates[updates[ticker_col] == ticker]
+            rows = rows[pd.to_datetime(rows['updated_at']) > pd.Timestamp(cached[ticker]['max_updated_at'])]
+            if _merge_updates(table_key, ticker, rows, remote[ticker]['rows']):
+                cached[ticker] = remote[ticker]
+            else:
+                full.append(ticker)
+
+    if full:
+        df = read_gold_table(engine, table_key, tickers=full, columns='*')
+        for ticker, group in df.groupby(ticker_col, observed=True):
+            _write_ticker(table_key, ticker, group, ticker_col)
+        for ticker in full:
+            cached[ticker] = remote[ticker]
+
+    if not tickers:
+        for ticker in set(cached) - set(remote):
+            del cached[ticker]
+            if os.path.exists(_ticker_path(table_key, ticker)):
+                os.remove(_ticker_path(table_key, ticker))
+
+    print(f"{GOLD_TABLES[table_key][0]}: {len(stale)} tickers refreshed ({len(full)} in full), "
+          f"{len(remote) - len(stale)} served from cache")
+    return stale
+
+
+def read_cached_table(table_key, tickers=None, start=None, end=None, columns=None):
+    """
+    Reads one Gold table from the local cache, memory-mapping the Parquet files and
+    applying the column list and date range on read
+    """
+    _, ticker_col, date_col = GOLD_TABLES[table_key]
+    cached = _load_manifest().get(table_key, {})
+    wanted_tickers = [t.upper() for t in tickers] if tickers else sorted(cached)
+    paths = [_ticker_path(table_key, t) for t in wanted_tickers if t in cached]
+
+    if columns is None:
+        columns = DEFAULT_COLUMNS[table_key]
+    read_columns = None if columns == '*' else [ticker_col, date_col] + [c for c in columns if c not in (ticker_col, date_col)]
+
+    filters = []
+    if start is not None:
+        filters.append((date_col, '>=', pd.Timestamp(start).to_pydatetime()))
+    if end is not None:
+        filters.append((date_col, '<=', pd.Timestamp(end).to_pydatetime()))
+
+    tables = [
+        pq.read_table(path, columns=read_columns, filters=filters or None, memory_map=True)
+        for path in paths if os.path.exists(path)
+    ]
+    if not tables:
+        return pd.DataFrame(columns=read_columns or [ticker_col, date_col])
+
+    df = pa.concat_tables(tables, promote_options='default').to_pandas()
+    df[date_col] = pd.to_datetime(df[date_col])
+    df[ticker_col] = df[ticker_col].astype('category')
+    return df
+
+
+def load_data_cached(engine, tickers=None, start=None, end=None, columns=None, offline=False):
+    """
+    Drop-in replacement for analytics.load_data backed by the local Parquet cache.
+    With offline=True the warehouse isn't contacted at all and the cache is used as is.
+    """
+    print("--- Loading data from local Gold cache ---")
+    columns = columns or {}
+    manifest = _load_manifest()
+    frames = []
+    for key in ('transactions', 'news', 'insider'):
+        if not offline:
+            refresh_table(engine, key, tickers, manifest)
+            _save_manifest(manifest)
+        frames.append(read_cached_table(key, tickers, start, end, columns.get(key)))
+    df_trans, df_news, df_insider = frames
+    return df_trans, df_news, df_insider
+
+
+def clear_cache():
+    """
+    Deletes every cached Parquet file and the manifest
+    """
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from synthetic import (make_tickers, company_name, generate_prices, generate_news,
+                       generate_insider, generate_gold)
+
+# Benchmarks of the ingestion and analytics hot paths on synthetic data.
+# Database and dbt benchmarks only run against a scratch PostgreSQL: BENCH_DSN (libpq DSN)
+# and a dbt target (BENCH_DBT_TARGET) pointing at the same database. Their bronze/silver/gold
+# tables are dropped and rebuilt on every run.
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT_DIR, 'get_data'))
+sys.path.append(os.path.join(ROOT_DIR, 'analytics'))
+
+from row_prep import prepare_stock_rows, prepare_news_rows, prepare_insider_rows
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+DBT_PROJECT_DIR = os.path.join(ROOT_DIR, 'dbt_process', 'newsdata')
+BENCH_DSN = os.getenv('BENCH_DSN')
+BENCH_DBT_TARGET = os.getenv('BENCH_DBT_TARGET', 'bench')
+
+
+def timed(func, repeat: int):
+    """
+    Runs func `repeat` times; returns (seconds per run, result of the last run)
+    """
+    timings, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def record(results: dict, name: str, timings: list, rows: int):
+    best = min(timings)
+    results[name] = {
+        'rows': rows,
+        'repeat': len(timings),
+        'seconds_min': round(best, 6),
+        'seconds_median': round(statistics.median(timings), 6),
+        'rows_per_second': round(rows / best, 1) if best > 0 else None,
+    }
+    print(f"{name:<40} {best:>10.4f}s  {results[name]['rows_per_second'] or 0:>14,.0f} rows/s")
+
+
+def bench_row_prep(data: dict, repeat: int, results: dict):
+    """
+    Columnar row preparation and hashing of each bronze table
+    """
+    for name, prepare in (('stocks', prepare_stock_rows), ('news', prepare_news_rows), ('insider', prepare_insider_rows)):
+        timings, _ = timed(lambda: prepare(data[name]), repeat)
+        record(results, f"row_prep_{name}", timings, len(data[name]))
+
+
+def bench_bulk_insert(data: dict, tickers: list, results: dict):
+    """
+    Bronze insert path (table/partition setup + COPY into staging + merge) on an empty table,
+    then the same rows again (all duplicates)
+    """
+    import psycopg2
+    from bulk_load import bulk_insert
+    from table_layout import ensure_table, ensure_monthly_partitions
+
+    targets = (
+        ('stocks', 'bronze.stocks', prepare_stock_rows, 'Date'),
+        ('news', 'bronze.news', prepare_news_rows, 'published_at'),
+        ('insider', 'bronze.insider_transactions', prepare_insider_rows, 'transaction_date'),
+    )
+    connection = psycopg2.connect(BENCH_DSN)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE SCHEMA IF NOT EXISTS bronze")
+            for _, table, _, _ in targets:
+                cursor.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+            # Company -> ticker map used by the Silver news model
+            cursor.execute("DROP TABLE IF EXISTS bronze.auxiliary_table_tck_name")
+            cursor.execute("CREATE TABLE bronze.auxiliary_table_tck_name (company VARCHAR(100), ticket VARCHAR(10))")
+            cursor.executemany(
+                "INSERT INTO bronze.auxiliary_table_tck_name (company, ticket) VALUES (%s, %s)",
+                [(company_name(t), t) for t in tickers]
+            )
+        connection.commit()
+
+        for name, table, prepare, date_column in targets:
+            rows = prepare(data[name])
+
+            def load():
+                ensure_table(connection, table)
+                ensure_monthly_partitions(connection, table, rows[date_column])
+                counts = bulk_insert(connection, table, list(rows.columns), rows)
+                connection.commit()
+                return counts
+
+            timings, (inserted, _) = timed(load, 1)
+            record(results, f"bulk_insert_{name}_new", timings, inserted)
+            timings, (_, skipped) = timed(load, 1)
+            record(results, f"bulk_insert_{name}_duplicates", timings, skipped)
+    finally:
+        connection.close()
+
+
+def bench_process_data(gold: tuple, repeat: int, results: dict):
+    """
+    analytics.process_data (as-of alignment and merge) on synthetic Gold frames
+    """
+    from analytics import process_data
+
+    # process_data modifies its inputs: every run gets fresh copies
+    timings, (_, _, _, merged) = timed(lambda: process_data(*(df.copy() for df in gold)), repeat)
+    record(results, 'process_data', timings, len(merged))
+
+
+def _dbt_run(*args):
+    command = ['dbt', 'run', '--target', BENCH_DBT_TARGET, *args]
+    subprocess.run(command, cwd=DBT_PROJECT_DIR, check=True, stdout=subprocess.DEVNULL)
+
+
+def bench_dbt(rows: int, results: dict):
+    """
+    dbt Silver and Gold builds on the bronze tables loaded by bench_bulk_insert: full refresh,
+    then an incremental run without new rows (the fixed cost of every scheduled run)
+    """
+    for layer in ('Silver', 'Gold'):
+        timings, _ = timed(lambda: _dbt_run('--select', layer, '--full-refresh'), 1)
+        record(results, f"dbt_{layer.lower()}_full_refresh", timings, rows)
+    for layer in ('Silver', 'Gold'):
+        timings, _ = timed(lambda: _dbt_run('--select', layer), 1)
+        record(results, f"dbt_{layer.lower()}_incremental_noop", timings, rows)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results: dict, baseline_path: str):
+    """
+    Prints each benchmark's best time relative to a previous results file
+    """
+    with open(baseline_path) as f:
+        baseline = json.load(f)['results']
+    print(f"\nCompared with {baseline_path} (>1.00 = slower):")
+    for name, result in results.items():
+        if name in baseline and baseline[name]['seconds_min']:
+            ratio = result['seconds_min'] / baseline[name]['seconds_min']
+            print(f"{name:<40} {ratio:>6.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Times the pipeline's hot paths on synthetic data")
+    parser.add_argument('--tickers', type=int, default=50, help="Number of tickers")
+    parser.add_argument('--days', type=int, default=250, help="Trading days of history")
+    parser.add_argument('--articles', type=int, default=5, help="News articles per ticker and day")
+    parser.add_argument('--filings', type=float, default=0.2, help="Insider filings per ticker and day")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per in-memory benchmark (best and median are kept)")
+    parser.add_argument('--skip-db', action='store_true', help="Skip the bronze insert and dbt benchmarks")
+    parser.add_argument('--skip-dbt', action='store_true', help="Skip the dbt benchmarks")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--compare', help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    tickers = make_tickers(args.tickers)
+    print(f"Generating {args.tickers} tickers x {args.days} days ({args.articles} articles, {args.filings} filings per day)...")
+    data = {
+        'stocks': generate_prices(tickers, args.days),
+        'news': generate_news(tickers, args.days, args.articles),
+        'insider': generate_insider(tickers, args.days, args.filings),
+    }
+    gold = generate_gold(tickers, args.days)
+
+    results = {}
+    bench_row_prep(data, args.repeat, results)
+    bench_process_data(gold, args.repeat, results)
+
+    if args.skip_db:
+        pass
+    elif not BENCH_DSN:
+        print("BENCH_DSN not set: skipping the database and dbt benchmarks")
+    else:
+        bench_bulk_insert(data, tickers, results)
+        if not args.skip_dbt:
+            bench_dbt(sum(len(df) for df in data.values()), results)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'run_at': datetime.now(timezone.utc).isoformat(),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': {
+                'tickers': args.tickers,
+                'days': args.days,
+                'articles_per_day': args.articles,
+                'filings_per_day': args.filings,
+                'rows': {name: len(df) for name, df in data.items()},
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,134 @@
+import numpy as np
+import pandas as pd
+
+# Synthetic inputs shaped like what each ingestion script hands to its insert function
+# (yfinance long frame, NewsAPI frame with sentiment, Finnhub insider frame) and like the
+# Gold tables analytics reads. Deterministic for a given seed.
+
+SENTIMENTS = np.array(['good', 'bad', 'neutral'])
+TRANSACTION_CODES = np.array(['S', 'P', 'M', 'A', 'F', 'G'])
+
+
+def make_tickers(count: int) -> list:
+    """
+    Ticker symbols T0000, T0001, ... (see company_name for the matching company)
+    """
+    return [f"T{i:04d}" for i in range(count)]
+
+
+def company_name(ticker: str) -> str:
+    return f"Company {ticker}"
+
+
+def trading_days(days: int, end: str = '2024-12-31') -> pd.DatetimeIndex:
+    return pd.bdate_range(end=end, periods=days)
+
+
+def generate_prices(tickers: list, days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Daily bars as normalize_download returns them: Date, Ticket, Close, High, Low, Open, Volume
+    """
+    rng = np.random.default_rng(seed)
+    dates = trading_days(days)
+    n = len(tickers) * len(dates)
+
+    returns = rng.normal(0, 0.02, size=(len(tickers), len(dates)))
+    close = 100 * np.exp(np.cumsum(returns, axis=1)).ravel()
+    spread = np.abs(rng.normal(0, 0.01, size=n)) * close
+    return pd.DataFrame({
+        'Date': np.tile(dates, len(tickers)),
+        'Ticket': np.repeat(tickers, len(dates)),
+        'Close': close,
+        'High': close + spread,
+        'Low': close - spread,
+        'Open': close + rng.normal(0, 0.005, size=n) * close,
+        'Volume': rng.integers(100_000, 50_000_000, size=n).astype(float),
+    })
+
+
+def generate_news(tickers: list, days: int, articles_per_day: int, seed: int = 0) -> pd.DataFrame:
+    """
+    NewsAPI articles with their sentiment: url, company, publishedAt, title, description, sentiment.
+    Publication times are spread over the whole calendar week, weekends included.
+    """
+    rng = np.random.default_rng(seed + 1)
+    dates = trading_days(days)
+    calendar_days = (dates[-1] - dates[0]).days + 1
+    n = len(tickers) * days * articles_per_day
+
+    companies = np.repeat([company_name(t) for t in tickers], days * articles_per_day)
+    offsets = rng.integers(0, calendar_days * 86400, size=n)
+    published = dates[0] + pd.to_timedelta(offsets, unit='s')
+    ids = np.arange(n)
+    return pd.DataFrame({
+        'url': [f"https://news.example.com/{i}" for i in ids],
+        'company': companies,
+        'publishedAt': published.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'title': [f"{c} headline {i}" for c, i in zip(companies, ids)],
+        'description': [f"Synthetic article {i} about {c}" for c, i in zip(companies, ids)],
+        'sentiment': SENTIMENTS[rng.integers(0, 3, size=n)],
+    })
+
+
+def generate_insider(tickers: list, days: int, filings_per_day: float, seed: int = 0) -> pd.DataFrame:
+    """
+    Finnhub insider transactions: symbol, name, share, change, filingDate, transactionDate,
+    transactionPrice, transactionCode (dates as the API's YYYY-MM-DD strings)
+    """
+    rng = np.random.default_rng(seed + 2)
+    dates = trading_days(days)
+    n = int(len(tickers) * days * filings_per_day)
+
+    transaction_dates = dates[rng.integers(0, len(dates), size=n)]
+    change = rng.integers(-50_000, 50_000, size=n)
+    return pd.DataFrame({
+        'symbol': np.array(tickers)[rng.integers(0, len(tickers), size=n)],
+        'name': [f"Insider {i}" for i in rng.integers(0, 200, size=n)],
+        'share': rng.integers(0, 5_000_000, size=n),
+        'change': change,
+        'filingDate': (transaction_dates + pd.Timedelta(days=2)).strftime('%Y-%m-%d'),
+        'transactionDate': transaction_dates.strftime('%Y-%m-%d'),
+        'transactionPrice': np.round(rng.uniform(5, 500, size=n), 2),
+        'transactionCode': TRANSACTION_CODES[rng.integers(0, len(TRANSACTION_CODES), size=n)],
+    })
+
+
+def generate_gold(tickers: list, days: int, seed: int = 0):
+    """
+    The Gold frames analytics.load_data returns with its default columns:
+    (transactions, news, insider). News and insider rows fall on calendar days, weekends included.
+    """
+    rng = np.random.default_rng(seed + 3)
+    dates = trading_days(days)
+    n = len(tickers) * len(dates)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, size=(len(tickers), len(dates))), axis=1)).ravel()
+    transactions = pd.DataFrame({
+        'ticket': np.repeat(tickers, len(dates)),
+        'trading_date': np.tile(dates, len(tickers)),
+        'close_price': close.astype('float32'),
+        'volume_1d': rng.integers(100_000, 50_000_000, size=n).astype('float32'),
+        'price_change_pct_1d': rng.normal(0, 2, size=n).astype('float32'),
+        'volume_change_1d': rng.normal(0, 1_000_000, size=n).astype('float32'),
+    })
+
+    calendar = pd.date_range(dates[0], dates[-1], freq='D')
+    news_mask = rng.random(len(tickers) * len(calendar)) < 0.6
+    news = pd.DataFrame({
+        'ticket': np.repeat(tickers, len(calendar)),
+        'news_date': np.tile(calendar, len(tickers)),
+        'daily_news_count': rng.integers(1, 20, size=len(tickers) * len(calendar)),
+        'daily_sentiment_score': rng.integers(-5, 6, size=len(tickers) * len(calendar)),
+    })[news_mask].reset_index(drop=True)
+
+    insider_mask = rng.random(len(tickers) * len(calendar)) < 0.1
+    insider = pd.DataFrame({
+        'symbol': np.repeat(tickers, len(calendar)),
+        'transaction_date': np.tile(calendar, len(tickers)),
+        'net_value_flow': rng.normal(0, 1e6, size=len(tickers) * len(calendar)).astype('float32'),
+        'total_shares_bought': rng.integers(0, 100_000, size=len(tickers) * len(calendar)),
+        'total_shares_sold': -rng.integers(0, 100_000, size=len(tickers) * len(calendar)),
+    })[insider_mask].reset_index(drop=True)
+
+    for df, column in ((transactions, 'ticket'), (news, 'ticket'), (insider, 'symbol')):
+        df[column] = df[column].astype('category')
+    return transactions, news, insider
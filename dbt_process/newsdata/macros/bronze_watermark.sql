@@ -0,0 +1,17 @@
+{#-
+    Incremental filter of a Silver model over its bronze source: only rows created since the last
+    build (minus the silver_lookback_hours var). Silver tables built before the models became
+    incremental have no source_created_at yet, so their first incremental run reads the whole
+    source instead of failing; on_schema_change then adds the column.
+-#}
+{% macro bronze_watermark(created_at_column='created_at') -%}
+    {%- if is_incremental() -%}
+        {%- set existing_columns = adapter.get_columns_in_relation(this) | map(attribute='name') | map('lower') | list -%}
+        {%- if 'source_created_at' in existing_columns %}
+    where {{ created_at_column }} > (
+        select coalesce(max(source_created_at), '1900-01-01'::timestamp) - interval '{{ var("silver_lookback_hours") }} hours'
+        from {{ this }}
+    )
+        {%- endif -%}
+    {%- endif -%}
+{%- endmacro %}
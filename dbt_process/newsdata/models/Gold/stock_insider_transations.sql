@@ -1,77 +1,174 @@
-WITH daily_insider_summary AS (
-    SELECT 
-        symbol,
-        transaction_date,
-        
+{{ config(
+    unique_key=['symbol', 'transaction_date'],
+    indexes=[{'columns': ['symbol', 'transaction_date']}]
+) }}
+
+-- Incremental: only symbols with new Silver transactions are recomputed, from their earliest
+-- affected activity day onwards. The 4 previous activity days are read as context for the
+-- LAG and 5-row windows, and cumulative metrics continue from the last materialized row
+-- before the recomputed range instead of re-summing the whole history.
+WITH
+{% if is_incremental() %}
+changed_symbols AS (
+    SELECT
+        its.symbol,
+        MIN(its.transaction_date) AS min_new_date
+    FROM {{ ref('insider_transactions_stocks') }} its
+    WHERE its.source_created_at > (
+        SELECT COALESCE(MAX(source_created_at), '1900-01-01'::timestamp) - interval '{{ var("silver_lookback_hours") }} hours'
+        FROM {{ this }}
+    )
+    GROUP BY its.symbol
+),
+recompute_range AS (
+    SELECT
+        cs.symbol,
+        cs.min_new_date,
+        COALESCE((
+            SELECT MIN(lb.transaction_date)
+            FROM (
+                SELECT prev.transaction_date
+                FROM {{ this }} prev
+                WHERE prev.symbol = cs.symbol AND prev.transaction_date < cs.min_new_date
+                ORDER BY prev.transaction_date DESC
+                LIMIT 4
+            ) lb
+        ), cs.min_new_date) AS lookback_date,
+        -- Carried-forward cumulative totals (last materialized row before the recomputed range)
+        COALESCE(carry.cumulative_net_shares_flow, 0) AS carry_net_shares_flow,
+        COALESCE(carry.cumulative_net_value_flow, 0) AS carry_net_value_flow,
+        COALESCE(carry.cumulative_transaction_count, 0) AS carry_transaction_count
+    FROM changed_symbols cs
+    LEFT JOIN LATERAL (
+        SELECT
+            prev.cumulative_net_shares_flow,
+            prev.cumulative_net_value_flow,
+            prev.cumulative_transaction_count
+        FROM {{ this }} prev
+        WHERE prev.symbol = cs.symbol AND prev.transaction_date < cs.min_new_date
+        ORDER BY prev.transaction_date DESC
+        LIMIT 1
+    ) carry ON TRUE
+),
+{% endif %}
+daily_insider_summary AS (
+    SELECT
+        its.symbol,
+        its.transaction_date,
+
         -- Count of unique insiders active on the day
-        COUNT(DISTINCT name) AS distinct_insiders_active,
-        
+        COUNT(DISTINCT its.name) AS distinct_insiders_active,
+
         -- Buy/Sell Volume (shares)
-        SUM(CASE WHEN "change" > 0 THEN "change" ELSE 0 END) AS total_shares_bought,
-        SUM(CASE WHEN "change" < 0 THEN "change" ELSE 0 END) AS total_shares_sold, -- Value will be negative
-        SUM("change") AS net_shares_flow,
-        
+        SUM(CASE WHEN its."change" > 0 THEN its."change" ELSE 0 END) AS total_shares_bought,
+        SUM(CASE WHEN its."change" < 0 THEN its."change" ELSE 0 END) AS total_shares_sold, -- Value will be negative
+        SUM(its."change") AS net_shares_flow,
+
         -- Buy/Sell Volume (financial)
-        SUM(CASE WHEN "change" > 0 THEN transaction_price * "change" ELSE 0 END) AS total_value_bought,
-        SUM(CASE WHEN "change" < 0 THEN transaction_price * "change" ELSE 0 END) AS total_value_sold, -- Value will be negative
-        SUM(transaction_price * "change") AS net_value_flow,
-        
+        SUM(CASE WHEN its."change" > 0 THEN its.transaction_price * its."change" ELSE 0 END) AS total_value_bought,
+        SUM(CASE WHEN its."change" < 0 THEN its.transaction_price * its."change" ELSE 0 END) AS total_value_sold, -- Value will be negative
+        SUM(its.transaction_price * its."change") AS net_value_flow,
+
         -- Transaction count
-        COUNT(*) AS total_transactions_count
-        
-    FROM 
-        {{ ref('insider_transactions_stocks') }}
-    GROUP BY 
-        symbol, transaction_date
+        COUNT(*) AS total_transactions_count,
+        MAX(its.source_created_at) AS source_created_at
+
+    FROM
+        {{ ref('insider_transactions_stocks') }} its
+    {% if is_incremental() %}
+    JOIN recompute_range rr ON rr.symbol = its.symbol AND its.transaction_date >= rr.lookback_date
+    {% endif %}
+    GROUP BY
+        its.symbol, its.transaction_date
 ),
 
--- Step 2: Apply window functions for enrichment
+-- Step 2: Evaluate each distinct window once
+windowed AS (
+    SELECT
+        dis.*,
+        LAG(dis.transaction_date, 1) OVER w_day AS prev_transaction_date,
+        LAG(dis.net_shares_flow, 1) OVER w_day AS prev_net_shares_flow,
+        SUM(dis.net_shares_flow) OVER w_5d AS sum_5d_net_shares_flow,
+        SUM(dis.net_value_flow) OVER w_5d AS sum_5d_net_value_flow,
+        AVG(dis.net_shares_flow) OVER w_5d AS avg_5d_net_shares_flow,
+        SUM(dis.distinct_insiders_active) OVER w_5d AS sum_5d_active_insiders,
+        SUM(dis.total_transactions_count) OVER w_5d AS sum_5d_transaction_count,
+        {% if is_incremental() %}
+        -- Running totals over the recomputed range only (context rows contribute 0)
+        SUM(CASE WHEN dis.transaction_date >= rr.min_new_date THEN dis.net_shares_flow ELSE 0 END) OVER w_cum + rr.carry_net_shares_flow AS running_net_shares_flow,
+        SUM(CASE WHEN dis.transaction_date >= rr.min_new_date THEN dis.net_value_flow ELSE 0 END) OVER w_cum + rr.carry_net_value_flow AS running_net_value_flow,
+        SUM(CASE WHEN dis.transaction_date >= rr.min_new_date THEN dis.total_transactions_count ELSE 0 END) OVER w_cum + rr.carry_transaction_count AS running_transaction_count,
+        rr.min_new_date
+        {% else %}
+        SUM(dis.net_shares_flow) OVER w_cum AS running_net_shares_flow,
+        SUM(dis.net_value_flow) OVER w_cum AS running_net_value_flow,
+        SUM(dis.total_transactions_count) OVER w_cum AS running_transaction_count
+        {% endif %}
+    FROM
+        daily_insider_summary dis
+    {% if is_incremental() %}
+    JOIN recompute_range rr ON rr.symbol = dis.symbol
+    {% endif %}
+    WINDOW
+        w_day AS (PARTITION BY dis.symbol ORDER BY dis.transaction_date),
+        w_5d AS (w_day ROWS BETWEEN 4 PRECEDING AND CURRENT ROW),
+        w_cum AS (w_day ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW)
+),
+
+-- Step 3: Derive the enrichment metrics
 final_metrics AS (
     SELECT
         -- Keys and base data
-        dis.symbol, -- Key: Stock ticker (e.g., AAPL, NFLX)
-        dis.transaction_date, -- Key: Transaction date
-        
+        w.symbol, -- Key: Stock ticker (e.g., AAPL, NFLX)
+        w.transaction_date, -- Key: Transaction date
+
         -- Daily Metrics (from CTE)
-        dis.distinct_insiders_active, -- Column: Number of unique active insiders on the day
-        dis.total_shares_bought, -- Column: Total shares bought by insiders on the day
-        dis.total_shares_sold, -- Column: Total shares sold by insiders on the day (negative)
-        dis.net_shares_flow, -- Column: Net shares flow (bought - sold) on the day
-        dis.net_value_flow, -- Column: Net financial flow (value bought - value sold) on the day
-        dis.total_transactions_count, -- Column: Number of insider transactions on the day
-        
+        w.distinct_insiders_active, -- Column: Number of unique active insiders on the day
+        w.total_shares_bought, -- Column: Total shares bought by insiders on the day
+        w.total_shares_sold, -- Column: Total shares sold by insiders on the day (negative)
+        w.net_shares_flow, -- Column: Net shares flow (bought - sold) on the day
+        w.net_value_flow, -- Column: Net financial flow (value bought - value sold) on the day
+        w.total_transactions_count, -- Column: Number of insider transactions on the day
+
         -- Comparative Metrics (D-1 vs D-prev_active)
-        LAG(dis.transaction_date, 1) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date) AS previous_activity_date, -- Column: Date of the last previous insider activity
+        w.prev_transaction_date AS previous_activity_date, -- Column: Date of the last previous insider activity
         -- Note: DATE_DIFF is for BigQuery/Spark. In PostgreSQL, use date subtraction.
-        (dis.transaction_date - LAG(dis.transaction_date, 1) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date)) AS days_since_last_activity, -- Column: Days since last insider activity
-        
-        LAG(dis.net_shares_flow, 1) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date) AS previous_day_net_shares_flow, -- Column: Net shares flow of the previous activity day
-        dis.net_shares_flow - LAG(dis.net_shares_flow, 1) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date) AS change_in_net_shares_flow, -- Column: Change in net shares flow vs. previous day
-        
+        (w.transaction_date - w.prev_transaction_date) AS days_since_last_activity, -- Column: Days since last insider activity
+
+        w.prev_net_shares_flow AS previous_day_net_shares_flow, -- Column: Net shares flow of the previous activity day
+        w.net_shares_flow - w.prev_net_shares_flow AS change_in_net_shares_flow, -- Column: Change in net shares flow vs. previous day
+
         -- Rolling Window Metrics (Based on last 5 *insider activity days*)
-        -- This is the same style 'ROWS BETWEEN 4 PRECEDING' as your example
-        SUM(dis.net_shares_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) AS rolling_5_day_net_shares_flow, -- Column: Net shares flow in the last 5 activity days
-        SUM(dis.net_value_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) AS rolling_5_day_net_value_flow, -- Column: Net financial flow in the last 5 activity days
-        AVG(dis.net_shares_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) AS rolling_5_day_avg_net_shares, -- Column: Average net shares flow in the last 5 activity days
-        SUM(dis.distinct_insiders_active) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) AS rolling_5_day_active_insiders, -- Column: Count of active insiders (non-unique) in the last 5 activity days
-        SUM(dis.total_transactions_count) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) AS rolling_5_day_transaction_count, -- Column: Sum of transactions in the last 5 activity days
-        
+        w.sum_5d_net_shares_flow AS rolling_5_day_net_shares_flow, -- Column: Net shares flow in the last 5 activity days
+        w.sum_5d_net_value_flow AS rolling_5_day_net_value_flow, -- Column: Net financial flow in the last 5 activity days
+        w.avg_5d_net_shares_flow AS rolling_5_day_avg_net_shares, -- Column: Average net shares flow in the last 5 activity days
+        w.sum_5d_active_insiders AS rolling_5_day_active_insiders, -- Column: Count of active insiders (non-unique) in the last 5 activity days
+        w.sum_5d_transaction_count AS rolling_5_day_transaction_count, -- Column: Sum of transactions in the last 5 activity days
+
         -- Cumulative Metrics (Since inception)
-        SUM(dis.net_shares_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS cumulative_net_shares_flow, -- Column: Cumulative net shares flow (historical position)
-        SUM(dis.net_value_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS cumulative_net_value_flow, -- Column: Cumulative net financial flow
-        SUM(dis.total_transactions_count) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN UNBOUNDED PRECEDING AND CURRENT ROW) AS cumulative_transaction_count,
+        w.running_net_shares_flow AS cumulative_net_shares_flow, -- Column: Cumulative net shares flow (historical position)
+        w.running_net_value_flow AS cumulative_net_value_flow, -- Column: Cumulative net financial flow
+        w.running_transaction_count AS cumulative_transaction_count,
 
         -- Signals and Indicators (Examples)
-        SIGN(SUM(dis.net_shares_flow) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)) AS rolling_5_day_sentiment, -- Column: Sentiment (1=net buy, -1=net sell, 0=neutral) in the last 5 activity days
-        CASE 
-            WHEN (dis.transaction_date - LAG(dis.transaction_date, 1) OVER (PARTITION BY dis.symbol ORDER BY dis.transaction_date)) <= 3
-            THEN 1 ELSE 0 
-        END AS is_activity_cluster -- Column: Flag (1/0) if activity is part of a 'cluster' (<= 3 days from previous activity)
-    FROM 
-        daily_insider_summary dis
+        SIGN(w.sum_5d_net_shares_flow) AS rolling_5_day_sentiment, -- Column: Sentiment (1=net buy, -1=net sell, 0=neutral) in the last 5 activity days
+        CASE
+            WHEN (w.transaction_date - w.prev_transaction_date) <= 3
+            THEN 1 ELSE 0
+        END AS is_activity_cluster, -- Column: Flag (1/0) if activity is part of a 'cluster' (<= 3 days from previous activity)
+
+        -- Incremental bookkeeping
+        w.source_created_at,
+        current_timestamp AS updated_at
+    FROM
+        windowed w
+    {% if is_incremental() %}
+    -- Context rows were only needed for the windows; emit the recomputed range
+    WHERE w.transaction_date >= w.min_new_date
+    {% endif %}
 )
 -- Final selection for the gold table or view
-SELECT 
+SELECT
     *
-FROM 
-    final_metrics
\ No newline at end of file
+FROM
+    final_metrics
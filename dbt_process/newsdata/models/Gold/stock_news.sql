@@ -1,51 +1,114 @@
+{{ config(
+    unique_key=['ticket', 'news_date'],
+    indexes=[{'columns': ['ticket', 'news_date']}]
+) }}
+
 -- OBT News with sentiment counters
-SELECT 
-    sn.ticket,
-    DATE(sn.published_at) as news_date,
+-- Incremental: only tickers with new Silver news are re-aggregated, from their earliest
+-- affected day onwards, plus the 4 previous news days needed by the rolling windows.
+-- News without a ticker is left out: the (ticket, news_date) unique key can't match NULLs,
+-- so delete+insert would duplicate those rows on every run.
+with
+{% if is_incremental() %}
+changed_tickers as (
+    SELECT
+        sn.ticket,
+        MIN(DATE(sn.published_at)) as min_new_date
+    FROM {{ ref('news') }} sn
+    WHERE sn.source_created_at > (
+        SELECT COALESCE(MAX(source_created_at), '1900-01-01'::timestamp) - interval '{{ var("silver_lookback_hours") }} hours'
+        FROM {{ this }}
+    )
+    AND sn.ticket IS NOT NULL
+    GROUP BY sn.ticket
+),
+recompute_range as (
+    SELECT
+        ct.ticket,
+        ct.min_new_date,
+        COALESCE((
+            SELECT MIN(lb.news_date)
+            FROM (
+                SELECT prev.news_date
+                FROM {{ this }} prev
+                WHERE prev.ticket = ct.ticket AND prev.news_date < ct.min_new_date
+                ORDER BY prev.news_date DESC
+                LIMIT 4
+            ) lb
+        ), ct.min_new_date) as lookback_date
+    FROM changed_tickers ct
+),
+{% endif %}
+-- One row per story: near-duplicate copies of an article (same news_cluster_id) count once
+stories as (
+    SELECT
+        sn.ticket,
+        DATE(sn.published_at) as news_date,
+        sn.news_cluster_id,
+        MODE() WITHIN GROUP (ORDER BY sn.news_sentiment) as news_sentiment,
+        MAX(sn.source_created_at) as source_created_at
+    FROM {{ ref('news') }} sn
+    {% if is_incremental() %}
+    JOIN recompute_range rr ON rr.ticket = sn.ticket AND DATE(sn.published_at) >= rr.lookback_date
+    {% endif %}
+    WHERE sn.ticket IS NOT NULL
+    GROUP BY sn.ticket, DATE(sn.published_at), sn.news_cluster_id
+),
+daily as (
+    SELECT
+        sn.ticket,
+        sn.news_date,
+        -- Daily counters
+        COUNT(*) as daily_news_count,
+        SUM(CASE WHEN sn.news_sentiment = 'good' THEN 1 ELSE 0 END) as daily_good_news_count,
+        SUM(CASE WHEN sn.news_sentiment = 'bad' THEN 1 ELSE 0 END) as daily_bad_news_count,
+        SUM(CASE WHEN sn.news_sentiment = 'neutral' THEN 1 ELSE 0 END) as daily_neutral_news_count,
+        -- Sentiment Score (good: +1, bad: -1, neutral: 0)
+        SUM(CASE
+            WHEN sn.news_sentiment = 'good' THEN 1
+            WHEN sn.news_sentiment = 'bad' THEN -1
+            ELSE 0
+        END) as daily_sentiment_score,
+        MAX(sn.source_created_at) as source_created_at
+    FROM stories sn
+    GROUP BY sn.ticket, sn.news_date
+),
+-- The 5-day window is defined once and shared by every rolling counter
+rolling as (
+    SELECT
+        d.*,
+        SUM(d.daily_news_count) OVER w_5d as rolling_5d_news_count,
+        SUM(d.daily_good_news_count) OVER w_5d as rolling_5d_good_news_count,
+        SUM(d.daily_bad_news_count) OVER w_5d as rolling_5d_bad_news_count,
+        SUM(d.daily_neutral_news_count) OVER w_5d as rolling_5d_neutral_news_count,
+        SUM(d.daily_sentiment_score) OVER w_5d as rolling_5d_sentiment_score
+    FROM daily d
+    WINDOW w_5d as (PARTITION BY d.ticket ORDER BY d.news_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)
+)
+SELECT
+    r.ticket,
+    r.news_date,
     -- Daily counters
-    COUNT(*) as daily_news_count,
-    SUM(CASE WHEN sn.news_sentiment = 'good' THEN 1 ELSE 0 END) as daily_good_news_count,
-    SUM(CASE WHEN sn.news_sentiment = 'bad' THEN 1 ELSE 0 END) as daily_bad_news_count,
-    SUM(CASE WHEN sn.news_sentiment = 'neutral' THEN 1 ELSE 0 END) as daily_neutral_news_count,
+    r.daily_news_count,
+    r.daily_good_news_count,
+    r.daily_bad_news_count,
+    r.daily_neutral_news_count,
     -- Daily percentages
-    ROUND(SUM(CASE WHEN sn.news_sentiment = 'good' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as daily_good_news_pct,
-    ROUND(SUM(CASE WHEN sn.news_sentiment = 'bad' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as daily_bad_news_pct,
-    ROUND(SUM(CASE WHEN sn.news_sentiment = 'neutral' THEN 1 ELSE 0 END) * 100.0 / COUNT(*), 2) as daily_neutral_news_pct,
+    ROUND(r.daily_good_news_count * 100.0 / r.daily_news_count, 2) as daily_good_news_pct,
+    ROUND(r.daily_bad_news_count * 100.0 / r.daily_news_count, 2) as daily_bad_news_pct,
+    ROUND(r.daily_neutral_news_count * 100.0 / r.daily_news_count, 2) as daily_neutral_news_pct,
     -- Rolling 5-day counters (including current day)
-    SUM(COUNT(*)) OVER (
-        PARTITION BY sn.ticket 
-        ORDER BY DATE(sn.published_at) 
-        ROWS BETWEEN 4 PRECEDING AND CURRENT ROW
-    ) as rolling_5d_news_count,
-    SUM(SUM(CASE WHEN sn.news_sentiment = 'good' THEN 1 ELSE 0 END)) OVER (
-        PARTITION BY sn.ticket 
-        ORDER BY DATE(sn.published_at) 
-        ROWS BETWEEN 4 PRECEDING AND CURRENT ROW
-    ) as rolling_5d_good_news_count,
-    SUM(SUM(CASE WHEN sn.news_sentiment = 'bad' THEN 1 ELSE 0 END)) OVER (
-        PARTITION BY sn.ticket 
-        ORDER BY DATE(sn.published_at) 
-        ROWS BETWEEN 4 PRECEDING AND CURRENT ROW
-    ) as rolling_5d_bad_news_count,
-    SUM(SUM(CASE WHEN sn.news_sentiment = 'neutral' THEN 1 ELSE 0 END)) OVER (
-        PARTITION BY sn.ticket 
-        ORDER BY DATE(sn.published_at) 
-        ROWS BETWEEN 4 PRECEDING AND CURRENT ROW
-    ) as rolling_5d_neutral_news_count,
-    -- Sentiment Score (good: +1, bad: -1, neutral: 0)
-    SUM(CASE 
-        WHEN sn.news_sentiment = 'good' THEN 1 
-        WHEN sn.news_sentiment = 'bad' THEN -1 
-        ELSE 0 
-    END) as daily_sentiment_score,
-    SUM(SUM(CASE 
-        WHEN sn.news_sentiment = 'good' THEN 1 
-        WHEN sn.news_sentiment = 'bad' THEN -1 
-        ELSE 0 
-    END)) OVER (
-        PARTITION BY sn.ticket 
-        ORDER BY DATE(sn.published_at) 
-        ROWS BETWEEN 4 PRECEDING AND CURRENT ROW
-    ) as rolling_5d_sentiment_score
-FROM {{ ref('news') }} sn
-GROUP BY sn.ticket, DATE(sn.published_at)
\ No newline at end of file
+    r.rolling_5d_news_count,
+    r.rolling_5d_good_news_count,
+    r.rolling_5d_bad_news_count,
+    r.rolling_5d_neutral_news_count,
+    -- Sentiment Score
+    r.daily_sentiment_score,
+    r.rolling_5d_sentiment_score,
+    -- Incremental bookkeeping
+    r.source_created_at,
+    current_timestamp as updated_at
+FROM rolling r
+{% if is_incremental() %}
+JOIN recompute_range rr ON rr.ticket = r.ticket AND r.news_date >= rr.min_new_date
+{% endif %}
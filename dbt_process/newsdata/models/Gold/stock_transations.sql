@@ -1,43 +1,113 @@
-SELECT 
-    ss.ticket,
-    ss.trading_date,
+{{ config(
+    unique_key=['ticket', 'trading_date'],
+    indexes=[{'columns': ['ticket', 'trading_date']}]
+) }}
+
+-- Incremental: only tickers with new Silver rows are recomputed, from their earliest new
+-- trading date onwards. The 4 previous trading days are read as context for the LAG and
+-- 5-row windows but are not rewritten.
+with
+{% if is_incremental() %}
+changed_tickers as (
+    SELECT
+        ss.ticket,
+        MIN(ss.trading_date) as min_new_date
+    FROM {{ ref('stocks') }} ss
+    WHERE ss.source_created_at > (
+        SELECT COALESCE(MAX(source_created_at), '1900-01-01'::timestamp) - interval '{{ var("silver_lookback_hours") }} hours'
+        FROM {{ this }}
+    )
+    GROUP BY ss.ticket
+),
+recompute_range as (
+    SELECT
+        ct.ticket,
+        ct.min_new_date,
+        COALESCE((
+            SELECT MIN(lb.trading_date)
+            FROM (
+                SELECT prev.trading_date
+                FROM {{ ref('stocks') }} prev
+                WHERE prev.ticket = ct.ticket AND prev.trading_date < ct.min_new_date
+                ORDER BY prev.trading_date DESC
+                LIMIT 4
+            ) lb
+        ), ct.min_new_date) as lookback_date
+    FROM changed_tickers ct
+),
+{% endif %}
+base as (
+    SELECT ss.*
+    FROM {{ ref('stocks') }} ss
+    {% if is_incremental() %}
+    JOIN recompute_range rr ON rr.ticket = ss.ticket AND ss.trading_date >= rr.lookback_date
+    {% endif %}
+),
+-- Each distinct window is evaluated once here; the final select only derives from these columns
+windowed as (
+    SELECT
+        b.ticket,
+        b.trading_date,
+        b.close_price,
+        b.low_price,
+        b.trade_volume,
+        b.source_created_at,
+        LAG(b.close_price, 1) OVER w_day as prev_close_price,
+        LAG(b.trade_volume, 1) OVER w_day as prev_trade_volume,
+        AVG(b.close_price) OVER w_5d as avg_5d_close_price,
+        AVG(b.trade_volume) OVER w_5d as avg_5d_volume,
+        MAX(b.close_price) OVER w_5d as max_5d_close_price,
+        MIN(b.close_price) OVER w_5d as min_5d_close_price,
+        MIN(b.low_price) OVER w_5d as min_5d_low_price,
+        MAX(b.trade_volume) OVER w_5d as max_5d_volume,
+        STDDEV(b.close_price) OVER w_5d as stddev_5d_close_price
+    FROM base b
+    WINDOW
+        w_day as (PARTITION BY b.ticket ORDER BY b.trading_date),
+        w_5d as (w_day ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)
+)
+SELECT
+    w.ticket,
+    w.trading_date,
     -- Basic prices
-    ss.close_price,
-    ss.low_price,
-    ss.trade_volume,
+    w.close_price,
+    w.low_price,
+    w.trade_volume,
     -- Daily variation (D-1)
-    LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) as close_price_yesterday,
-    ss.close_price - LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) as price_change_1d,
-    ROUND(((ss.close_price - LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date)) / 
-           NULLIF(LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date), 0) * 100), 2) as price_change_pct_1d,
+    w.prev_close_price as close_price_yesterday,
+    w.close_price - w.prev_close_price as price_change_1d,
+    ROUND(((w.close_price - w.prev_close_price) / NULLIF(w.prev_close_price, 0) * 100), 2) as price_change_pct_1d,
     -- Volume variation D-1
-    LAG(ss.trade_volume, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) as volume_1d,
-    ss.trade_volume - LAG(ss.trade_volume, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) as volume_change_1d,
+    w.prev_trade_volume as volume_1d,
+    w.trade_volume - w.prev_trade_volume as volume_change_1d,
     -- Moving averages (5 days)
-    ROUND(AVG(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW), 2) as ma5_close_price,
-    ROUND(AVG(ss.trade_volume) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW), 0) as ma5_volume,
+    ROUND(w.avg_5d_close_price, 2) as ma5_close_price,
+    ROUND(w.avg_5d_volume, 0) as ma5_volume,
     -- Max and min of last 5 days
-    MAX(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) as max_5d_close_price,
-    MIN(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) as min_5d_close_price,
-    MIN(ss.low_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) as min_5d_low_price,
-    MAX(ss.trade_volume) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) as max_5d_volume,
+    w.max_5d_close_price,
+    w.min_5d_close_price,
+    w.min_5d_low_price,
+    w.max_5d_volume,
     -- Volatility (range of last 5 days)
-    ROUND((MAX(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) - 
-           MIN(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)), 2) as price_range_5d,
+    ROUND((w.max_5d_close_price - w.min_5d_close_price), 2) as price_range_5d,
     -- Position relative to 5-day range (0 = min, 100 = max)
-    ROUND(((ss.close_price - MIN(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)) /
-           NULLIF((MAX(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW) - 
-                   MIN(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)), 0) * 100), 2) as price_percentile_5d,
+    ROUND(((w.close_price - w.min_5d_close_price) /
+           NULLIF((w.max_5d_close_price - w.min_5d_close_price), 0) * 100), 2) as price_percentile_5d,
     -- Standard deviation of last 5 days (volatility)
-    ROUND(STDDEV(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW), 2) as stddev_5d_close_price, 
+    ROUND(w.stddev_5d_close_price, 2) as stddev_5d_close_price,
     -- Distance from moving average
-    ROUND(ss.close_price - AVG(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW), 2) as distance_from_ma5,
-    ROUND(((ss.close_price - AVG(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW)) /
-           NULLIF(AVG(ss.close_price) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date ROWS BETWEEN 4 PRECEDING AND CURRENT ROW), 0) * 100), 2) as distance_pct_from_ma5,
+    ROUND(w.close_price - w.avg_5d_close_price, 2) as distance_from_ma5,
+    ROUND(((w.close_price - w.avg_5d_close_price) / NULLIF(w.avg_5d_close_price, 0) * 100), 2) as distance_pct_from_ma5,
     -- Trend (consecutive days of up/down)
-    CASE 
-        WHEN ss.close_price > LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) THEN 1
-        WHEN ss.close_price < LAG(ss.close_price, 1) OVER (PARTITION BY ss.ticket ORDER BY ss.trading_date) THEN -1
+    CASE
+        WHEN w.close_price > w.prev_close_price THEN 1
+        WHEN w.close_price < w.prev_close_price THEN -1
         ELSE 0
-    END as price_direction_1d
-FROM {{ ref('stocks') }} ss
\ No newline at end of file
+    END as price_direction_1d,
+    -- Incremental bookkeeping
+    w.source_created_at,
+    current_timestamp as updated_at
+FROM windowed w
+{% if is_incremental() %}
+JOIN recompute_range rr ON rr.ticket = w.ticket AND w.trading_date >= rr.min_new_date
+{% endif %}
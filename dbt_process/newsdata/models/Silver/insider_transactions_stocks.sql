@@ -1,7 +1,17 @@
+{{ config(
+    unique_key='insider_transactions_hash',
+    indexes=[
+        {'columns': ['insider_transactions_hash']},
+        {'columns': ['symbol', 'transaction_date']},
+        {'columns': ['source_created_at']}
+    ]
+) }}
+
 with insider_transactions_source as (
     select
         *
     from {{  source('bronze', 'insider_transactions') }} 
+    {{ bronze_watermark() }}
 ),
 insider_transactions_source_type as (
     select
@@ -14,6 +24,7 @@ insider_transactions_source_type as (
         cast(transaction_date as date) as transaction_date,
         cast(transaction_price as decimal(18, 4)) as transaction_price,
         cast(transaction_code as varchar) as transaction_code,
+        cast(created_at as timestamp) as source_created_at,
         cast(current_timestamp as timestamp) as updated_at
     from insider_transactions_source
 )
@@ -1,9 +1,21 @@
 -- models/Silver/silver_news.sql
+-- Incremental on bronze.news created_at; run with --full-refresh after changing bronze.auxiliary_table_tck_name
+-- The ticker routed at ingestion wins; the company-name join covers rows loaded without one
+
+{{ config(
+    unique_key='hash_news',
+    indexes=[
+        {'columns': ['hash_news']},
+        {'columns': ['ticket', 'published_at']},
+        {'columns': ['source_created_at']}
+    ]
+) }}
 
 with news_souerce as (
 		select 
 			* 
 		from {{ source('bronze', 'news') }}
+		{{ bronze_watermark() }}
 	),
 	auxiary_souerce as (
 		select 
@@ -14,11 +26,15 @@ with news_souerce as (
 		select 
 			cast(hash as varchar) as hash_news,
 			cast(company as varchar) as company,
+			upper(cast(ticket as varchar)) as ticket,
 			cast(title as varchar) as news_titel,
 			cast(description as varchar) as news_description,
 			cast(url as varchar) as news_url,
 			cast(sentiment as varchar) as news_sentiment,
-			cast(published_at as timestamp) as published_at
+			-- Near-duplicate story id; rows loaded before clustering are their own story
+			coalesce(cast(cluster_id as varchar), cast(hash as varchar)) as news_cluster_id,
+			cast(published_at as timestamp) as published_at,
+			cast(created_at as timestamp) as source_created_at
 		from news_souerce
 	),
 	auxiary_type as (
@@ -32,12 +48,14 @@ with news_souerce as (
 		select 
 			a.hash_news,
 			a.company,
-			b.ticket,
+			coalesce(a.ticket, b.ticket) as ticket,
 			a.news_titel,
 			a.news_description,
 			a.news_url,
 			a.news_sentiment,
+			a.news_cluster_id,
             a.published_at,
+            a.source_created_at,
             current_timestamp as updated_at
 		from news_type a 
 		left join auxiary_type b on upper(a.company) = upper(b.company)
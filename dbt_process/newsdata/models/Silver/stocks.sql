@@ -1,7 +1,17 @@
+{{ config(
+    unique_key='stock_hash',
+    indexes=[
+        {'columns': ['stock_hash']},
+        {'columns': ['ticket', 'trading_date']},
+        {'columns': ['source_created_at']}
+    ]
+) }}
+
 with stocks_source as (
     select
         *
     from {{  source('bronze', 'stocks') }} 
+    {{ bronze_watermark() }}
 ),
 stocks_type as (
     select
@@ -13,6 +23,7 @@ stocks_type as (
         cast(low as decimal(18, 4)) as low_price,
         cast(open as decimal(18, 4)) as open_price,
         cast(volume as bigint) as trade_volume,
+        cast(created_at as timestamp) as source_created_at,
         cast(current_timestamp as timestamp) as updated_at
     from stocks_source
 )
@@ -0,0 +1,119 @@
+import csv
+import io
+import math
+import pandas as pd
+from metrics import increment, span
+
+# COPY marker for NULL values (unquoted \N, so empty strings stay empty strings)
+NULL_MARKER = r'\N'
+
+# Rows sent per COPY + merge round; keeps the staging table and the client buffer small
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def _to_copy_value(value):
+    """
+    Maps Python/pandas missing values (None, NaN, NaT) to the COPY NULL marker.
+    Integral floats are written as integers, since COPY (unlike INSERT) won't cast 1.0 into BIGINT.
+    """
+    if value is None:
+        return NULL_MARKER
+    if isinstance(value, float):
+        if math.isnan(value):
+            return NULL_MARKER
+        if value.is_integer():
+            return int(value)
+    if value != value:  # NaT and numpy NaN scalars
+        return NULL_MARKER
+    return value
+
+
+def _rows_to_buffer(rows) -> io.StringIO:
+    """
+    Serializes rows to an in-memory CSV buffer readable by COPY FROM STDIN
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow([_to_copy_value(value) for value in row])
+    buffer.seek(0)
+    return buffer
+
+
+def _frame_to_buffer(frame: pd.DataFrame) -> io.StringIO:
+    """
+    Serializes a prepared frame straight from its column arrays to a COPY buffer
+    """
+    buffer = io.StringIO()
+    frame.to_csv(buffer, header=False, index=False, na_rep=NULL_MARKER, lineterminator='\n')
+    buffer.seek(0)
+    return buffer
+
+
+def bulk_insert(connection, table: str, columns: list, rows,
+                conflict_columns: tuple = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                update_columns: tuple = None, update_where: str = None):
+    """
+    Loads rows into `table` via COPY into a temporary staging table followed by one
+    set-based INSERT ... SELECT ... ON CONFLICT DO NOTHING per chunk.
+    `rows` is either a list of tuples or a DataFrame whose columns follow `columns`.
+    Without conflict_columns any unique violation is skipped, which works for both the plain
+    (hash) and the partitioned (hash, date) primary keys.
+    With update_columns (requires conflict_columns) conflicting rows are updated from the new
+    row instead, only where the optional update_where condition holds on the stored row;
+    updated rows are counted as inserted.
+    Does not commit; the caller owns the transaction.
+    Returns a tuple (inserted, skipped).
+    """
+    column_list = ", ".join(columns)
+    # Qualified with pg_temp so the DROP below can never touch a regular table
+    staging_table = f"pg_temp.staging_{table.replace('.', '_')}"
+    conflict_target = f"({', '.join(conflict_columns)})" if conflict_columns else ""
+    select = f"SELECT {column_list} FROM {staging_table}"
+    conflict_action = "DO NOTHING"
+    if update_columns:
+        # An upsert can't touch the same row twice in one statement, so the chunk is deduplicated first
+        select = f"SELECT DISTINCT ON {conflict_target} {column_list} FROM {staging_table}"
+        conflict_action = "DO UPDATE SET " + ", ".join(f"{column} = EXCLUDED.{column}" for column in update_columns)
+        if update_where:
+            conflict_action += f" WHERE {update_where}"
+
+    with span('db_bulk_insert', table=table):
+        cursor = connection.cursor()
+        try:
+            # Same column types as the target, dropped automatically at the end of the transaction
+            cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            cursor.execute(
+                f"CREATE TEMP TABLE {staging_table} ON COMMIT DROP AS "
+                f"SELECT {column_list} FROM {table} WITH NO DATA"
+            )
+
+            inserted = 0
+            total = 0
+            for start in range(0, len(rows), chunk_size):
+                if isinstance(rows, pd.DataFrame):
+                    chunk = rows.iloc[start:start + chunk_size]
+                    buffer = _frame_to_buffer(chunk)
+                else:
+                    chunk = rows[start:start + chunk_size]
+                    buffer = _rows_to_buffer(chunk)
+                if start:
+                    cursor.execute(f"TRUNCATE {staging_table}")
+
+                cursor.copy_expert(
+                    f"COPY {staging_table} ({column_list}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')",
+                    buffer
+                )
+                cursor.execute(f"""
+                    INSERT INTO {table} ({column_list})
+                    {select}
+                    ON CONFLICT {conflict_target} {conflict_action}
+                """)
+                inserted += cursor.rowcount
+                total += len(chunk)
+
+            increment('rows_inserted', inserted, table=table)
+            increment('rows_skipped', total - inserted, table=table)
+            return inserted, total - inserted
+        finally:
+            cursor.close()
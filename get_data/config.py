@@ -0,0 +1,39 @@
+import os
+
+# Ticker universe shared by every source: ticker -> company name used in news searches.
+# Override with PIPELINE_UNIVERSE="AAPL:Apple,META:Meta,..."
+DEFAULT_UNIVERSE = {
+    'AAPL': 'Apple',
+    'META': 'Meta',
+    'NVDA': 'Nvidia',
+    'NFLX': 'Netflix',
+}
+
+
+def load_universe() -> dict:
+    """
+    Returns the {ticker: company} universe from PIPELINE_UNIVERSE, or the default one
+    """
+    raw = os.getenv('PIPELINE_UNIVERSE')
+    if not raw:
+        return dict(DEFAULT_UNIVERSE)
+
+    universe = {}
+    for entry in raw.split(','):
+        if not entry.strip():
+            continue
+        ticker, _, company = entry.partition(':')
+        universe[ticker.strip().upper()] = company.strip() or ticker.strip().upper()
+    return universe
+
+
+UNIVERSE = load_universe()
+TICKERS = list(UNIVERSE)
+COMPANIES = list(UNIVERSE.values())
+
+# Other names an article may use for a ticker, used when routing articles to tickers
+# (the company names above and bronze.auxiliary_table_tck_name are always included)
+ALIASES = {
+    'AAPL': ['iPhone'],
+    'META': ['Facebook', 'Instagram', 'WhatsApp'],
+}
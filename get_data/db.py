@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import psycopg2
+from psycopg2 import pool
+from dotenv import load_dotenv
+
+# Load environment variables (from the same folder)
+load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
+
+# Pool settings: a run reuses a few warm TLS connections instead of a handshake per step
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '5'))
+DB_POOL_PRE_PING = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+DB_POOL_RECYCLE_SECONDS = int(os.getenv('DB_POOL_RECYCLE_SECONDS', '1800'))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('DB_STATEMENT_TIMEOUT_MS', '300000'))
+DB_KEEPALIVE = os.getenv('DB_KEEPALIVE', 'true').lower() == 'true'
+# How long a caller waits for a free pooled connection before giving up
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '120'))
+
+_pool = None
+_pool_lock = threading.Lock()
+# ThreadedConnectionPool raises instead of waiting when it is exhausted: one slot per
+# connection makes callers (classify workers, writer, backfill threads) queue for a free one
+_pool_slots = threading.BoundedSemaphore(DB_POOL_MAX_SIZE)
+# Creation time per pooled connection, used for recycling
+_created_at = {}
+
+
+def connection_params() -> dict:
+    """
+    Returns the psycopg2 connection parameters shared by every script
+    """
+    params = {
+        'host': os.getenv('HOSTNAME'),
+        'port': os.getenv('PORT'),
+        'database': os.getenv('DATABASE'),
+        'user': os.getenv('DATABASE_USER', 'postgres'),
+        'password': os.getenv('DATABASE_PASS'),
+        'sslmode': os.getenv('DATABASE_SSLMODE', 'require'),
+        'options': f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}",
+    }
+    if DB_KEEPALIVE:
+        params.update({
+            'keepalives': 1,
+            'keepalives_idle': 30,
+            'keepalives_interval': 10,
+            'keepalives_count': 5,
+        })
+    return params
+
+
+def get_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = pool.ThreadedConnectionPool(DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, **connection_params())
+        return _pool
+
+
+def _is_usable(connection) -> bool:
+    """
+    Checks that a pooled connection is open, not too old and (optionally) answers a ping
+    """
+    if connection.closed:
+        return False
+    if time.time() - _created_at.get(id(connection), 0) > DB_POOL_RECYCLE_SECONDS:
+        return False
+    if DB_POOL_PRE_PING:
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            connection.rollback()
+        except psycopg2.Error:
+            return False
+    return True
+
+
+def get_db_connection():
+    """
+    Checks out a connection from the pool (recycling stale or broken ones), waiting up to
+    DB_POOL_TIMEOUT_SECONDS while every connection is in use.
+    Must be returned with release_db_connection.
+    """
+    if not _pool_slots.acquire(timeout=DB_POOL_TIMEOUT_SECONDS):
+        raise pool.PoolError(f"No database connection became free within {DB_POOL_TIMEOUT_SECONDS:.0f}s")
+    try:
+        connection_pool = get_pool()
+        for _ in range(DB_POOL_MAX_SIZE + 1):
+            connection = connection_pool.getconn()
+            _created_at.setdefault(id(connection), time.time())
+            if _is_usable(connection):
+                return connection
+            _created_at.pop(id(connection), None)
+            connection_pool.putconn(connection, close=True)
+        raise psycopg2.OperationalError("Could not obtain a usable database connection from the pool")
+    except Exception:
+        _pool_slots.release()
+        raise
+
+
+def release_db_connection(connection):
+    """
+    Returns a connection to the pool, discarding it if it was closed
+    """
+    if connection.closed:
+        _created_at.pop(id(connection), None)
+    try:
+        get_pool().putconn(connection, close=bool(connection.closed))
+    finally:
+        _pool_slots.release()
+
+
+@contextmanager
+def db_connection():
+    """
+    Context manager yielding a pooled connection.
+    Commits on success, rolls back on error and always returns the connection to the pool.
+    """
+    connection = get_db_connection()
+    try:
+        yield connection
+        connection.commit()
+    except Exception:
+        if not connection.closed:
+            connection.rollback()
+        raise
+    finally:
+        release_db_connection(connection)
+
+
+def close_pool():
+    """
+    Closes every pooled connection (end of a pipeline run)
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is not None and not _pool.closed:
+            _pool.closeall()
+        _pool = None
+        _created_at.clear()
+
+
+def get_engine():
+    """
+    Returns a SQLAlchemy engine with the same pooling, timeout and keepalive settings,
+    for pandas.read_sql based scripts (analytics)
+    """
+    from sqlalchemy import create_engine
+
+    params = connection_params()
+    connection_str = (
+        f"postgresql+psycopg2://{params.pop('user')}:{params.pop('password')}"
+        f"@{params.pop('host')}:{params.pop('port')}/{params.pop('database')}"
+    )
+    return create_engine(
+        connection_str,
+        pool_size=DB_POOL_MAX_SIZE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        pool_recycle=DB_POOL_RECYCLE_SECONDS,
+        connect_args=params
+    )
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from urllib3.util.retry import Retry
+from metrics import increment
+
+# On-disk response cache (next to the other local caches, ignored by git)
+HTTP_CACHE_DIR = os.path.join(os.path.dirname(__file__), '.cache', 'http')
+HTTP_CACHE_TTL_SECONDS = int(os.getenv('HTTP_CACHE_TTL_SECONDS', '3600'))
+HTTP_CACHE_MAX_AGE_SECONDS = int(os.getenv('HTTP_CACHE_MAX_AGE_SECONDS', str(7 * 86400)))
+
+# Query parameters that carry credentials: never part of the cache key or stored on disk
+SECRET_PARAMS = ('apiKey', 'token', 'api_key')
+
+# Transport-level retries only; 429s are handled by the rate limiter
+RETRY_POLICY = Retry(
+    total=3,
+    connect=3,
+    read=2,
+    backoff_factor=0.5,
+    status_forcelist=(500, 502, 503, 504),
+    allowed_methods=('GET',),
+    respect_retry_after_header=True,
+    raise_on_status=False
+)
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_pruned = False
+
+
+def get_session(url: str) -> requests.Session:
+    """
+    Returns the keep-alive session for the URL's host, so every call to a provider
+    reuses pooled TCP+TLS connections
+    """
+    host = urlsplit(url).netloc
+    with _sessions_lock:
+        if host not in _sessions:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=RETRY_POLICY)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers.update({'Accept-Encoding': 'gzip, deflate', 'User-Agent': 'newsdata-pipeline'})
+            _sessions[host] = session
+        return _sessions[host]
+
+
+def _cache_path(url: str, params: dict) -> str:
+    public_params = sorted((k, str(v)) for k, v in (params or {}).items() if k not in SECRET_PARAMS)
+    key = hashlib.sha256(json.dumps([url, public_params]).encode()).hexdigest()
+    return os.path.join(HTTP_CACHE_DIR, f"{key}.json")
+
+
+def _read_entry(path: str):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_entry(path: str, entry: dict):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+
+def _cached_response(entry: dict, url: str) -> requests.Response:
+    """
+    Rebuilds a requests.Response from a cache entry (X-Cache: HIT marks it as local)
+    """
+    response = requests.Response()
+    response.status_code = 200
+    response.url = url
+    response.encoding = 'utf-8'
+    response._content = entry['body'].encode('utf-8')
+    response.headers = CaseInsensitiveDict(entry.get('headers', {}))
+    response.headers['X-Cache'] = 'HIT'
+    return response
+
+
+def prune_cache(max_age_seconds: int = HTTP_CACHE_MAX_AGE_SECONDS):
+    """
+    Deletes cache entries not refreshed within max_age_seconds
+    """
+    if not os.path.isdir(HTTP_CACHE_DIR):
+        return
+    cutoff = time.time() - max_age_seconds
+    for name in os.listdir(HTTP_CACHE_DIR):
+        path = os.path.join(HTTP_CACHE_DIR, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_get(url: str, params: dict = None, ttl: int = HTTP_CACHE_TTL_SECONDS,
+               limiter=None, timeout: int = 30) -> requests.Response:
+    """
+    GET through the host's keep-alive session with an on-disk response cache.
+    Fresh entries (younger than ttl) are served locally without touching the network or
+    the rate limiter; stale entries are revalidated with If-None-Match/If-Modified-Since
+    when the provider sent an ETag/Last-Modified. Only 200 responses are cached.
+    """
+    global _pruned
+    if not _pruned:
+        _pruned = True
+        prune_cache()
+
+    host = urlsplit(url).netloc
+    path = _cache_path(url, params)
+    entry = _read_entry(path)
+    if entry and ttl > 0 and time.time() - entry['stored_at'] < ttl:
+        increment('http_cache_hits', host=host)
+        return _cached_response(entry, url)
+    increment('http_cache_misses', host=host)
+
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    session = get_session(url)
+    if limiter is not None:
+        response = limiter.call(session.get, url, params=params, headers=headers, timeout=timeout)
+    else:
+        response = session.get(url, params=params, headers=headers, timeout=timeout)
+
+    increment('http_responses', host=host, status=response.status_code)
+    if response.status_code == 304 and entry:
+        increment('http_cache_revalidated', host=host)
+        entry['stored_at'] = time.time()
+        _write_entry(path, entry)
+        return _cached_response(entry, url)
+
+    if response.status_code == 200 and ttl > 0:
+        _write_entry(path, {
+            'stored_at': time.time(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'headers': {'Content-Type': response.headers.get('Content-Type', 'application/json')},
+            'body': response.text,
+        })
+
+    return response
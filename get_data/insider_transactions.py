@@ -1,14 +1,28 @@
-import requests
 import pandas as pd
-import psycopg2
 import hashlib
 import os
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from db import db_connection
+from rate_limiter import get_limiter
+from http_client import cached_get, HTTP_CACHE_TTL_SECONDS, HTTP_CACHE_MAX_AGE_SECONDS
+from bulk_load import bulk_insert
+from row_prep import prepare_insider_rows
+from table_layout import ensure_table, ensure_monthly_partitions, is_partitioned
+from metrics import increment, run_metrics, span
+from config import TICKERS
 
 # Load environment variables (from the same folder)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 
+FINNHUB_INSIDER_URL = 'https://finnhub.io/api/v1/stock/insider-transactions'
+
+# Backfill progress, so an interrupted run resumes where it stopped
+DEFAULT_CHECKPOINT_PATH = os.path.join(os.path.dirname(__file__), '.cache', 'insider_backfill_checkpoint.json')
+
 def generate_hash(symbol: str, name: str, transaction_date: str, change: int, share: int) -> str:
     """
     Generates a unique hash based on symbol, name, transaction date, change and share
@@ -16,127 +30,98 @@ def generate_hash(symbol: str, name: str, transaction_date: str, change: int, sh
     hash_string = f"{symbol}_{name}_{transaction_date}_{change}_{share}"
     return hashlib.md5(hash_string.encode()).hexdigest()
 
-def get_db_connection():
-    """
-    Establishes connection with PostgreSQL database
-    """
-    try:
-        connection = psycopg2.connect(
-            host=os.getenv('HOSTNAME'),
-            port=os.getenv('PORT'),
-            database=os.getenv('DATABASE'),
-            user=os.getenv('DATABASE_USER', 'postgres'),
-            password=os.getenv('DATABASE_PASS'),
-            sslmode='require'
-        )
-        return connection
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        return None
-
 def insert_insider_data(df: pd.DataFrame):
     """
     Inserts insider transaction data into PostgreSQL database with duplicate checking
     """
-    connection = get_db_connection()
-    if not connection:
-        return False
-    
     try:
-        cursor = connection.cursor()
+        # Prepare data for insertion (columnar: dates parsed once per column, hashes match generate_hash)
+        insert_data = prepare_insider_rows(df)
         
-        # Create table if it doesn't exist
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS bronze.insider_transactions (
-            hash VARCHAR(32) PRIMARY KEY,
-            symbol VARCHAR(10) NOT NULL,
-            name TEXT,
-            share BIGINT,
-            change BIGINT,
-            filing_date DATE,
-            transaction_date DATE,
-            transaction_price NUMERIC(10, 2),
-            transaction_code VARCHAR(10),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """)
-        
-        # Prepare data for insertion
-        insert_data = []
-        for _, row in df.iterrows():
-            hash_key = generate_hash(
-                row['symbol'], 
-                row['name'], 
-                row['transactionDate'], 
-                row['change'],
-                row['share']
-            )
-            
-            # Handle transaction_date - API returns date string, not timestamp
-            transaction_date = pd.to_datetime(row['transactionDate']) if pd.notna(row['transactionDate']) else None
-            filing_date = pd.to_datetime(row['filingDate']) if pd.notna(row['filingDate']) else None
+        with db_connection() as connection:
+            # Partitioned layout: table, indexes and the monthly partitions this frame needs
+            ensure_table(connection, 'bronze.insider_transactions')
+            if is_partitioned(connection, 'bronze.insider_transactions'):
+                insert_data = fill_partition_dates(insert_data)
+            ensure_monthly_partitions(connection, 'bronze.insider_transactions', insert_data['transaction_date'])
             
-            insert_data.append((
-                hash_key,
-                row['symbol'],
-                row['name'],
-                row['share'],
-                row['change'],
-                filing_date,
-                transaction_date,
-                row['transactionPrice'],
-                row['transactionCode']
-            ))
-        
-        # Query to insert with ON CONFLICT (avoids duplicates)
-        insert_query = """
-        INSERT INTO bronze.insider_transactions (hash, symbol, name, share, change, filing_date, transaction_date, transaction_price, transaction_code)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (hash) DO NOTHING
-        """
-        
-        cursor.executemany(insert_query, insert_data)
-        connection.commit()
+            # Bulk load through COPY + staging table (duplicates are skipped by the hash key)
+            inserted, skipped = bulk_insert(
+                connection,
+                'bronze.insider_transactions',
+                list(insert_data.columns),
+                insert_data
+            )
         
-        print(f"Insider transaction data inserted into database successfully! {len(insert_data)} records processed.")
+        print(f"Insider transaction data inserted into database successfully! {len(insert_data)} records processed ({inserted} inserted, {skipped} skipped as duplicates).")
         return True
         
     except Exception as e:
         print(f"Error inserting data into database: {e}")
-        connection.rollback()
         return False
-    finally:
-        cursor.close()
-        connection.close()
+
+def fill_partition_dates(insert_data: pd.DataFrame) -> pd.DataFrame:
+    """
+    transaction_date is the partition key of the partitioned table (part of its primary key):
+    transactions without one are stored under their filing date (the hash keeps the missing date).
+    Rows without either date can't be stored and are counted as rejected.
+    """
+    missing_date = insert_data['transaction_date'].isna()
+    if missing_date.any():
+        filled = missing_date & insert_data['filing_date'].notna()
+        print(f"{filled.sum()} transactions without a transaction date stored under their filing date")
+        increment('rows_date_fallback', int(filled.sum()), table='bronze.insider_transactions')
+        insert_data = insert_data.assign(transaction_date=insert_data['transaction_date'].fillna(insert_data['filing_date']))
+
+    missing_date = insert_data['transaction_date'].isna()
+    if missing_date.any():
+        print(f"Skipping {missing_date.sum()} transactions without a transaction or filing date")
+        increment('rows_rejected', int(missing_date.sum()), table='bronze.insider_transactions')
+        insert_data = insert_data[~missing_date]
+    return insert_data
+
+def fetch_insider_transactions(symbol: str, date_from: str, date_to: str,
+                               cache_ttl: int = HTTP_CACHE_TTL_SECONDS) -> pd.DataFrame:
+    """
+    Fetches insider transactions of one symbol between two dates (inclusive) from Finnhub.
+    Responses younger than cache_ttl are served from the local HTTP cache.
+    Raises on request errors so callers can decide whether to retry or skip.
+    """
+    params = {
+        'symbol': symbol,
+        'token': os.getenv('API_KEY_TRADEOFF'),
+        'from': date_from,
+        'to': date_to
+    }
+    
+    with span('fetch_symbol', provider='finnhub'):
+        response = cached_get(FINNHUB_INSIDER_URL, params=params, ttl=cache_ttl, limiter=get_limiter('finnhub'), timeout=10)
+        response.raise_for_status()
+        data = response.json()
+    
+    if 'data' in data and data['data']:
+        df = pd.DataFrame(data['data'])
+        df['symbol'] = symbol
+        increment('transactions_fetched', len(df), provider='finnhub')
+        return df
+    return pd.DataFrame()
 
 def get_insider_transactions(symbols: list, save_to_db: bool = True, filename: str = "raw_data/insider_transactions.csv"):
     all_data = []
     
-    api_key = os.getenv('API_KEY_TRADEOFF')
     yesterday = date.today() - timedelta(days=1)
     date_filter_str = yesterday.strftime('%Y-%m-%d')
     for symbol in symbols:
         print(f"Downloading data for {symbol}...")
-        url = 'https://finnhub.io/api/v1/stock/insider-transactions'
-        params = {
-            'symbol': symbol,
-            'token': api_key,
-            'from': date_filter_str,
-            'to': date_filter_str
-        }
         
         try:
-            response = requests.get(url, params=params, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            if 'data' in data and data['data']:
-                df = pd.DataFrame(data['data'])
-                df['symbol'] = symbol
+            df = fetch_insider_transactions(symbol, date_filter_str, date_filter_str)
+            if not df.empty:
                 all_data.append(df)
                 print(f"  Found {len(df)} transactions")
         except Exception as e:
             print(f"  Error fetching data for {symbol}: {e}")
+            increment('fetch_failures', provider='finnhub')
     
     # Combine all DataFrames
     if all_data:
@@ -148,6 +133,7 @@ def get_insider_transactions(symbols: list, save_to_db: bool = True, filename: s
             if success:
                 print("Data saved to PostgreSQL database!")
             else:
+                increment('write_failures', table='bronze.insider_transactions')
                 print("Error saving to database. Saving as CSV...")
                 df_combined.to_csv(filename, index=False)
                 print(f"Data saved to: {filename}")
@@ -161,6 +147,115 @@ def get_insider_transactions(symbols: list, save_to_db: bool = True, filename: s
         print("No data collected")
         return pd.DataFrame()
 
-# Usage
-symbols = ["AAPL", "META", "NVDA", "NFLX"]
-df = get_insider_transactions(symbols, save_to_db=True)
+def split_date_range(start: date, end: date, chunk_days: int) -> list:
+    """
+    Splits [start, end] into consecutive (chunk_start, chunk_end) windows of at most chunk_days days
+    """
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end)
+        chunks.append((chunk_start, chunk_end))
+        chunk_start = chunk_end + timedelta(days=1)
+    return chunks
+
+def _load_checkpoint(path: str, run_key: str) -> set:
+    """
+    Returns the completed 'symbol|chunk_start' keys of a previous run over the same range
+    """
+    try:
+        with open(path) as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if checkpoint.get('run') != run_key:
+        return set()
+    return set(checkpoint.get('done', []))
+
+def _save_checkpoint(path: str, run_key: str, done: set):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({'run': run_key, 'done': sorted(done)}, f)
+    os.replace(tmp_path, path)
+
+def backfill_insider_transactions(symbols: list, start: date, end: date, chunk_days: int = 90,
+                                  max_workers: int = 4, checkpoint_path: str = DEFAULT_CHECKPOINT_PATH):
+    """
+    Loads insider transactions for a date range, one date chunk at a time.
+    Symbols of a chunk are fetched in parallel under the shared Finnhub rate budget,
+    each chunk is written to bronze.insider_transactions before the next one starts
+    (bounded memory), and completed (symbol, chunk) pairs are checkpointed so an
+    interrupted backfill resumes where it stopped.
+    """
+    run_key = f"{start.isoformat()}:{end.isoformat()}:{chunk_days}"
+    done = _load_checkpoint(checkpoint_path, run_key)
+    chunks = split_date_range(start, end, chunk_days)
+    if done:
+        print(f"Resuming backfill: {len(done)} of {len(chunks) * len(symbols)} symbol chunks already loaded")
+    
+    total_rows = 0
+    failed = []
+    
+    for chunk_start, chunk_end in chunks:
+        pending = [symbol for symbol in symbols if f"{symbol}|{chunk_start.isoformat()}" not in done]
+        if not pending:
+            continue
+        
+        date_from, date_to = chunk_start.isoformat(), chunk_end.isoformat()
+        # Old windows no longer change (filings are due within days), so they can be cached longer
+        cache_ttl = HTTP_CACHE_MAX_AGE_SECONDS if chunk_end < date.today() - timedelta(days=7) else HTTP_CACHE_TTL_SECONDS
+        print(f"\nBackfilling {date_from} to {date_to} for {len(pending)} symbols...")
+        
+        def fetch(symbol):
+            try:
+                return symbol, fetch_insider_transactions(symbol, date_from, date_to, cache_ttl=cache_ttl)
+            except Exception as e:
+                print(f"  Error fetching data for {symbol}: {e}")
+                increment('fetch_failures', provider='finnhub')
+                return symbol, None
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(fetch, pending))
+        
+        fetched = [symbol for symbol, df in results if df is not None]
+        failed.extend(f"{symbol} {date_from}" for symbol, df in results if df is None)
+        frames = [df for _, df in results if df is not None and not df.empty]
+        
+        if frames:
+            df_chunk = pd.concat(frames, ignore_index=True)
+            if not insert_insider_data(df_chunk):
+                # Leave the chunk unmarked so the next run retries it
+                failed.extend(f"{symbol} {date_from}" for symbol in fetched)
+                continue
+            total_rows += len(df_chunk)
+        
+        done.update(f"{symbol}|{date_from}" for symbol in fetched)
+        _save_checkpoint(checkpoint_path, run_key, done)
+    
+    print(f"\nBackfill finished: {total_rows} transactions processed")
+    if failed:
+        print(f"{len(failed)} symbol chunks failed and will be retried on the next run: {', '.join(failed[:10])}")
+    return total_rows
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Loads insider transactions from Finnhub into bronze.insider_transactions")
+    parser.add_argument('--start', help="Backfill start date (YYYY-MM-DD); without it only yesterday is loaded")
+    parser.add_argument('--end', help="Backfill end date (YYYY-MM-DD), defaults to yesterday")
+    parser.add_argument('--chunk-days', type=int, default=90, help="Days per Finnhub request")
+    parser.add_argument('--workers', type=int, default=4, help="Symbols fetched in parallel")
+    parser.add_argument('--symbols', nargs='+', default=TICKERS)
+    args = parser.parse_args()
+    
+    with run_metrics('insider_transactions'):
+        if args.start:
+            end = datetime.strptime(args.end, '%Y-%m-%d').date() if args.end else date.today() - timedelta(days=1)
+            backfill_insider_transactions(
+                args.symbols,
+                datetime.strptime(args.start, '%Y-%m-%d').date(),
+                end,
+                chunk_days=args.chunk_days,
+                max_workers=args.workers
+            )
+        else:
+            df = get_insider_transactions(args.symbols, save_to_db=True)
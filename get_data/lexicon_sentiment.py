@@ -0,0 +1,107 @@
+import os
+import re
+import pandas as pd
+from sentiment_cache import normalize_text
+
+# Local first tier of the sentiment classifier: a finance lexicon scored over whole
+# columns with vectorized regex counts. Only headlines it is confident about skip the LLM:
+# the confidence must reach the threshold and the winning side needs at least one strong term.
+LEXICON_CONFIDENCE_THRESHOLD = float(os.getenv('LEXICON_CONFIDENCE_THRESHOLD', '0.75'))
+
+# Phrases and words matched on normalized text (lowercase, punctuation removed).
+# Strong terms (weight 2) are unambiguous on their own; weak terms (weight 1) only add support,
+# since alone they are often ambiguous ('fined', 'growth delayed').
+LEXICON = {
+    'good': {
+        2: [
+            'beats estimates', 'beat estimates', 'beats expectations', 'beat expectations',
+            'tops estimates', 'record revenue', 'record profit', 'record quarter',
+            'raises guidance', 'raised guidance', 'raises outlook', 'raises forecast',
+            'upgraded', 'upgrades to buy', 'all time high', 'record high',
+            'shares soar', 'stock soars', 'shares surge', 'stock surges', 'shares jump', 'stock jumps',
+            'share buyback', 'stock buyback', 'dividend increase', 'raises dividend',
+        ],
+        1: [
+            'soars', 'surges', 'jumps', 'rallies', 'climbs', 'gains', 'rises', 'rebounds',
+            'upgrade', 'outperform', 'bullish', 'strong demand', 'growth', 'profit', 'wins',
+            'approval', 'approved', 'partnership', 'expands', 'breakthrough', 'beats',
+        ],
+    },
+    'bad': {
+        2: [
+            'misses estimates', 'missed estimates', 'misses expectations', 'missed expectations',
+            'cuts guidance', 'cut guidance', 'lowers guidance', 'lowers outlook', 'cuts forecast',
+            'downgraded', 'downgrades to sell', 'shares plunge', 'stock plunges', 'shares tumble',
+            'stock tumbles', 'shares sink', 'stock sinks', 'shares slump', 'stock crashes',
+            'files for bankruptcy', 'fraud charges', 'class action', 'mass layoffs', 'product recall',
+            'antitrust lawsuit', 'sec investigation', 'data breach',
+        ],
+        1: [
+            'plunges', 'plunge', 'tumbles', 'sinks', 'slumps', 'falls', 'drops', 'declines', 'slides',
+            'downgrade', 'underperform', 'bearish', 'lawsuit', 'sued', 'probe', 'investigation',
+            'layoffs', 'recall', 'fine', 'fined', 'penalty', 'loss', 'losses', 'weak', 'warns',
+            'bankruptcy', 'fraud', 'antitrust', 'ban', 'delay', 'misses',
+        ],
+    },
+}
+
+def _pattern(terms: list) -> str:
+    """
+    One alternation per label and weight, longest phrases first, matched on word boundaries
+    """
+    escaped = sorted((re.escape(term) for term in terms), key=len, reverse=True)
+    return r'\b(?:' + '|'.join(escaped) + r')\b'
+
+
+_PATTERNS = {
+    label: {weight: _pattern(terms) for weight, terms in weights.items()}
+    for label, weights in LEXICON.items()
+}
+
+
+def _normalize(texts: pd.Series) -> pd.Series:
+    return texts.map(normalize_text)
+
+
+def _hits(texts: pd.Series, label: str) -> tuple:
+    """
+    Counts of the label's strong and weak terms found in each text; a phrase counts once even
+    when it contains a weaker word (strong matches are removed before weak ones are counted)
+    """
+    strong, weak = _PATTERNS[label][2], _PATTERNS[label][1]
+    strong_hits = texts.str.count(strong)
+    weak_hits = texts.str.replace(strong, ' ', regex=True).str.count(weak)
+    return strong_hits, weak_hits
+
+
+def score_texts(titles: pd.Series, descriptions: pd.Series = None,
+                threshold: float = LEXICON_CONFIDENCE_THRESHOLD) -> pd.DataFrame:
+    """
+    Scores headlines (plus optional descriptions) against the lexicon.
+    Returns a frame aligned with `titles` with columns:
+      label       'good' / 'bad', or None when the lexicon isn't confident (neutral is left to the LLM)
+      confidence  |good - bad| / (good + bad + 1), 0 when nothing matched
+    Strong terms weigh 2 and weak ones 1; title hits weigh double, since the headline carries
+    the story's direction. A label also needs a strong term on its side, so weak terms alone
+    never skip the LLM.
+    """
+    texts = [(_normalize(titles), 2)]
+    if descriptions is not None:
+        texts.append((_normalize(descriptions), 1))
+
+    scores = {}
+    for side in ('good', 'bad'):
+        score = strong_total = 0
+        for text, weight in texts:
+            strong_hits, weak_hits = _hits(text, side)
+            score = score + weight * (2 * strong_hits + weak_hits)
+            strong_total = strong_total + strong_hits
+        scores[side] = (score, strong_total)
+    (good, good_strong), (bad, bad_strong) = scores['good'], scores['bad']
+
+    confidence = (good - bad).abs() / (good + bad + 1)
+    label = pd.Series(None, index=titles.index, dtype=object)
+    confident = confidence >= threshold
+    label[confident & (good > bad) & (good_strong > 0)] = 'good'
+    label[confident & (bad > good) & (bad_strong > 0)] = 'bad'
+    return pd.DataFrame({'label': label, 'confidence': confidence.round(4)}, index=titles.index)
@@ -0,0 +1,238 @@
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+# Run instrumentation shared by the ingestion scripts and analytics: timing spans per stage
+# and external call, counters (rows, cache hits, retries, 429s, LLM tokens), written at the
+# end of a run as a JSON run log and a Prometheus textfile (node_exporter textfile collector).
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(os.path.dirname(__file__), '..', 'logs', 'metrics'))
+METRICS_TEXTFILE_DIR = os.getenv('METRICS_TEXTFILE_DIR', METRICS_DIR)
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+
+# Individual spans kept in the run log; totals per span name are always complete
+MAX_SPANS = int(os.getenv('METRICS_MAX_SPANS', '5000'))
+
+_lock = threading.Lock()
+_run = None
+# Report of the last run_metrics() block, for callers that act on its counters
+last_report = None
+
+
+def _label_key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+
+def _new_run(script: str) -> dict:
+    return {
+        'script': script,
+        'run_id': f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}",
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'start': time.perf_counter(),
+        'spans': [],
+        'dropped_spans': 0,
+        'span_totals': defaultdict(lambda: {'count': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0}),
+        'counters': defaultdict(float),
+    }
+
+
+def _current() -> dict:
+    """
+    Returns the active run, starting an anonymous one for code used outside run_metrics()
+    """
+    global _run
+    if _run is None:
+        _run = _new_run('adhoc')
+    return _run
+
+
+def increment(name: str, value: float = 1, **labels):
+    """
+    Adds value to the counter `name` with the given labels (e.g. provider='newsapi')
+    """
+    if not METRICS_ENABLED or not value:
+        return
+    with _lock:
+        _current()['counters'][_label_key(name, labels)] += value
+
+
+@contextmanager
+def span(name: str, **labels):
+    """
+    Times the enclosed block as one span of `name`; exceptions are counted as errors and re-raised
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.perf_counter() - start
+        with _lock:
+            run = _current()
+            totals = run['span_totals'][_label_key(name, labels)]
+            totals['count'] += 1
+            totals['seconds'] += seconds
+            totals['max_seconds'] = max(totals['max_seconds'], seconds)
+            if error:
+                totals['errors'] += 1
+            if len(run['spans']) < MAX_SPANS:
+                run['spans'].append({
+                    'name': name,
+                    'labels': labels,
+                    'offset_seconds': round(start - run['start'], 6),
+                    'seconds': round(seconds, 6),
+                    'error': error,
+                })
+            else:
+                run['dropped_spans'] += 1
+
+
+def record_llm_usage(provider: str, usage):
+    """
+    Counts the prompt/completion tokens of an LLM response's usage block
+    """
+    if usage is None:
+        return
+    increment('llm_prompt_tokens', getattr(usage, 'prompt_tokens', 0) or 0, provider=provider)
+    increment('llm_completion_tokens', getattr(usage, 'completion_tokens', 0) or 0, provider=provider)
+    increment('llm_requests', provider=provider)
+
+
+def run_report(status: str = 'success') -> dict:
+    """
+    The active run as a JSON-serializable dict
+    """
+    with _lock:
+        run = _current()
+        return {
+            'script': run['script'],
+            'run_id': run['run_id'],
+            'started_at': run['started_at'],
+            'duration_seconds': round(time.perf_counter() - run['start'], 6),
+            'status': status,
+            'span_totals': [
+                {'name': name, 'labels': dict(labels), **{k: round(v, 6) for k, v in totals.items()}}
+                for (name, labels), totals in sorted(run['span_totals'].items())
+            ],
+            'counters': [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(run['counters'].items())
+            ],
+            'spans': list(run['spans']),
+            'dropped_spans': run['dropped_spans'],
+        }
+
+
+def _prometheus_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    escaped = (
+        f'{k}="' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+        for k, v in sorted(labels.items())
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def prometheus_text(report: dict) -> str:
+    """
+    Renders a run report in the Prometheus text exposition format
+    """
+    script = {'script': report['script']}
+    lines = [
+        '# HELP newsdata_run_duration_seconds Wall time of the last run',
+        '# TYPE newsdata_run_duration_seconds gauge',
+        f"newsdata_run_duration_seconds{_prometheus_labels(script)} {report['duration_seconds']}",
+        '# HELP newsdata_run_success 1 if the last run finished without errors',
+        '# TYPE newsdata_run_success gauge',
+        f"newsdata_run_success{_prometheus_labels(script)} {1 if report['status'] == 'success' else 0}",
+        '# HELP newsdata_run_timestamp_seconds Unix time the last run finished',
+        '# TYPE newsdata_run_timestamp_seconds gauge',
+        f"newsdata_run_timestamp_seconds{_prometheus_labels(script)} {int(time.time())}",
+        '# HELP newsdata_stage_seconds Total time spent per stage/call in the last run',
+        '# TYPE newsdata_stage_seconds gauge',
+    ]
+    for totals in report['span_totals']:
+        labels = _prometheus_labels({**script, 'stage': totals['name'], **totals['labels']})
+        lines.append(f"newsdata_stage_seconds{labels} {totals['seconds']}")
+    lines += ['# HELP newsdata_stage_calls Number of spans per stage/call in the last run', '# TYPE newsdata_stage_calls gauge']
+    for totals in report['span_totals']:
+        labels = _prometheus_labels({**script, 'stage': totals['name'], **totals['labels']})
+        lines.append(f"newsdata_stage_calls{labels} {totals['count']}")
+    lines += ['# HELP newsdata_stage_errors Failed spans per stage/call in the last run', '# TYPE newsdata_stage_errors gauge']
+    for totals in report['span_totals']:
+        labels = _prometheus_labels({**script, 'stage': totals['name'], **totals['labels']})
+        lines.append(f"newsdata_stage_errors{labels} {totals['errors']}")
+
+    for name in sorted({counter['name'] for counter in report['counters']}):
+        lines += [f'# HELP newsdata_{name} Counter {name} for the last run', f'# TYPE newsdata_{name} gauge']
+        for counter in report['counters']:
+            if counter['name'] == name:
+                lines.append(f"newsdata_{name}{_prometheus_labels({**script, **counter['labels']})} {counter['value']}")
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path: str, content: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+
+
+def write_run(status: str = 'success') -> dict:
+    """
+    Writes the run log (<METRICS_DIR>/runs/<script>_<run_id>.json) and the Prometheus
+    textfile (<METRICS_TEXTFILE_DIR>/newsdata_<script>.prom); returns the report
+    """
+    report = run_report(status)
+    if not METRICS_ENABLED:
+        return report
+    try:
+        _write_atomic(
+            os.path.join(METRICS_DIR, 'runs', f"{report['script']}_{report['run_id']}.json"),
+            json.dumps(report, indent=2, default=str)
+        )
+        _write_atomic(
+            os.path.join(METRICS_TEXTFILE_DIR, f"newsdata_{report['script']}.prom"),
+            prometheus_text(report)
+        )
+    except OSError as e:
+        print(f"Could not write run metrics: {e}")
+    return report
+
+
+def counter_total(report: dict, name: str) -> float:
+    """
+    Sum of a counter over all its labels in a run report
+    """
+    return sum(counter['value'] for counter in report['counters'] if counter['name'] == name)
+
+
+@contextmanager
+def run_metrics(script: str):
+    """
+    Instruments a whole script run: starts a fresh run, yields it, and writes the run log and
+    Prometheus textfile when the block ends (status 'error' if it raised)
+    """
+    global _run, last_report
+    with _lock:
+        _run = _new_run(script)
+    status = 'success'
+    try:
+        yield _run
+    except BaseException:
+        status = 'error'
+        raise
+    finally:
+        report = last_report = write_run(status)
+        print(f"Run metrics: {report['duration_seconds']:.1f}s, {len(report['span_totals'])} stages -> {METRICS_DIR}")
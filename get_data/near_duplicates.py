@@ -0,0 +1,239 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+import numpy as np
+import pandas as pd
+from metrics import increment
+from sentiment_cache import normalize_text
+
+# Local index file (next to the ingestion scripts, ignored by git)
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(__file__), '.cache', 'near_duplicates.sqlite3')
+
+# MinHash over word 3-shingles of title + description, indexed with LSH bands.
+# 32 bands of 4 rows make articles with a Jaccard similarity above ~0.5 likely candidates;
+# candidates only join a cluster when their estimated similarity reaches NEAR_DUPLICATE_THRESHOLD
+# and they were published within NEAR_DUPLICATE_WINDOW_HOURS of each other.
+MINHASH_PERMUTATIONS = 128
+LSH_BANDS = 32
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.7'))
+NEAR_DUPLICATE_WINDOW_HOURS = float(os.getenv('NEAR_DUPLICATE_WINDOW_HOURS', '72'))
+
+# Universal hashing (a * x + b) mod p with the Mersenne prime p = 2**31 - 1: with x reduced
+# mod p first and a, b < p, a * x + b stays below 2**63, so the uint64 arithmetic never wraps.
+# The seed is fixed: signatures stored by earlier runs must stay comparable.
+_PRIME = np.uint64(2**31 - 1)
+_random = np.random.RandomState(20240601)
+_A = _random.randint(1, 2**31 - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_B = _random.randint(0, 2**31 - 1, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text: str) -> set:
+    """
+    Word n-grams of already normalized text (the words themselves for very short texts)
+    """
+    words = text.split()
+    if len(words) < SHINGLE_SIZE:
+        return set(words)
+    return {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """
+    MinHash signature of the shingles of normalized, non-empty text: one minimum per
+    permutation, computed for all permutations at once
+    """
+    values = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles(text)), dtype=np.uint64) % _PRIME
+    return ((values[:, None] * _A + _B) % _PRIME).min(axis=0)
+
+
+def band_buckets(signature: np.ndarray) -> list:
+    """
+    LSH bucket keys of a signature, one per band
+    """
+    rows = MINHASH_PERMUTATIONS // LSH_BANDS
+    return [
+        f"{band}:{hashlib.md5(signature[band * rows:(band + 1) * rows].tobytes()).hexdigest()[:16]}"
+        for band in range(LSH_BANDS)
+    ]
+
+
+def _timestamps(values) -> list:
+    """
+    Publication times as epoch seconds (None when missing or unparseable)
+    """
+    parsed = pd.to_datetime(pd.Series(list(values)), errors='coerce', utc=True)
+    return [None if pd.isna(value) else value.timestamp() for value in parsed]
+
+
+class NearDuplicateIndex:
+    """
+    Persistent MinHash/LSH index that groups republished copies of the same story
+    (reworded titles, other outlets, shifted timestamps) into clusters.
+    A cluster id is the hash of the first article seen in it; the index also keeps the
+    sentiment given to each cluster, so later copies are not classified again.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                 window_hours: float = NEAR_DUPLICATE_WINDOW_HOURS, max_age_days: int = 30):
+        self.path = path
+        self.threshold = threshold
+        self.window_seconds = window_hours * 3600
+        self.max_age_seconds = max_age_days * 86400
+        self.stats = {'articles': 0, 'duplicates': 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The async pipeline assigns clusters from worker threads, so access is serialized with a lock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS articles (
+                key TEXT PRIMARY KEY,
+                cluster_id TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                published_at REAL,
+                stored_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS articles_stored_at ON articles (stored_at);
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket TEXT NOT NULL,
+                key TEXT NOT NULL,
+                PRIMARY KEY (bucket, key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (key);
+            CREATE TABLE IF NOT EXISTS clusters (
+                cluster_id TEXT PRIMARY KEY,
+                sentiment TEXT NOT NULL,
+                confidence REAL,
+                stored_at REAL NOT NULL
+            );
+        """)
+        self._db.commit()
+
+    def _candidates(self, buckets: list) -> list:
+        """
+        Returns (key, cluster_id, signature, published_at) of indexed articles sharing a bucket
+        """
+        placeholders = ",".join("?" * len(buckets))
+        return self._db.execute(f"""
+            SELECT key, cluster_id, signature, published_at FROM articles
+            WHERE key IN (SELECT DISTINCT key FROM buckets WHERE bucket IN ({placeholders}))
+        """, buckets).fetchall()
+
+    def _match(self, signature: np.ndarray, published_at, candidates: list):
+        """
+        Cluster id of the most similar candidate above the threshold and inside the time window, or None
+        """
+        best_cluster, best_similarity = None, self.threshold
+        for _, cluster_id, stored_signature, stored_published_at in candidates:
+            if published_at is not None and stored_published_at is not None \
+                    and abs(published_at - stored_published_at) > self.window_seconds:
+                continue
+            similarity = float(np.mean(np.frombuffer(stored_signature, dtype=np.uint64) == signature))
+            if similarity >= best_similarity:
+                best_cluster, best_similarity = cluster_id, similarity
+        return best_cluster
+
+    def assign(self, keys: list, titles, descriptions, published_at) -> list:
+        """
+        Returns the cluster id of each article (aligned with keys) and indexes the new ones.
+        Articles are indexed one by one, so copies inside the same batch find each other.
+        """
+        with self._lock:
+            return self._assign(list(keys), list(titles), list(descriptions), _timestamps(published_at))
+
+    def _assign(self, keys, titles, descriptions, timestamps):
+        known = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            known.update(self._db.execute(
+                f"SELECT key, cluster_id FROM articles WHERE key IN ({placeholders})", chunk
+            ).fetchall())
+
+        now = time.time()
+        cluster_ids = []
+        duplicates = 0
+        for key, title, description, published_at in zip(keys, titles, descriptions, timestamps):
+            text = normalize_text(title, description)
+            if key in known or not text:
+                cluster_ids.append(known.get(key, key))
+                continue
+
+            signature = minhash_signature(text)
+            buckets = band_buckets(signature)
+            cluster_id = self._match(signature, published_at, self._candidates(buckets)) or key
+            self._db.execute(
+                "INSERT INTO articles (key, cluster_id, signature, published_at, stored_at) VALUES (?, ?, ?, ?, ?)",
+                (key, cluster_id, signature.tobytes(), published_at, now)
+            )
+            self._db.executemany("INSERT OR IGNORE INTO buckets (bucket, key) VALUES (?, ?)",
+                                 [(bucket, key) for bucket in buckets])
+
+            known[key] = cluster_id
+            cluster_ids.append(cluster_id)
+            self.stats['articles'] += 1
+            if cluster_id != key:
+                duplicates += 1
+
+        self._db.commit()
+        self.stats['duplicates'] += duplicates
+        increment('near_duplicate_articles', duplicates)
+        return cluster_ids
+
+    def labels(self, cluster_ids) -> dict:
+        """
+        Returns {cluster_id: (sentiment, confidence)} for clusters already classified
+        """
+        cluster_ids = list(set(cluster_ids))
+        found = {}
+        with self._lock:
+            for start in range(0, len(cluster_ids), 500):
+                chunk = cluster_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db.execute(
+                    f"SELECT cluster_id, sentiment, confidence FROM clusters WHERE cluster_id IN ({placeholders})", chunk
+                ).fetchall()
+                found.update((cluster_id, (sentiment, confidence)) for cluster_id, sentiment, confidence in rows)
+        return found
+
+    def set_labels(self, entries):
+        """
+        Stores (cluster_id, sentiment, confidence) entries; the first label of a cluster is kept
+        """
+        now = time.time()
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO clusters (cluster_id, sentiment, confidence, stored_at) VALUES (?, ?, ?, ?)",
+                [(cluster_id, sentiment, confidence, now) for cluster_id, sentiment, confidence in entries]
+            )
+            self._db.commit()
+
+    def evict(self):
+        """
+        Drops articles indexed more than max_age_days ago, with their buckets and orphaned clusters
+        """
+        with self._lock:
+            min_stored_at = time.time() - self.max_age_seconds
+            self._db.execute(
+                "DELETE FROM buckets WHERE key IN (SELECT key FROM articles WHERE stored_at < ?)", (min_stored_at,)
+            )
+            self._db.execute("DELETE FROM articles WHERE stored_at < ?", (min_stored_at,))
+            self._db.execute("DELETE FROM clusters WHERE cluster_id NOT IN (SELECT DISTINCT cluster_id FROM articles)")
+            self._db.commit()
+
+    def summary(self) -> str:
+        """
+        Returns a printable summary of the articles indexed in this run
+        """
+        articles, duplicates = self.stats['articles'], self.stats['duplicates']
+        rate = (duplicates / articles * 100) if articles else 0.0
+        return f"Near-duplicates: {duplicates}/{articles} new articles joined an existing story ({rate:.1f}%)"
+
+    def close(self):
+        with self._lock:
+            self.evict()
+            self._db.close()
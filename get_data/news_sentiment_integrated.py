@@ -1,12 +1,26 @@
 import requests
 import os
+import argparse
+import asyncio
 import pandas as pd
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
-import time
-import psycopg2
 import hashlib
+import json
+from collections import Counter
 from groq import Groq
+from sentiment_cache import SentimentCache, text_digest
+from lexicon_sentiment import score_texts
+from near_duplicates import NearDuplicateIndex
+from ticker_router import build_query_batches, build_router
+from db import db_connection
+from rate_limiter import QuotaExceededError, get_limiter
+from http_client import cached_get
+from bulk_load import bulk_insert
+from row_prep import prepare_news_rows
+from table_layout import ensure_table, ensure_monthly_partitions, is_partitioned
+from metrics import increment, record_llm_usage, run_metrics, span
+from config import COMPANIES, UNIVERSE
 
 # Load environment variables from .env file (in the same folder)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
@@ -15,12 +29,46 @@ load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
 API_KEY_NEWS = os.getenv('API_KEY_NEWS')
 API_GROQ = os.getenv('API_GROQ')
 
-# List of companies to search
-companies = ["Apple", "Meta", "Nvidia", "Netflix"]
+# List of companies to search (shared ticker universe, see config.py)
+companies = COMPANIES
+COMPANY_TICKERS = {company: ticker for ticker, company in UNIVERSE.items()}
+
+# Sentiment model and batch classification settings
+SENTIMENT_MODEL = "openai/gpt-oss-20b"
+SENTIMENT_LABELS = ("good", "bad", "neutral")
+SENTIMENT_BATCH_SIZE = int(os.getenv('SENTIMENT_BATCH_SIZE', '25'))
+
+# Async pipeline settings (concurrency per stage)
+NEWS_FETCH_CONCURRENCY = int(os.getenv('NEWS_FETCH_CONCURRENCY', '4'))
+NEWS_CLASSIFY_CONCURRENCY = int(os.getenv('NEWS_CLASSIFY_CONCURRENCY', '2'))
+NEWS_WRITE_BATCH_SIZE = int(os.getenv('NEWS_WRITE_BATCH_SIZE', '100'))
+
+# NewsAPI pagination (pages are fetched until the results run out or a cap is reached).
+# NEWS_MAX_RESULTS is the plan's limit on results per query: the developer plan rejects
+# any page past the first 100 results, so requesting it only wastes daily quota.
+NEWS_PAGE_SIZE = int(os.getenv('NEWS_PAGE_SIZE', '100'))
+NEWS_MAX_PAGES = int(os.getenv('NEWS_MAX_PAGES', '5'))
+NEWS_MAX_RESULTS = int(os.getenv('NEWS_MAX_RESULTS', '100'))
+NEWS_BACKUP_FILE = 'raw_data/news_data_with_sentiment_backup.csv'
+
+# Columns a later run may overwrite on an article stored with a fallback label; created_at is
+# reset to its default so the incremental Silver model picks the new label up
+NEWS_RELABEL_COLUMNS = ('sentiment', 'sentiment_tier', 'sentiment_confidence', 'cluster_id', 'created_at')
+
+# 'company': one query per company; 'fan_in': companies packed into OR-queries and
+# each article routed to the tickers it mentions (see ticker_router)
+NEWS_FETCH_MODE = os.getenv('NEWS_FETCH_MODE', 'company')
 
 # Groq client configuration
 groq_client = Groq(api_key=API_GROQ)
 
+# Shared quota-aware limiters (replace the fixed sleeps between calls)
+newsapi_limiter = get_limiter('newsapi')
+groq_limiter = get_limiter('groq')
+
+# Rough allowance for the reply (including reasoning) when estimating LLM tokens per call
+SENTIMENT_REPLY_TOKENS = 200
+
 def generate_hash(company: str, title: str, published_at: str) -> str:
     """
     Generates a unique hash based on company, title and publication date
@@ -28,223 +76,609 @@ def generate_hash(company: str, title: str, published_at: str) -> str:
     hash_string = f"{company}_{title}_{published_at}"
     return hashlib.md5(hash_string.encode()).hexdigest()
 
-def get_db_connection():
+def _chat_completion(prompt: str, **kwargs):
+    """
+    Sends a single-message chat completion through the Groq limiter.
+    The raw response is requested so the limiter can adapt from the rate-limit headers.
+    """
+    estimated_tokens = len(prompt) // 4 + SENTIMENT_REPLY_TOKENS
+    raw_response = groq_limiter.call(
+        groq_client.chat.completions.with_raw_response.create,
+        model=SENTIMENT_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.0,
+        tokens=estimated_tokens,
+        **kwargs
+    )
+    response = raw_response.parse()
+    record_llm_usage('groq', getattr(response, 'usage', None))
+    return response
+
+def _single_label(news_text):
     """
-    Establishes connection with PostgreSQL database
+    Classifies a single news item; returns None when the reply isn't a label.
+    API errors (transport, rate limit, quota) are raised.
+    """
+    response = _chat_completion(
+        f'Is the following news headline good, bad orneutral? Headline: {news_text}. Only answer with "good", "bad" or neutral.'
+    )
+    label = (response.choices[0].message.content or '').strip().lower()
+    return label if label in SENTIMENT_LABELS else None
+
+def _classify_single(news_text):
+    """
+    Classifies a single news item; returns None when the call fails or the reply isn't a label
     """
     try:
-        connection = psycopg2.connect(
-            host=os.getenv('HOSTNAME'),
-            port=os.getenv('PORT'),
-            database=os.getenv('DATABASE'),
-            user=os.getenv('DATABASE_USER', 'postgres'),
-            password=os.getenv('DATABASE_PASS'),
-            sslmode='require'
-        )
-        return connection
+        return _single_label(news_text)
     except Exception as e:
-        print(f"Error connecting to database: {e}")
+        print(f"Error analyzing sentiment: {e}")
         return None
 
 def analyze_news_sentiment(news_text):
     """
     Analyzes a single news item and returns 'good', 'bad' or 'neutral'
     """
+    return _classify_single(news_text) or "neutral"
+
+def _parse_batch_labels(content, expected_count):
+    """
+    Parses a batch classification reply into a list of labels ordered by index.
+    Returns None when the reply is malformed, truncated or incomplete.
+    """
+    if not content:
+        return None
+
+    # Models sometimes wrap the JSON in prose or code fences; keep only the object
+    start = content.find('{')
+    end = content.rfind('}')
+    if start == -1 or end <= start:
+        return None
+
     try:
-        response = groq_client.chat.completions.create(
-            model="openai/gpt-oss-20b",
-            messages=[
-                {
-                    "role": "user",
-                    "content": f'Is the following news headline good, bad orneutral? Headline: {news_text}. Only answer with "good", "bad" or neutral.'
-                }
-            ],
-            temperature=0.0
+        payload = json.loads(content[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+
+    items = payload.get('labels') if isinstance(payload, dict) else None
+    if not isinstance(items, list):
+        return None
+
+    labels = {}
+    for item in items:
+        if not isinstance(item, dict):
+            return None
+        index = item.get('i')
+        label = str(item.get('label', '')).strip().lower()
+        if not isinstance(index, int) or not 0 <= index < expected_count or label not in SENTIMENT_LABELS:
+            return None
+        labels[index] = label
+
+    if len(labels) != expected_count:
+        return None
+    return [labels[i] for i in range(expected_count)]
+
+def _classify_batch(news_texts):
+    """
+    Sends one chat completion for a list of news items and returns their labels,
+    or None if the reply cannot be validated. API errors (transport, rate limit, quota) are raised.
+    """
+    numbered = "\n".join(f"{i}: {text}" for i, text in enumerate(news_texts))
+    prompt = (
+        "Classify each of the following news headlines as good, bad or neutral for the company.\n"
+        'Reply ONLY with JSON in the form {"labels": [{"i": <index>, "label": "good"|"bad"|"neutral"}]} '
+        "containing exactly one entry per index.\n\n"
+        f"Headlines:\n{numbered}"
+    )
+
+    response = _chat_completion(prompt, response_format={"type": "json_object"})
+    choice = response.choices[0]
+    # A truncated reply cannot contain every label, treat it as malformed
+    if getattr(choice, 'finish_reason', None) == 'length':
+        return None
+    return _parse_batch_labels(choice.message.content, len(news_texts))
+
+def analyze_news_sentiment_batch(news_texts, batch_size: int = SENTIMENT_BATCH_SIZE, fallback="neutral"):
+    """
+    Analyzes a list of news items with one LLM call per batch and returns a list of
+    'good', 'bad' or 'neutral' labels in the same order.
+    Batches whose reply is malformed or truncated are split in half and retried,
+    down to single-item calls. An API error fails the rest of its batch instead (splitting
+    would only multiply the calls), and an exhausted daily quota stops the classification.
+    Items that still fail get `fallback` (None keeps them unlabelled).
+    """
+    news_texts = list(news_texts)
+    labels = []
+
+    for start in range(0, len(news_texts), batch_size):
+        batch = news_texts[start:start + batch_size]
+        batch_labels = []
+        try:
+            _classify_with_fallback(batch, batch_labels)
+        except QuotaExceededError as e:
+            labels.extend(batch_labels)
+            print(f"{e}; {len(news_texts) - len(labels)} items left unclassified")
+            break
+        except Exception as e:
+            print(f"Error analyzing sentiment batch of {len(batch)}: {e}")
+        labels.extend(batch_labels + [None] * (len(batch) - len(batch_labels)))
+
+    labels.extend([None] * (len(news_texts) - len(labels)))
+    return [fallback if label is None else label for label in labels]
+
+def _classify_with_fallback(news_texts, labels: list):
+    """
+    Appends the labels of a batch to `labels`, splitting the batch recursively when the
+    reply came back malformed or truncated. API errors are raised.
+    """
+    if len(news_texts) == 1:
+        labels.append(_single_label(news_texts[0]))
+        return
+
+    batch_labels = _classify_batch(news_texts)
+    if batch_labels is not None:
+        labels.extend(batch_labels)
+        return
+
+    middle = len(news_texts) // 2
+    print(f"  Batch reply for {len(news_texts)} items was invalid, retrying as {middle} + {len(news_texts) - middle}")
+    _classify_with_fallback(news_texts[:middle], labels)
+    _classify_with_fallback(news_texts[middle:], labels)
+
+def classify_news_dataframe(df: pd.DataFrame, text_column: str = 'description', batch_size: int = SENTIMENT_BATCH_SIZE) -> pd.DataFrame:
+    """
+    Adds 'sentiment' and 'sentiment_tier' columns to the DataFrame using batched LLM classification.
+    Items without text fall back to the title so every row is labelled; items the LLM
+    couldn't classify are stored as 'neutral' with tier 'fallback' instead of 'llm'.
+    """
+    texts = df[text_column].fillna(df['title']).fillna('').astype(str).tolist()
+    labels = pd.Series(analyze_news_sentiment_batch(texts, batch_size=batch_size, fallback=None), index=df.index, dtype=object)
+    df['sentiment_tier'] = labels.isna().map({True: 'fallback', False: 'llm'})
+    df['sentiment'] = labels.fillna('neutral')
+    return df
+
+def _classify_tiers(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Labels the articles with the local lexicon first and sends only the ones it isn't
+    confident about to the LLM. Sets 'sentiment', 'sentiment_tier' and 'sentiment_confidence'.
+    """
+    # Tier 1: local lexicon, only confident labels are kept
+    with span('lexicon_classify'):
+        scores = score_texts(df['title'], df['description'])
+    df['sentiment_confidence'] = scores['confidence']
+    df['sentiment'] = scores['label']
+    df['sentiment_tier'] = scores['label'].notna().map({True: 'lexicon', False: None})
+
+    # Tier 2: the LLM for everything the lexicon wasn't sure about
+    to_llm = df['sentiment'].isna()
+    print(f"  {len(df) - to_llm.sum()} labelled locally, {to_llm.sum()} sent to the LLM...")
+    if to_llm.any():
+        with span('llm_classify'):
+            classified = classify_news_dataframe(df.loc[to_llm].copy())
+        df.loc[to_llm, 'sentiment'] = classified['sentiment']
+        df.loc[to_llm, 'sentiment_tier'] = classified['sentiment_tier']
+        # The lexicon score is not the LLM's confidence; failures get 0
+        df.loc[to_llm, 'sentiment_confidence'] = None
+        df.loc[to_llm & (df['sentiment_tier'] == 'fallback'), 'sentiment_confidence'] = 0.0
+    return df
+
+def classify_news_with_cache(df: pd.DataFrame, cache: SentimentCache, duplicates: NearDuplicateIndex = None) -> pd.DataFrame:
+    """
+    Adds 'sentiment' and 'cluster_id' columns, reusing cached labels (local tier or bronze.news)
+    and classifying each new story once: near-duplicate copies (see near_duplicates) share
+    the label of their cluster, from an earlier run or from the copy classified in this chunk
+    """
+    hashes = [generate_hash(company, title, str(published_at))
+              for company, title, published_at in zip(df['company'], df['title'], df['publishedAt'])]
+    digests = [text_digest(title, description) for title, description in zip(df['title'], df['description'])]
+    if duplicates is not None:
+        with span('near_duplicate_assign'):
+            df['cluster_id'] = duplicates.assign(hashes, df['title'], df['description'], df['publishedAt'])
+    else:
+        df['cluster_id'] = hashes
+
+    with span('sentiment_cache_lookup'):
+        df['sentiment'] = cache.get_many(hashes, digests)
+    df['sentiment_tier'] = df['sentiment'].notna().map({True: 'cache', False: None})
+    df['sentiment_confidence'] = None
+    missing = df['sentiment'].isna()
+
+    if missing.any():
+        # One representative per unlabelled cluster goes through the classifier tiers
+        known = duplicates.labels(df.loc[missing, 'cluster_id']) if duplicates is not None else {}
+        for cluster_id, sentiment in zip(df.loc[~missing, 'cluster_id'], df.loc[~missing, 'sentiment']):
+            known.setdefault(cluster_id, (sentiment, None))
+        pending = missing & ~df['cluster_id'].isin(list(known))
+        representatives = df.loc[pending].drop_duplicates('cluster_id')
+        print(f"  {missing.sum()} of {len(df)} articles not cached, {len(representatives)} distinct stories to classify:")
+        if not representatives.empty:
+            representatives = _classify_tiers(representatives.copy())
+            df.loc[representatives.index, ['sentiment', 'sentiment_tier', 'sentiment_confidence']] = \
+                representatives[['sentiment', 'sentiment_tier', 'sentiment_confidence']]
+            known.update(
+                (cluster_id, (sentiment, confidence))
+                for cluster_id, sentiment, tier, confidence in zip(
+                    representatives['cluster_id'], representatives['sentiment'],
+                    representatives['sentiment_tier'], representatives['sentiment_confidence'])
+                if tier != 'fallback'
+            )
+
+        # The other copies take their story's label
+        copies = df['sentiment'].isna() & df['cluster_id'].isin(list(known))
+        df.loc[copies, 'sentiment'] = df.loc[copies, 'cluster_id'].map(lambda cluster_id: known[cluster_id][0])
+        df.loc[copies, 'sentiment_confidence'] = df.loc[copies, 'cluster_id'].map(lambda cluster_id: known[cluster_id][1])
+        df.loc[copies, 'sentiment_tier'] = 'duplicate'
+        # Copies of a story the LLM failed on in this chunk get the same fallback
+        failed = df['sentiment'].isna()
+        df.loc[failed, ['sentiment', 'sentiment_tier', 'sentiment_confidence']] = ['neutral', 'fallback', 0.0]
+
+        for tier, count in df.loc[missing, 'sentiment_tier'].value_counts().items():
+            increment('articles_classified', int(count), tier=tier)
+        # Fallback labels are not cached (and skipped by the bronze tier), so those articles are
+        # retried on the next run and their stored row is relabelled on insert
+        labelled = missing & (df['sentiment_tier'] != 'fallback')
+        cache.put_many(
+            (hashes[i], digests[i], df['sentiment'].iat[i]) for i in range(len(df)) if labelled.iat[i]
         )
-        return response.choices[0].message.content.strip().lower()
-    except Exception as e:
-        print(f"Error analyzing sentiment: {e}")
-        return "neutral"
+        if duplicates is not None:
+            duplicates.set_labels((cluster_id, *known[cluster_id]) for cluster_id in df.loc[labelled, 'cluster_id'].unique())
+    else:
+        print(f"  All {len(df)} articles already classified, skipping the LLM")
 
-def get_news_data(url, query, api_key):
+    return df
+
+def _fetch_news_page(url, query, api_key, page: int = 1, page_size: int = NEWS_PAGE_SIZE):
     """
-    Fetches news for a specific company
+    Fetches one page of news for a specific company (or an OR-query of several).
+    Returns (DataFrame, totalResults); the DataFrame is empty on errors or when no articles are left.
     """
     params = {
         'q': query,
         'apiKey': api_key,
         'language': 'en',
         'sortBy': 'publishedAt',
-        'pageSize': 30,
+        'pageSize': page_size,
+        'page': page,
         'domains': 'bloomberg.com,reuters.com,cnbc.com,techcrunch.com',
         'from': (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
     }
     
     try:
-        response = requests.get(url, params=params)
+        # Keep-alive session + on-disk cache; the limiter paces network calls and retries 429s
+        with span('fetch_page', provider='newsapi'):
+            response = cached_get(url, params=params, limiter=newsapi_limiter)
         
         print(f"\n{'='*60}")
-        print(f"Fetching news for: {query}")
-        print(f"Response status: {response.status_code}")
+        print(f"Fetching news for: {query} (page {page})")
+        print(f"Response status: {response.status_code}{' (cached)' if response.headers.get('X-Cache') == 'HIT' else ''}")
         
         if response.status_code == 200:
             data = response.json()
             
             if data.get('status') == 'ok' and 'articles' in data:
                 articles = data['articles']
-                print(f"Total articles found: {len(articles)}")
+                total_results = data.get('totalResults', len(articles))
+                print(f"Articles in page: {len(articles)} (total results: {total_results})")
                 
                 if articles:
-                    df = pd.DataFrame(articles)
+                    df = pd.DataFrame(articles).reindex(columns=['url', 'publishedAt', 'title', 'description', 'content'])
                     df['company'] = query
-                    return df[['url', 'company', 'publishedAt', 'title', 'description']]
+                    df['ticket'] = COMPANY_TICKERS.get(query)
+                    return df, total_results
                 else:
-                    print("No articles found for this company")
-                    return pd.DataFrame()
+                    print("No more articles found for this company")
+                    return pd.DataFrame(), total_results
                     
             else:
                 print("API response error:")
                 print(data)
-                return pd.DataFrame()
+                return pd.DataFrame(), 0
+        
+        elif _error_code(response) == 'maximumResultsReached':
+            print(f"WARNING - NewsAPI plan results limit reached for {query}: results after page {page - 1} were NOT collected")
+            increment('results_truncated', provider='newsapi')
+            return pd.DataFrame(), 0
                 
         elif response.status_code == 401:
             print("ERROR - Authentication failed - Check your API Key")
-            return pd.DataFrame()
+            return pd.DataFrame(), 0
         elif response.status_code == 429:
-            print("ERROR - Rate limit exceeded - Please wait a moment")
-            return pd.DataFrame()
+            print(f"ERROR - Rate limit still exceeded after retries - news for {query} was NOT collected")
+            return pd.DataFrame(), 0
         else:
             print(f"HTTP ERROR {response.status_code}")
             print(response.text)
-            return pd.DataFrame()
+            return pd.DataFrame(), 0
 
     except requests.exceptions.RequestException as e:
         print(f"Connection ERROR: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), 0
     except Exception as e:
         print(f"Unexpected ERROR: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(), 0
+
+def _error_code(response) -> str:
+    """
+    NewsAPI error code of a failed response (e.g. 'maximumResultsReached'), None if it has none
+    """
+    try:
+        return response.json().get('code')
+    except Exception:
+        return None
+
+def iter_news_pages(url, query, api_key, page_size: int = NEWS_PAGE_SIZE, max_pages: int = NEWS_MAX_PAGES,
+                    router=None, max_results: int = NEWS_MAX_RESULTS):
+    """
+    Generator over a company's news: yields one DataFrame per NewsAPI page as it arrives,
+    walking pages until the results are exhausted, max_pages is reached or the next page
+    would go past the plan's max_results.
+    With a router (fan-in queries) each article is assigned to the tickers it mentions.
+    """
+    page_size = min(page_size, max_results)
+    last_page = min(max_pages, max_results // page_size)
+    for page in range(1, last_page + 1):
+        df, total_results = _fetch_news_page(url, query, api_key, page=page, page_size=page_size)
+        if df.empty:
+            return
+        increment('articles_fetched', len(df), provider='newsapi')
+        if router is not None:
+            df = router.route_articles(df)
+        df = df[['url', 'company', 'ticket', 'publishedAt', 'title', 'description']]
+        if not df.empty:
+            yield df
+        if page * page_size >= total_results:
+            return
+    if last_page < max_pages:
+        print(f"WARNING - NewsAPI plan results limit ({max_results}) reached for {query}: "
+              f"{total_results - last_page * page_size} of {total_results} results were NOT collected")
+        increment('results_truncated', provider='newsapi')
+    else:
+        print(f"Page cap of {max_pages} reached for {query}; remaining results were not fetched")
+
+def get_news_data(url, query, api_key):
+    """
+    Fetches all news pages for a specific company into a single DataFrame
+    """
+    pages = list(iter_news_pages(url, query, api_key))
+    return pd.concat(pages, ignore_index=True) if pages else pd.DataFrame()
 
 def insert_news_data(df: pd.DataFrame):
     """
-    Inserts news data into PostgreSQL database with duplicate checking
+    Inserts news data into PostgreSQL database with duplicate checking.
+    Articles stored earlier with a fallback label take the new label instead of being skipped.
     """
-    connection = get_db_connection()
-    if not connection:
-        return False
-    
     try:
-        cursor = connection.cursor()
-        
-        # Prepare data for insertion
-        insert_data = []
-        for _, row in df.iterrows():
-            hash_key = generate_hash(row['company'], row['title'], str(row['publishedAt']))
-            insert_data.append((
-                hash_key,
-                row['company'],
-                row['title'],
-                row['description'],
-                row['url'],
-                row['publishedAt'],
-                row['sentiment']
-            ))
+        # Prepare data for insertion (columnar, hashes match generate_hash)
+        insert_data = prepare_news_rows(df)
         
-        # Query to insert with ON CONFLICT (avoids duplicates)
-        insert_query = """
-        INSERT INTO bronze.news (hash, company, title, description, url, published_at, sentiment)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (hash) DO NOTHING
-        """
-        
-        cursor.executemany(insert_query, insert_data)
-        connection.commit()
+        with db_connection() as connection:
+            ensure_monthly_partitions(connection, 'bronze.news', insert_data['published_at'])
+            # Conflict target = primary key: (hash, published_at) once partitioned, hash on a legacy table
+            key = ('hash', 'published_at') if is_partitioned(connection, 'bronze.news') else ('hash',)
+            
+            # Bulk load through COPY + staging table (duplicates are skipped by the hash key)
+            inserted, skipped = bulk_insert(
+                connection,
+                'bronze.news',
+                list(insert_data.columns),
+                insert_data,
+                conflict_columns=key,
+                update_columns=[column for column in NEWS_RELABEL_COLUMNS
+                                if column in insert_data.columns or column == 'created_at'],
+                update_where="bronze.news.sentiment_tier = 'fallback' AND EXCLUDED.sentiment_tier <> 'fallback'"
+            )
         
-        print(f"News data inserted into database successfully! {len(insert_data)} records processed.")
+        print(f"News data inserted into database successfully! {len(insert_data)} records processed ({inserted} inserted, {skipped} skipped as duplicates).")
         return True
         
     except Exception as e:
         print(f"Error inserting data into database: {e}")
-        connection.rollback()
         return False
-    finally:
-        cursor.close()
-        connection.close()
 
 def create_news_table():
     """
     Creates the news table in PostgreSQL database if it doesn't exist
+    (partitioned by month of published_at, see table_layout)
     """
-    connection = get_db_connection()
-    if not connection:
-        return False
-    
     try:
-        cursor = connection.cursor()
-        
-        create_table_query = """
-        CREATE TABLE IF NOT EXISTS bronze.news (
-            hash VARCHAR(32) PRIMARY KEY,
-            company VARCHAR(100) NOT NULL,
-            title TEXT NOT NULL,
-            description TEXT,
-            url TEXT,
-            published_at TIMESTAMP,
-            sentiment VARCHAR(10),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        """
-        
-        cursor.execute(create_table_query)
-        connection.commit()
+        with db_connection() as connection:
+            ensure_table(connection, 'bronze.news')
         print("Table bronze.news created/verified successfully!")
         return True
         
     except Exception as e:
         print(f"Error creating table: {e}")
-        connection.rollback()
         return False
-    finally:
-        cursor.close()
-        connection.close()
 
 def test_db_connection():
     """
-    Tests database connection before starting processing
+    Tests database connection before starting processing.
+    The connection is returned to the pool, so later steps reuse it instead of reconnecting.
     """
     print("\n" + "="*60)
     print("TESTING DATABASE CONNECTION...")
     print("="*60)
     
-    connection = get_db_connection()
-    if connection is None:
-        print("ERROR - FAILED: Could not connect to database")
-        print("Check your credentials in the .env file")
-        return False
-    
     try:
-        cursor = connection.cursor()
-        cursor.execute("SELECT version();")
-        version = cursor.fetchone()
+        with db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT version();")
+                version = cursor.fetchone()
         print(f"OK - Connection established successfully!")
         print(f"  PostgreSQL version: {version[0]}")
-        cursor.close()
-        connection.close()
         return True
     except Exception as e:
-        print(f"ERROR testing connection: {e}")
-        if connection:
-            connection.close()
+        print("ERROR - FAILED: Could not connect to database")
+        print(f"  {e}")
+        print("Check your credentials in the .env file")
         return False
 
-def main():
+def _new_summary():
+    return {'articles': 0, 'saved': 0, 'companies': Counter(), 'sentiments': Counter()}
+
+def save_news_chunk(df: pd.DataFrame, summary: dict) -> bool:
+    """
+    Writes one classified chunk to bronze.news (backup CSV on failure) and updates the run summary,
+    so no chunk has to stay in memory after it is written
     """
-    Main function that processes all companies: collects news, analyzes sentiment and saves to database
+    with span('write_chunk', table='bronze.news'):
+        success = insert_news_data(df)
+    if not success:
+        increment('write_failures', table='bronze.news')
+        print("Error saving to database. Appending chunk to backup CSV...")
+        os.makedirs(os.path.dirname(NEWS_BACKUP_FILE), exist_ok=True)
+        df.to_csv(NEWS_BACKUP_FILE, mode='a', header=not os.path.exists(NEWS_BACKUP_FILE), index=False)
+        print(f"Data saved to: {NEWS_BACKUP_FILE}")
+
+    summary['articles'] += len(df)
+    summary['saved'] += len(df) if success else 0
+    summary['companies'].update(df['company'].tolist())
+    summary['sentiments'].update(df['sentiment'].tolist())
+    return success
+
+def _print_summary(summary: dict):
+    if not summary['articles']:
+        print("\nERROR - No data was collected")
+        return
+    print(f"\n{'='*60}")
+    print(f"OK - Process completed!")
+    print(f"Total articles processed: {summary['articles']} ({summary['saved']} saved to database)")
+    print(f"\nSummary by company:")
+    print(pd.Series(summary['companies']).sort_values(ascending=False).to_string())
+    print(f"\nSentiment distribution:")
+    print(pd.Series(summary['sentiments']).sort_values(ascending=False).to_string())
+
+async def _fetch_stage(url, fetch_semaphore, classify_queue, queries, router=None):
+    """
+    Walks every query's pages concurrently and queues articles in classification-sized chunks
+    as each page arrives
+    """
+    async def fetch_query(query):
+        async with fetch_semaphore:
+            pages = iter_news_pages(url, query, API_KEY_NEWS, router=router)
+            while True:
+                df = await asyncio.to_thread(next, pages, None)
+                if df is None:
+                    break
+                for start in range(0, len(df), SENTIMENT_BATCH_SIZE):
+                    await classify_queue.put(df.iloc[start:start + SENTIMENT_BATCH_SIZE].copy())
+
+    await asyncio.gather(*(fetch_query(query) for query in queries))
+
+async def _classify_worker(sentiment_cache, near_duplicates, classify_queue, write_queue):
+    """
+    Classifies queued chunks until it receives the stop marker (None).
+    A chunk that fails to classify is still written, labelled 'neutral' with tier 'fallback'.
+    """
+    while True:
+        chunk = await classify_queue.get()
+        if chunk is None:
+            break
+        try:
+            chunk = await asyncio.to_thread(classify_news_with_cache, chunk, sentiment_cache, near_duplicates)
+        except Exception as e:
+            print(f"Error classifying chunk of {len(chunk)} articles, storing them with fallback labels: {e}")
+            chunk = chunk.assign(sentiment='neutral', sentiment_tier='fallback', sentiment_confidence=0.0)
+            increment('articles_classified', len(chunk), tier='fallback')
+        await write_queue.put(chunk)
+
+async def _write_stage(write_queue, write_batch_size, summary):
+    """
+    Flushes classified chunks to bronze.news whenever write_batch_size rows are pending
+    """
+    pending = []
+    pending_rows = 0
+
+    async def flush():
+        nonlocal pending, pending_rows
+        if not pending:
+            return
+        batch = pd.concat(pending, ignore_index=True)
+        pending, pending_rows = [], 0
+        print(f"\nSaving {len(batch)} articles to PostgreSQL database...")
+        await asyncio.to_thread(save_news_chunk, batch, summary)
+
+    while True:
+        chunk = await write_queue.get()
+        if chunk is None:
+            break
+        pending.append(chunk)
+        pending_rows += len(chunk)
+        if pending_rows >= write_batch_size:
+            await flush()
+
+    await flush()
+
+def news_queries(fan_in: bool):
+    """
+    Returns (queries, router): one query per company, or with fan_in the companies packed
+    into OR-queries plus the router that assigns the fetched articles to their tickers
+    """
+    if not fan_in:
+        return list(companies), None
+    queries = build_query_batches(companies)
+    print(f"Fan-in mode: {len(companies)} companies in {len(queries)} NewsAPI queries")
+    return queries, build_router(companies, connection_factory=db_connection)
+
+async def run_pipeline_async(fetch_concurrency: int = NEWS_FETCH_CONCURRENCY,
+                             classify_concurrency: int = NEWS_CLASSIFY_CONCURRENCY,
+                             write_batch_size: int = NEWS_WRITE_BATCH_SIZE,
+                             fan_in: bool = False):
+    """
+    Runs fetch, classification and database writes as overlapping stages.
+    NewsAPI requests run concurrently, classification uses a bounded pool of workers
+    and the writer flushes completed batches while classification continues.
+    Returns the run summary.
+    """
+    url = 'https://newsapi.org/v2/everything'
+    queries, router = news_queries(fan_in)
+    sentiment_cache = SentimentCache(connection_factory=db_connection)
+    near_duplicates = NearDuplicateIndex()
+
+    fetch_semaphore = asyncio.Semaphore(fetch_concurrency)
+    # Bounded queues apply back-pressure so fetched data never piles up in memory
+    classify_queue = asyncio.Queue(maxsize=classify_concurrency * 2)
+    write_queue = asyncio.Queue(maxsize=classify_concurrency * 2)
+    summary = _new_summary()
+
+    async def fetch_then_stop():
+        await _fetch_stage(url, fetch_semaphore, classify_queue, queries, router)
+        for _ in range(classify_concurrency):
+            await classify_queue.put(None)
+
+    async def classify_then_stop():
+        await asyncio.gather(*(
+            _classify_worker(sentiment_cache, near_duplicates, classify_queue, write_queue)
+            for _ in range(classify_concurrency)
+        ))
+        await write_queue.put(None)
+
+    try:
+        # A failing stage cancels the others (and the error is raised) instead of leaving
+        # them blocked forever on a full queue
+        async with asyncio.TaskGroup() as stages:
+            stages.create_task(_write_stage(write_queue, write_batch_size, summary))
+            stages.create_task(classify_then_stop())
+            stages.create_task(fetch_then_stop())
+    finally:
+        print(f"\n{sentiment_cache.summary()}")
+        print(near_duplicates.summary())
+        sentiment_cache.close()
+        near_duplicates.close()
+    return summary
+
+def main(async_mode: bool = False, fan_in: bool = NEWS_FETCH_MODE == 'fan_in'):
+    """
+    Main function that processes all companies: collects news, analyzes sentiment and saves to database.
+    Pages are classified and written as they arrive, so memory stays flat however many articles a run sees.
+    With async_mode the stages run concurrently through run_pipeline_async.
+    With fan_in the companies share OR-queries, so NewsAPI calls grow with query batches, not companies.
+    Returns False when the database is unreachable (chunks that fail to save are counted as write_failures).
     """
     # Test database connection BEFORE starting processing
     if not test_db_connection():
         print("\nINTERRUPTING: Script will not run due to database connection failure")
-        return
+        return False
     
     url = 'https://newsapi.org/v2/everything'
     
@@ -252,61 +686,46 @@ def main():
     print("\nChecking/creating table in database...")
     create_news_table()
     
-    all_data = []
+    if async_mode:
+        _print_summary(asyncio.run(run_pipeline_async(fan_in=fan_in)))
+        return True
     
-    for i, company in enumerate(companies):
-        # Fetch company data
-        df = get_news_data(url, company, API_KEY_NEWS)
-        
-        if not df.empty:
-            print(f"OK - Data collected for {company} ({len(df)} articles)")
-            
-            # Analyze sentiment for each news item
-            print(f"Analyzing sentiment for {company}...")
-            sentiments = []
-            
-            for index, row in df.iterrows():
-                print(f"  Processing news {index + 1}/{len(df)}: {row['title'][:50]}...")
-                sentiment = analyze_news_sentiment(row['description'])
-                sentiments.append(sentiment)
+    # Known articles are served from the cache and never reach Groq again,
+    # and republished copies of a story are classified once per cluster
+    sentiment_cache = SentimentCache(connection_factory=db_connection)
+    near_duplicates = NearDuplicateIndex()
+    summary = _new_summary()
+    queries, router = news_queries(fan_in)
+    
+    try:
+        for query in queries:
+            # Fetch query pages one at a time (pacing is handled by the NewsAPI limiter)
+            for df in iter_news_pages(url, query, API_KEY_NEWS, router=router):
+                print(f"OK - Data collected for {query} ({len(df)} articles)")
                 
-                # Small delay to avoid Groq API rate limit
-                time.sleep(0.5)
-            
-            # Add sentiment column
-            df['sentiment'] = sentiments
-            
-            all_data.append(df)
-            print(f"OK - Sentiment analysis for {company} completed")
-        
-        # Delay between requests to avoid rate limit (except for the last one)
-        if i < len(companies) - 1:
-            print("Waiting 2 seconds before next request...")
-            time.sleep(2)
+                # Analyze sentiment in batches (one LLM call per batch instead of per article)
+                print(f"Analyzing sentiment for {query} in batches of {SENTIMENT_BATCH_SIZE}...")
+                df = classify_news_with_cache(df, sentiment_cache, near_duplicates)
+                
+                # Save the page right away instead of holding every company in memory
+                print("\nSaving data to PostgreSQL database...")
+                save_news_chunk(df, summary)
+    finally:
+        # Same as the async path: evict and close the caches even if a page fails
+        print(f"\n{sentiment_cache.summary()}")
+        print(near_duplicates.summary())
+        sentiment_cache.close()
+        near_duplicates.close()
     
-    # Concatenate all DataFrames
-    if all_data:
-        final_df = pd.concat(all_data, ignore_index=True)
-        
-        # Save to database
-        print("\nSaving data to PostgreSQL database...")
-        success = insert_news_data(final_df)
-        
-        if success:
-            print(f"\n{'='*60}")
-            print(f"OK - Process completed!")
-            print(f"Total articles processed: {len(final_df)}")
-            print(f"Data saved to PostgreSQL database!")
-            print(f"\nSummary by company:")
-            print(final_df['company'].value_counts())
-            print(f"\nSentiment distribution:")
-            print(final_df['sentiment'].value_counts())
-        else:
-            print("Error saving to database. Saving as backup CSV...")
-            final_df.to_csv('raw_data/news_data_with_sentiment_backup.csv', index=False)
-            print(f"Data saved to: news_data_with_sentiment_backup.csv")
-    else:
-        print("\nERROR - No data was collected")
+    _print_summary(summary)
+    return True
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Collects news, analyzes sentiment and saves to database")
+    parser.add_argument('--async', dest='async_mode', action='store_true',
+                        help="Run fetch, classification and writes as concurrent stages")
+    parser.add_argument('--fan-in', action='store_true', default=NEWS_FETCH_MODE == 'fan_in',
+                        help="Pack the companies into OR-queries and route articles to tickers locally")
+    args = parser.parse_args()
+    with run_metrics('news_sentiment'):
+        main(async_mode=args.async_mode, fan_in=args.fan_in)
@@ -0,0 +1,373 @@
+import atexit
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from metrics import increment, span
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the state file is then last-writer-wins
+    fcntl = None
+
+# Quota state shared across runs (next to the other local caches, ignored by git)
+DEFAULT_STATE_PATH = os.path.join(os.path.dirname(__file__), '.cache', 'rate_limits.json')
+
+# Published free-tier limits per provider. Each value can be overridden with an
+# environment variable named RATE_LIMIT_<PROVIDER>_<SETTING>, e.g. RATE_LIMIT_GROQ_TOKENS_PER_MINUTE
+PROVIDER_LIMITS = {
+    'newsapi': {'requests_per_minute': 30, 'tokens_per_minute': None, 'daily_requests': 100},
+    'finnhub': {'requests_per_minute': 60, 'tokens_per_minute': None, 'daily_requests': None},
+    'groq': {'requests_per_minute': 30, 'tokens_per_minute': 8000, 'daily_requests': 1000},
+    'yfinance': {'requests_per_minute': 120, 'tokens_per_minute': None, 'daily_requests': None},
+}
+
+MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '5'))
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+
+class QuotaExceededError(Exception):
+    """
+    Raised when a provider's daily cap is exhausted; waiting within the run won't help
+    """
+
+
+class TokenBucket:
+    """
+    Classic token bucket: refills continuously at rate_per_second up to capacity
+    """
+
+    def __init__(self, rate_per_second: float, capacity: float):
+        self.rate_per_second = rate_per_second
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Takes amount tokens (possibly going negative) and returns how long the caller must wait
+        """
+        self._refill()
+        amount = min(amount, self.capacity)
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate_per_second
+
+    def drain(self):
+        """
+        Empties the bucket, used when the provider reports no remaining quota
+        """
+        self._refill()
+        self.tokens = min(self.tokens, 0)
+
+
+def _load_limits(provider: str) -> dict:
+    """
+    Returns the configured limits for a provider, applying environment overrides
+    """
+    limits = dict(PROVIDER_LIMITS.get(provider, PROVIDER_LIMITS['yfinance']))
+    for setting in limits:
+        override = os.getenv(f"RATE_LIMIT_{provider.upper()}_{setting.upper()}")
+        if override is not None:
+            limits[setting] = int(override) if override.strip().lower() != 'none' else None
+    return limits
+
+
+def _parse_duration(value) -> float:
+    """
+    Parses reset headers: plain seconds ("12", "0.5") or Groq-style durations ("1m2.5s", "350ms")
+    """
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    seconds = 0.0
+    number = ''
+    i = 0
+    while i < len(value):
+        char = value[i]
+        if char.isdigit() or char == '.':
+            number += char
+        elif value.startswith('ms', i):
+            seconds += float(number or 0) / 1000
+            number = ''
+            i += 1
+        elif char in 'hms':
+            seconds += float(number or 0) * {'h': 3600, 'm': 60, 's': 1}[char]
+            number = ''
+        i += 1
+    return seconds
+
+
+def _retry_after_seconds(headers) -> float:
+    """
+    Reads a Retry-After header given either in seconds or as an HTTP date
+    """
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if value is None:
+        return 0.0
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(value)
+            return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return 0.0
+
+
+def _status_code(result) -> int:
+    """
+    Extracts an HTTP status code from a response or from an SDK exception
+    """
+    status = getattr(result, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(result, 'response', None), 'status_code', None)
+    return status
+
+
+def _headers(result) -> dict:
+    headers = getattr(result, 'headers', None)
+    if headers is None:
+        headers = getattr(getattr(result, 'response', None), 'headers', None)
+    return headers or {}
+
+
+class RateLimiter:
+    """
+    Quota-aware limiter for one provider: paces requests (and LLM tokens) with token buckets,
+    adapts to Retry-After and rate-limit headers, enforces daily caps and persists
+    the quota state so back-to-back runs share the budget
+    """
+
+    def __init__(self, provider: str, state_path: str = DEFAULT_STATE_PATH):
+        self.provider = provider
+        self.state_path = state_path
+        self.limits = _load_limits(provider)
+        self._lock = threading.Lock()
+
+        rpm = self.limits['requests_per_minute']
+        self.request_bucket = TokenBucket(rpm / 60.0, rpm) if rpm else None
+        tpm = self.limits['tokens_per_minute']
+        self.token_bucket = TokenBucket(tpm / 60.0, tpm) if tpm else None
+
+        state = self._read_state().get(provider, {})
+        self.paused_until = state.get('paused_until', 0.0)
+        self.day = state.get('day', date.today().isoformat())
+        self.daily_requests = state.get('requests', 0)
+        self.daily_tokens = state.get('tokens', 0)
+        # Usage not written to the state file yet, merged into the stored counters on save
+        self._unsaved_requests = 0
+        self._unsaved_tokens = 0
+        self._roll_day()
+
+        # Restore bucket levels from the previous run, refilled for the time elapsed since
+        elapsed = max(0.0, time.time() - state.get('saved_at', 0.0))
+        for bucket, key in ((self.request_bucket, 'request_bucket'), (self.token_bucket, 'token_bucket')):
+            if bucket and key in state:
+                bucket.tokens = min(bucket.capacity, state[key] + elapsed * bucket.rate_per_second)
+
+    # --- persisted state ---
+    def _read_state(self) -> dict:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_state(self):
+        """
+        Merges this limiter's usage into the shared state file. Parallel processes (see
+        orchestration/run_pipeline.py) share the file, so the read-modify-write runs under an
+        exclusive lock and only the usage since the last save is added to the stored counters.
+        """
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        with open(f"{self.state_path}.lock", 'w') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            state = self._read_state()
+            stored = state.get(self.provider, {})
+            if stored.get('day') == self.day:
+                self.daily_requests = stored.get('requests', 0) + self._unsaved_requests
+                self.daily_tokens = stored.get('tokens', 0) + self._unsaved_tokens
+                self.paused_until = max(self.paused_until, stored.get('paused_until', 0.0))
+            self._unsaved_requests = 0
+            self._unsaved_tokens = 0
+
+            state[self.provider] = {
+                'day': self.day,
+                'requests': self.daily_requests,
+                'tokens': self.daily_tokens,
+                'paused_until': self.paused_until,
+                'saved_at': time.time(),
+            }
+            if self.request_bucket:
+                state[self.provider]['request_bucket'] = self.request_bucket.tokens
+            if self.token_bucket:
+                state[self.provider]['token_bucket'] = self.token_bucket.tokens
+            tmp_path = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+
+    def save(self):
+        """
+        Persists the quota state (called on pauses, day rolls and at process exit)
+        """
+        with self._lock:
+            self._save_state()
+
+    def _roll_day(self):
+        today = date.today().isoformat()
+        if self.day != today:
+            self.day = today
+            self.daily_requests = 0
+            self.daily_tokens = 0
+            self._unsaved_requests = 0
+            self._unsaved_tokens = 0
+            return True
+        return False
+
+    # --- pacing ---
+    def acquire(self, tokens: int = 0):
+        """
+        Blocks until a request (consuming `tokens` LLM tokens) fits the provider limits
+        """
+        with self._lock:
+            if self._roll_day():
+                self._save_state()
+            cap = self.limits['daily_requests']
+            if cap is not None and self.daily_requests >= cap:
+                self._save_state()
+                raise QuotaExceededError(f"{self.provider}: daily cap of {cap} requests reached")
+
+            # Reserve now and sleep outside the lock so other threads can queue behind us
+            wait = max(0.0, self.paused_until - time.time())
+            if self.request_bucket:
+                wait = max(wait, self.request_bucket.reserve(1))
+            if self.token_bucket and tokens:
+                wait = max(wait, self.token_bucket.reserve(tokens))
+
+            self.daily_requests += 1
+            self.daily_tokens += tokens
+            self._unsaved_requests += 1
+            self._unsaved_tokens += tokens
+
+        if wait > 0:
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """
+        Adapts pacing from Retry-After and x-ratelimit-* response headers
+        """
+        if not headers:
+            return
+        headers = {str(k).lower(): v for k, v in dict(headers).items()}
+
+        pause = _retry_after_seconds(headers)
+
+        # Groq: x-ratelimit-remaining-requests / -tokens with x-ratelimit-reset-requests / -tokens
+        # Finnhub: x-ratelimit-remaining with x-ratelimit-reset as an epoch timestamp
+        for kind, bucket in (('requests', self.request_bucket), ('tokens', self.token_bucket), ('', self.request_bucket)):
+            suffix = f"-{kind}" if kind else ''
+            remaining = headers.get(f"x-ratelimit-remaining{suffix}")
+            reset = headers.get(f"x-ratelimit-reset{suffix}")
+            if remaining is None or reset is None:
+                continue
+            try:
+                remaining = float(remaining)
+            except ValueError:
+                continue
+            if remaining > 0:
+                continue
+            reset_seconds = _parse_duration(reset)
+            # Epoch timestamps are far larger than any relative duration
+            if reset_seconds > 10 ** 9:
+                reset_seconds = max(0.0, reset_seconds - time.time())
+            pause = max(pause, reset_seconds)
+            if bucket:
+                with self._lock:
+                    bucket.drain()
+
+        if pause > 0:
+            with self._lock:
+                self.paused_until = max(self.paused_until, time.time() + pause)
+                self._save_state()
+
+    def call(self, func, *args, tokens: int = 0, max_retries: int = MAX_RETRIES, **kwargs):
+        """
+        Calls func under the limiter, retrying 429 responses/errors with jittered exponential backoff.
+        Returns the last response if retries are exhausted on a 429 response.
+        """
+        for attempt in range(max_retries + 1):
+            waited = time.perf_counter()
+            self.acquire(tokens)
+            increment('rate_limit_wait_seconds', time.perf_counter() - waited, provider=self.provider)
+            increment('api_requests', provider=self.provider)
+            try:
+                with span('api_call', provider=self.provider):
+                    result = func(*args, **kwargs)
+            except Exception as e:
+                if _status_code(e) != 429:
+                    raise
+                increment('http_429', provider=self.provider)
+                if attempt == max_retries:
+                    raise
+                self.update_from_headers(_headers(e))
+                self._backoff(attempt)
+                continue
+
+            self.update_from_headers(_headers(result))
+            if _status_code(result) != 429:
+                return result
+            increment('http_429', provider=self.provider)
+            if attempt == max_retries:
+                return result
+            self._backoff(attempt)
+
+        return result
+
+    def _backoff(self, attempt: int):
+        """
+        Sleeps with full jitter, never shorter than a pause requested by the provider
+        """
+        delay = random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+        delay = max(delay, self.paused_until - time.time())
+        print(f"  {self.provider}: rate limited, retrying in {delay:.1f}s (attempt {attempt + 1})")
+        increment('retries', provider=self.provider)
+        time.sleep(delay)
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(provider: str) -> RateLimiter:
+    """
+    Returns the process-wide limiter for a provider
+    """
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = RateLimiter(provider)
+        return _limiters[provider]
+
+
+@atexit.register
+def _save_limiters():
+    for limiter in list(_limiters.values()):
+        try:
+            limiter.save()
+        except OSError as e:
+            print(f"Could not save rate limit state for {limiter.provider}: {e}")
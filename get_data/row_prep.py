@@ -0,0 +1,80 @@
+import hashlib
+import pandas as pd
+
+# Columnar preparation of bronze rows. Works on whole columns instead of
+# DataFrame.iterrows, while producing hashes byte-identical to the per-row
+# generate_hash functions of each ingestion script.
+
+
+def hash_columns(*columns) -> pd.Series:
+    """
+    MD5 of the values joined with '_' (same as f"{a}_{b}_..." per row).
+    Values are boxed through Series.tolist(), which yields the same Python objects
+    (str, int, float, Timestamp, None) that iterrows exposed, so str() matches exactly.
+    """
+    index = columns[0].index
+    parts = [map(str, column.tolist()) for column in columns]
+    keys = ['_'.join(values) for values in zip(*parts)]
+    return pd.Series([hashlib.md5(key.encode()).hexdigest() for key in keys], index=index, dtype=object)
+
+
+def to_nullable_int(column: pd.Series) -> pd.Series:
+    """
+    Converts a numeric column to pandas' nullable Int64 so NaN becomes NULL
+    and integral floats (e.g. 1000.0) load into BIGINT columns
+    """
+    return pd.to_numeric(column, errors='coerce').round().astype('Int64')
+
+
+def prepare_stock_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds bronze.stocks rows from the yfinance frame (Ticket, Date, Close, High, Low, Open, Volume)
+    """
+    return pd.DataFrame({
+        'hash': hash_columns(df['Ticket'], df['Date']),
+        'Ticket': df['Ticket'],
+        'Date': df['Date'],
+        'Close': df['Close'],
+        'High': df['High'],
+        'Low': df['Low'],
+        'Open': df['Open'],
+        'Volume': to_nullable_int(df['Volume']),
+    })
+
+
+def prepare_news_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds bronze.news rows from the NewsAPI frame with its sentiment column
+    (plus the ticker, classifier tier, confidence and near-duplicate cluster when they were recorded)
+    """
+    rows = pd.DataFrame({
+        'hash': hash_columns(df['company'], df['title'], df['publishedAt']),
+        'company': df['company'],
+        'title': df['title'],
+        'description': df['description'],
+        'url': df['url'],
+        'published_at': df['publishedAt'],
+        'sentiment': df['sentiment'],
+    })
+    for column in ('ticket', 'sentiment_tier', 'sentiment_confidence', 'cluster_id'):
+        if column in df.columns:
+            rows[column] = df[column]
+    return rows
+
+
+def prepare_insider_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Builds bronze.insider_transactions rows from the Finnhub frame.
+    Dates are parsed once per column (the API returns date strings).
+    """
+    return pd.DataFrame({
+        'hash': hash_columns(df['symbol'], df['name'], df['transactionDate'], df['change'], df['share']),
+        'symbol': df['symbol'],
+        'name': df['name'],
+        'share': to_nullable_int(df['share']),
+        'change': to_nullable_int(df['change']),
+        'filing_date': pd.to_datetime(df['filingDate'], errors='coerce'),
+        'transaction_date': pd.to_datetime(df['transactionDate'], errors='coerce'),
+        'transaction_price': pd.to_numeric(df['transactionPrice'], errors='coerce'),
+        'transaction_code': df['transactionCode'],
+    })
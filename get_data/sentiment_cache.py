@@ -0,0 +1,182 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from metrics import increment
+
+# Local cache file (next to the ingestion scripts, ignored by git)
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(__file__), '.cache', 'sentiment_cache.sqlite3')
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_text(*parts) -> str:
+    """
+    Lowercases the given text parts, strips punctuation and collapses whitespace
+    """
+    text = " ".join(str(part) for part in parts if part is not None and part == part)
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+
+def text_digest(*parts) -> str:
+    """
+    Generates a hash of the normalized text, so reformatted copies of an article share a key
+    """
+    return hashlib.md5(normalize_text(*parts).encode()).hexdigest()
+
+
+class SentimentCache:
+    """
+    Two-tier sentiment cache consulted before calling the LLM:
+    a local SQLite tier keyed by article hash and text digest (with size/age eviction)
+    and a bulk lookup of already stored articles in bronze.news.
+    connection_factory is a context manager factory such as db.db_connection.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 50000,
+                 max_age_days: int = 30, connection_factory=None):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.connection_factory = connection_factory
+        self.stats = {'local_hits': 0, 'bronze_hits': 0, 'misses': 0}
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # The async pipeline classifies from worker threads, so access is serialized with a lock
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment (
+                key TEXT PRIMARY KEY,
+                sentiment TEXT NOT NULL,
+                stored_at REAL NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS sentiment_stored_at ON sentiment (stored_at)")
+        self._db.commit()
+
+    def _lookup_local(self, keys):
+        """
+        Returns {key: sentiment} for keys present in the local tier and not expired
+        """
+        found = {}
+        min_stored_at = time.time() - self.max_age_seconds
+        keys = list(set(keys))
+        # SQLite limits the number of bound parameters per statement
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._db.execute(
+                f"SELECT key, sentiment FROM sentiment WHERE key IN ({placeholders}) AND stored_at >= ?",
+                chunk + [min_stored_at]
+            ).fetchall()
+            found.update(rows)
+        return found
+
+    def _lookup_bronze(self, hashes):
+        """
+        Returns {hash: sentiment} for articles already stored in bronze.news
+        """
+        if not hashes or self.connection_factory is None:
+            return {}
+
+        try:
+            with self.connection_factory() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT hash, sentiment FROM bronze.news WHERE hash = ANY(%s) AND sentiment IS NOT NULL "
+                        "AND sentiment_tier IS DISTINCT FROM 'fallback'",
+                        (list(set(hashes)),)
+                    )
+                    return dict(cursor.fetchall())
+        except Exception as e:
+            print(f"Error looking up cached sentiment in bronze.news: {e}")
+            return {}
+
+    def get_many(self, hashes: list, digests: list) -> list:
+        """
+        Looks up the sentiment for each (hash, digest) pair.
+        Returns a list aligned with the input holding the sentiment or None on a miss.
+        """
+        with self._lock:
+            return self._get_many(hashes, digests)
+
+    def _get_many(self, hashes, digests):
+        local = self._lookup_local(list(hashes) + list(digests))
+        results = []
+        pending = []
+
+        for position, (hash_key, digest) in enumerate(zip(hashes, digests)):
+            sentiment = local.get(hash_key) or local.get(digest)
+            if sentiment is not None:
+                self.stats['local_hits'] += 1
+            else:
+                pending.append(position)
+            results.append(sentiment)
+
+        bronze = self._lookup_bronze([hashes[position] for position in pending])
+        promoted = []
+        for position in pending:
+            sentiment = bronze.get(hashes[position])
+            if sentiment is not None:
+                self.stats['bronze_hits'] += 1
+                results[position] = sentiment
+                promoted.append((hashes[position], digests[position], sentiment))
+            else:
+                self.stats['misses'] += 1
+
+        increment('sentiment_cache_hits', len(results) - len(pending), tier='local')
+        increment('sentiment_cache_hits', len(promoted), tier='bronze')
+        increment('sentiment_cache_misses', len(pending) - len(promoted))
+
+        # Keep bronze hits locally so the next run doesn't need the database round trip
+        if promoted:
+            self.put_many(promoted)
+        return results
+
+    def put_many(self, entries):
+        """
+        Stores (hash, digest, sentiment) entries under both keys and applies eviction
+        """
+        now = time.time()
+        rows = []
+        for hash_key, digest, sentiment in entries:
+            rows.append((hash_key, sentiment, now))
+            rows.append((digest, sentiment, now))
+
+        with self._lock:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO sentiment (key, sentiment, stored_at) VALUES (?, ?, ?)", rows
+            )
+            self._db.commit()
+            self.evict()
+
+    def evict(self):
+        """
+        Drops entries older than max_age_days and trims the table to max_entries (oldest first)
+        """
+        with self._lock:
+            self._db.execute("DELETE FROM sentiment WHERE stored_at < ?", (time.time() - self.max_age_seconds,))
+            self._db.execute("""
+                DELETE FROM sentiment WHERE key IN (
+                    SELECT key FROM sentiment ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._db.commit()
+
+    def summary(self) -> str:
+        """
+        Returns a printable summary of hit/miss counters
+        """
+        total = sum(self.stats.values())
+        hits = self.stats['local_hits'] + self.stats['bronze_hits']
+        rate = (hits / total * 100) if total else 0.0
+        return (f"Sentiment cache: {hits}/{total} hits ({rate:.1f}%) - "
+                f"local: {self.stats['local_hits']}, bronze: {self.stats['bronze_hits']}, "
+                f"misses: {self.stats['misses']}")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
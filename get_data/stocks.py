@@ -1,9 +1,16 @@
 import yfinance as yf
 import pandas as pd
-import psycopg2
 import hashlib
 import os
+from datetime import date, timedelta
 from dotenv import load_dotenv
+from db import db_connection
+from rate_limiter import get_limiter
+from bulk_load import bulk_insert
+from row_prep import prepare_stock_rows
+from table_layout import ensure_table, ensure_monthly_partitions
+from metrics import increment, run_metrics, span
+from config import TICKERS
 
 # Load environment variables (from the same folder)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '.env'))
@@ -15,89 +22,128 @@ def generate_hash(ticket: str, date: str) -> str:
     hash_string = f"{ticket}_{date}"
     return hashlib.md5(hash_string.encode()).hexdigest()
 
-def get_db_connection():
-    """
-    Establishes connection with PostgreSQL database
-    """
-    try:
-        connection = psycopg2.connect(
-            host=os.getenv('HOSTNAME'),
-            port=os.getenv('PORT'),
-            database=os.getenv('DATABASE'),
-            user=os.getenv('DATABASE_USER', 'postgres'),  # Assuming default user if not specified
-            password=os.getenv('DATABASE_PASS'),
-            sslmode='require'
-        )
-        return connection
-    except Exception as e:
-        print(f"Error connecting to database: {e}")
-        return None
-
 def insert_stock_data(df: pd.DataFrame):
     """
     Inserts data into PostgreSQL database with duplicate checking
     """
-    connection = get_db_connection()
-    if not connection:
-        return False
-    
     try:
-        cursor = connection.cursor()
-        
-        # Prepare data for insertion
-        insert_data = []
-        for _, row in df.iterrows():
-            hash_key = generate_hash(row['Ticket'], str(row['Date']))
-            insert_data.append((
-                hash_key,
-                row['Ticket'],
-                row['Date'],
-                row['Close'],
-                row['High'],
-                row['Low'],
-                row['Open'],
-                row['Volume']
-            ))
+        # Prepare data for insertion (columnar, hashes match generate_hash)
+        insert_data = prepare_stock_rows(df)
         
-        # Query to insert with ON CONFLICT (avoids duplicates)
-        insert_query = """
-        INSERT INTO bronze.stocks (hash, Ticket, Date, Close, High, Low, Open, Volume)
-        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-        ON CONFLICT (hash) DO NOTHING
-        """
+        with db_connection() as connection:
+            # Partitioned layout: table, indexes and the monthly partitions this frame needs
+            ensure_table(connection, 'bronze.stocks')
+            ensure_monthly_partitions(connection, 'bronze.stocks', insert_data['Date'])
+            
+            # Bulk load through COPY + staging table (duplicates are skipped by the hash key)
+            inserted, skipped = bulk_insert(
+                connection,
+                'bronze.stocks',
+                list(insert_data.columns),
+                insert_data
+            )
         
-        cursor.executemany(insert_query, insert_data)
-        connection.commit()
-        
-        print(f"Data inserted into database successfully! {len(insert_data)} records processed.")
+        print(f"Data inserted into database successfully! {len(insert_data)} records processed ({inserted} inserted, {skipped} skipped as duplicates).")
         return True
         
     except Exception as e:
         print(f"Error inserting data into database: {e}")
-        connection.rollback()
         return False
-    finally:
-        cursor.close()
-        connection.close()
 
-def get_multiple_stocks(tickets: list, period: str, save_to_db: bool = True, filename: str = "raw_data/stock_data.csv"):
-    all_data = []
-    
+def get_last_stored_dates(tickets: list) -> dict:
+    """
+    Returns {ticket: last stored date} from bronze.stocks for the given tickets
+    """
+    with db_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT upper(ticket), max(date)::date
+                FROM bronze.stocks
+                WHERE upper(ticket) = ANY(%s)
+                GROUP BY upper(ticket)
+                """,
+                ([ticket.upper() for ticket in tickets],)
+            )
+            return dict(cursor.fetchall())
+
+def plan_downloads(tickets: list, period: str, incremental: bool) -> dict:
+    """
+    Groups tickets by the range they need: {start date or None: [tickets]}.
+    None means no stored history (or incremental disabled), so `period` is downloaded.
+    Tickets already up to date are left out.
+    """
+    if not incremental:
+        return {None: list(tickets)}
+
+    try:
+        last_dates = get_last_stored_dates(tickets)
+    except Exception as e:
+        print(f"Could not read stored dates, downloading the full period: {e}")
+        return {None: list(tickets)}
+
+    today = date.today()
+    plan = {}
     for ticket in tickets:
-        print(f"Downloading data for {ticket}...")
-        data = yf.download(ticket, period=period, progress=False)
-        
-        # Remove MultiIndex if exists (flattens columns)
-        if isinstance(data.columns, pd.MultiIndex):
-            data.columns = data.columns.get_level_values(0)
-        
-        # Reset index to transform Date into a column
+        last_date = last_dates.get(ticket.upper())
+        start = last_date + timedelta(days=1) if last_date else None
+        if start is not None and start > today:
+            print(f"{ticket} is up to date (last stored: {last_date})")
+            continue
+        plan.setdefault(start, []).append(ticket)
+    return plan
+
+def normalize_download(data: pd.DataFrame, tickets: list) -> pd.DataFrame:
+    """
+    Turns a (multi-symbol) yf.download frame into one long frame with Ticket and Date columns
+    """
+    if data.empty:
+        return pd.DataFrame()
+
+    if isinstance(data.columns, pd.MultiIndex):
+        # group_by='ticker' gives (Ticker, Price) columns: move the ticker level to the rows in one pass
+        data = data.stack(level=0).rename_axis(['Date', 'Ticket']).reset_index()
+    else:
         data = data.reset_index()
-        
-        # Add Ticket column
-        data['Ticket'] = ticket
-        
-        all_data.append(data)
+        data['Ticket'] = tickets[0]
+
+    # Days a ticker didn't trade come back as all-NaN rows in multi-symbol downloads
+    data = data.dropna(subset=['Close'])
+    data.columns.name = None
+    return data
+
+def get_multiple_stocks(tickets: list, period: str, save_to_db: bool = True, filename: str = "raw_data/stock_data.csv",
+                        incremental: bool = False, batch_size: int = 50):
+    """
+    Downloads prices for all tickets with multi-symbol, threaded yf.download calls.
+    With incremental=True each ticket only requests the days after its max(date) in bronze.stocks;
+    tickets without stored history download `period`.
+    """
+    all_data = []
+    yfinance_limiter = get_limiter('yfinance')
+    
+    with span('plan_downloads'):
+        plan = plan_downloads(tickets, period, incremental)
+    
+    for start, group in plan.items():
+        for i in range(0, len(group), batch_size):
+            batch = group[i:i + batch_size]
+            window = f"from {start}" if start else f"period {period}"
+            print(f"Downloading data for {', '.join(batch)} ({window})...")
+            
+            range_args = {'start': start.isoformat()} if start else {'period': period}
+            data = yfinance_limiter.call(
+                yf.download, batch, group_by='ticker', threads=True, progress=False, **range_args
+            )
+            
+            data = normalize_download(data, batch)
+            if not data.empty:
+                increment('rows_downloaded', len(data), provider='yfinance')
+                all_data.append(data)
+    
+    if not all_data:
+        print("No new data to download")
+        return pd.DataFrame()
     
     # Combine all DataFrames
     df_combined = pd.concat(all_data, ignore_index=True)
@@ -108,10 +154,12 @@ def get_multiple_stocks(tickets: list, period: str, save_to_db: bool = True, fil
     
     if save_to_db:
         # Save to database
-        success = insert_stock_data(df_combined)
+        with span('write', table='bronze.stocks'):
+            success = insert_stock_data(df_combined)
         if success:
             print("Data saved to PostgreSQL database!")
         else:
+            increment('write_failures', table='bronze.stocks')
             print("Error saving to database. Saving as CSV...")
             df_combined.to_csv(filename, index=False)
             print(f"Data saved to: {filename}")
@@ -124,5 +172,6 @@ def get_multiple_stocks(tickets: list, period: str, save_to_db: bool = True, fil
 
 
 # Usage
-tickets = ["AAPL", "META", "NVDA", "NFLX"]
-df = get_multiple_stocks(tickets, period="1d", save_to_db=True)
+if __name__ == "__main__":
+    with run_metrics('stocks'):
+        df = get_multiple_stocks(TICKERS, period="1d", save_to_db=True, incremental=True)
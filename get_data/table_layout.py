@@ -0,0 +1,242 @@
+import argparse
+from datetime import date
+import pandas as pd
+from db import db_connection
+
+# Physical layout of the bronze tables: monthly range partitions on the date each table is
+# filtered by, composite indexes on the access keys, expression indexes on the normalized
+# join columns and BRIN indexes on created_at (append-only, used by the incremental Silver models).
+# Partitioned tables need the partition key in their primary key, so it is (hash, <date column>).
+TABLE_LAYOUTS = {
+    'bronze.stocks': {
+        'columns': """
+            hash VARCHAR(32) NOT NULL,
+            ticket VARCHAR(10) NOT NULL,
+            date DATE NOT NULL,
+            close DOUBLE PRECISION,
+            high DOUBLE PRECISION,
+            low DOUBLE PRECISION,
+            open DOUBLE PRECISION,
+            volume BIGINT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        """,
+        'partition_column': 'date',
+        'indexes': {
+            'stocks_ticket_date_idx': '(upper(ticket), date)',
+            'stocks_created_at_brin': 'USING brin (created_at)',
+        },
+    },
+    'bronze.news': {
+        'columns': """
+            hash VARCHAR(32) NOT NULL,
+            company VARCHAR(100) NOT NULL,
+            ticket VARCHAR(10),
+            title TEXT NOT NULL,
+            description TEXT,
+            url TEXT,
+            published_at TIMESTAMP NOT NULL,
+            sentiment VARCHAR(10),
+            sentiment_tier VARCHAR(10),
+            sentiment_confidence REAL,
+            cluster_id VARCHAR(32),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        """,
+        'partition_column': 'published_at',
+        # Columns added after the first release, added in place to existing tables
+        'added_columns': {
+            'ticket': 'VARCHAR(10)',
+            'sentiment_tier': 'VARCHAR(10)',
+            'sentiment_confidence': 'REAL',
+            'cluster_id': 'VARCHAR(32)',
+        },
+        'indexes': {
+            'news_company_published_at_idx': '(upper(company), published_at)',
+            'news_created_at_brin': 'USING brin (created_at)',
+        },
+    },
+    'bronze.insider_transactions': {
+        'columns': """
+            hash VARCHAR(32) NOT NULL,
+            symbol VARCHAR(10) NOT NULL,
+            name TEXT,
+            share BIGINT,
+            change BIGINT,
+            filing_date DATE,
+            transaction_date DATE NOT NULL,
+            transaction_price NUMERIC(10, 2),
+            transaction_code VARCHAR(10),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        """,
+        'partition_column': 'transaction_date',
+        # Transactions without a transaction date are partitioned by their filing date
+        'partition_fallback': 'filing_date',
+        'indexes': {
+            'insider_symbol_transaction_date_idx': '(upper(symbol), transaction_date)',
+            'insider_created_at_brin': 'USING brin (created_at)',
+        },
+    },
+}
+
+# Tables maintained elsewhere that still need an index for the Silver joins
+EXTRA_INDEXES = {
+    'bronze.auxiliary_table_tck_name': {
+        'auxiliary_company_upper_idx': '(upper(company))',
+    },
+}
+
+
+def _table_kind(cursor, table: str):
+    """
+    Returns 'p' for a partitioned table, 'r' for a plain table or None if it doesn't exist
+    """
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def is_partitioned(connection, table: str) -> bool:
+    with connection.cursor() as cursor:
+        return _table_kind(cursor, table) == 'p'
+
+
+def _create_indexes(cursor, table: str, indexes: dict):
+    for name, definition in indexes.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def _add_missing_columns(cursor, table: str):
+    for name, definition in TABLE_LAYOUTS[table].get('added_columns', {}).items():
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {name} {definition}")
+
+
+def _column_names(table: str) -> list:
+    return [line.split()[0] for line in TABLE_LAYOUTS[table]['columns'].strip().split(',\n')]
+
+
+def ensure_table(connection, table: str):
+    """
+    Creates the bronze table as a monthly range-partitioned table (with a default partition)
+    if it doesn't exist, and makes sure its indexes exist.
+    Existing plain tables are left as they are (see migrate_to_partitioned) but still get the
+    indexes and any column added to the layout since they were created.
+    """
+    layout = TABLE_LAYOUTS[table]
+    with connection.cursor() as cursor:
+        if _table_kind(cursor, table) is not None:
+            _add_missing_columns(cursor, table)
+        else:
+            cursor.execute(f"""
+                CREATE TABLE {table} (
+                    {layout['columns'].strip()},
+                    PRIMARY KEY (hash, {layout['partition_column']})
+                ) PARTITION BY RANGE ({layout['partition_column']})
+            """)
+            cursor.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT")
+        _create_indexes(cursor, table, layout['indexes'])
+
+        for extra_table, indexes in EXTRA_INDEXES.items():
+            if _table_kind(cursor, extra_table) is not None:
+                _create_indexes(cursor, extra_table, indexes)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _month_starts(start: date, end: date) -> list:
+    months = []
+    current = date(start.year, start.month, 1)
+    while current <= end:
+        months.append(current)
+        current = _next_month(current)
+    return months
+
+
+def ensure_monthly_partitions(connection, table: str, dates):
+    """
+    Creates the monthly partitions covering the given dates (a Series or list), so rows
+    land in their month instead of the default partition. No-op for plain tables.
+    """
+    dates = pd.to_datetime(pd.Series(dates), errors='coerce').dropna()
+    if dates.empty or not is_partitioned(connection, table):
+        return
+
+    with connection.cursor() as cursor:
+        for month in _month_starts(dates.min().date(), dates.max().date()):
+            partition = f"{table}_y{month.year}m{month.month:02d}"
+            cursor.execute("SELECT to_regclass(%s)", (partition,))
+            if cursor.fetchone()[0] is not None:
+                continue
+            # A savepoint keeps the load going if the default partition already holds rows of this month
+            cursor.execute("SAVEPOINT create_partition")
+            try:
+                cursor.execute(
+                    f"CREATE TABLE {partition} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+                    (month, _next_month(month))
+                )
+                cursor.execute("RELEASE SAVEPOINT create_partition")
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT create_partition")
+                print(f"Could not create partition {partition}, rows stay in the default partition: {e}")
+
+
+def migrate_to_partitioned(table: str):
+    """
+    Converts an existing plain bronze table into the partitioned layout.
+    The old table is kept as <table>_legacy until it is dropped manually.
+    """
+    layout = TABLE_LAYOUTS[table]
+    column = layout['partition_column']
+    legacy = f"{table}_legacy"
+    partition_value = column
+    if layout.get('partition_fallback'):
+        partition_value = f"coalesce({column}, {layout['partition_fallback']})"
+
+    with db_connection() as connection:
+        with connection.cursor() as cursor:
+            if _table_kind(cursor, table) != 'r':
+                print(f"{table} is not a plain table, nothing to migrate")
+                return
+            # The legacy rows are copied column by column, so it needs the current columns too
+            _add_missing_columns(cursor, table)
+            cursor.execute(f"ALTER TABLE {table} RENAME TO {legacy.split('.')[1]}")
+            # Index and constraint names are global per schema: free them for the new table
+            cursor.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS {table.split('.')[1]}_pkey")
+            for name in layout['indexes']:
+                cursor.execute(f"DROP INDEX IF EXISTS {table.split('.')[0]}.{name}")
+
+        ensure_table(connection, table)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT min({partition_value}), max({partition_value}) FROM {legacy}")
+            start, end = cursor.fetchone()
+        if start is not None:
+            ensure_monthly_partitions(connection, table, [start, end])
+
+        column_list = ", ".join(_column_names(table))
+        select_list = ", ".join(
+            f"{partition_value} AS {name}" if name == column else name for name in _column_names(table)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(f"""
+                INSERT INTO {table} ({column_list})
+                SELECT {select_list} FROM {legacy}
+                WHERE {partition_value} IS NOT NULL
+                ON CONFLICT DO NOTHING
+            """)
+            print(f"{table}: {cursor.rowcount} rows migrated to the partitioned layout (old data kept in {legacy})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Creates or migrates the physical layout of the bronze tables")
+    parser.add_argument('--migrate', nargs='*', choices=list(TABLE_LAYOUTS), default=None,
+                        help="Convert existing plain tables to the partitioned layout")
+    args = parser.parse_args()
+
+    if args.migrate:
+        for table_name in args.migrate:
+            migrate_to_partitioned(table_name)
+    else:
+        with db_connection() as conn:
+            for table_name in TABLE_LAYOUTS:
+                ensure_table(conn, table_name)
+        print("Bronze table layout created/verified successfully!")
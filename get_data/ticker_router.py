@@ -0,0 +1,155 @@
+import os
+from collections import deque
+import pandas as pd
+from config import ALIASES, UNIVERSE
+from metrics import increment
+from sentiment_cache import normalize_text
+
+# NewsAPI rejects `q` values longer than 500 characters
+NEWS_QUERY_MAX_LENGTH = int(os.getenv('NEWS_QUERY_MAX_LENGTH', '500'))
+
+
+def build_query_batches(companies: list, max_length: int = NEWS_QUERY_MAX_LENGTH) -> list:
+    """
+    Packs company names into as few OR-queries as fit the provider's query length limit,
+    e.g. ['"Apple" OR "Meta"', ...]. Names are quoted so multi-word names match as phrases.
+    """
+    batches = []
+    current = ""
+    for company in companies:
+        term = '"' + company.replace('"', '') + '"'
+        if len(term) > max_length:
+            print(f"Company name too long for a NewsAPI query, skipped: {company}")
+            continue
+        candidate = f"{current} OR {term}" if current else term
+        if len(candidate) > max_length:
+            batches.append(current)
+            candidate = term
+        current = candidate
+    if current:
+        batches.append(current)
+    return batches
+
+
+class TickerRouter:
+    """
+    Routes articles to the tickers they mention with an Aho-Corasick automaton over the
+    company names and aliases: one pass over each text finds every name at once, however
+    large the universe. Names match whole words only, case-insensitively.
+    """
+
+    def __init__(self, names: dict, companies: dict):
+        """
+        names maps each name or alias to the set of tickers it stands for; companies maps
+        each ticker to the company name written to bronze.news
+        """
+        self.companies = companies
+        # Trie nodes: goto transitions, failure link and the tickers whose name ends here
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [set()]
+        for name, tickers in names.items():
+            # Padding with spaces makes a match end on word boundaries ('meta' won't match 'metadata')
+            pattern = f" {normalize_text(name)} "
+            if pattern.strip():
+                self._add(pattern, tickers)
+        self._build_failure_links()
+
+    def _add(self, pattern: str, tickers: set):
+        node = 0
+        for char in pattern:
+            if char not in self._goto[node]:
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[node][char] = len(self._goto) - 1
+            node = self._goto[node][char]
+        self._output[node] |= set(tickers)
+
+    def _build_failure_links(self):
+        # Breadth-first, so a node's failure link is resolved before its children's
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+
+    def route(self, *parts) -> list:
+        """
+        Returns the sorted tickers whose names appear in the given text parts
+        """
+        text = f" {normalize_text(*parts)} "
+        node = 0
+        tickers = set()
+        for char in text:
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            tickers |= self._output[node]
+        return sorted(tickers)
+
+    def route_articles(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Returns one row per (article, ticker) mentioned in its title, description or content,
+        with 'ticket' and 'company' set from the routed ticker.
+        Articles that mention none of the tickers are dropped (and counted).
+        """
+        content = df['content'] if 'content' in df.columns else pd.Series(None, index=df.index)
+        routed = df.assign(ticket=[
+            self.route(title, description, text)
+            for title, description, text in zip(df['title'], df['description'], content)
+        ]).explode('ticket')
+
+        unrouted = routed['ticket'].isna()
+        if unrouted.any():
+            increment('articles_unrouted', int(unrouted.sum()), provider='newsapi')
+            print(f"  {unrouted.sum()} articles mention none of the queried companies, skipped")
+        routed = routed.loc[~unrouted].copy()
+        routed['company'] = routed['ticket'].map(self.companies)
+        return routed.reset_index(drop=True)
+
+
+def load_names(connection_factory=None, tickers: list = None) -> dict:
+    """
+    Returns {name: set of tickers} for the given tickers (default: the whole universe) from the
+    configured company names and aliases plus bronze.auxiliary_table_tck_name when reachable.
+    A name shared by several tickers (e.g. share classes) routes to all of them.
+    """
+    tickers = set(UNIVERSE if tickers is None else tickers)
+    names = {}
+    if connection_factory is not None:
+        try:
+            with connection_factory() as connection:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT upper(ticket), company FROM bronze.auxiliary_table_tck_name")
+                    for ticker, company in cursor.fetchall():
+                        if ticker in tickers and company:
+                            names.setdefault(company, set()).add(ticker)
+        except Exception as e:
+            print(f"Could not load company names from bronze.auxiliary_table_tck_name: {e}")
+
+    for ticker in tickers:
+        if ticker in UNIVERSE:
+            names.setdefault(UNIVERSE[ticker], set()).add(ticker)
+        for alias in ALIASES.get(ticker, []):
+            names.setdefault(alias, set()).add(ticker)
+    return names
+
+
+def build_router(companies: list, connection_factory=None) -> TickerRouter:
+    """
+    Builds the router for the companies being fetched (names from config.UNIVERSE).
+    Raises ValueError when none of them is in the universe: no article could be routed.
+    """
+    tickers = {ticker: company for ticker, company in UNIVERSE.items() if company in companies}
+    if not tickers:
+        raise ValueError("None of the companies is in config.UNIVERSE, fan-in articles can't be routed to tickers")
+    unknown = sorted(set(companies) - set(tickers.values()))
+    if unknown:
+        print(f"Companies not in config.UNIVERSE, their articles won't be routed: {', '.join(unknown)}")
+    return TickerRouter(load_names(connection_factory, list(tickers)), tickers)
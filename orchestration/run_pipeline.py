@@ -0,0 +1,198 @@
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Pipeline DAG:
+#
+#   stocks ──────────────┐
+#   insider_transactions ├──> dbt (Silver + Gold downstream of the bronze tables that changed)
+#   news_sentiment ──────┘
+#
+# Sources are independent and run in parallel, each in its own process with its own run
+# metrics; dbt starts once all of them finished and only builds the models fed by a source
+# that inserted new bronze rows. Wall time ~ slowest source + transform.
+ROOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+GET_DATA_DIR = os.path.join(ROOT_DIR, 'get_data')
+DBT_PROJECT_DIR = os.path.join(ROOT_DIR, 'dbt_process', 'newsdata')
+sys.path.append(GET_DATA_DIR)
+
+from config import UNIVERSE
+from metrics import counter_total, increment, run_metrics, span
+import metrics
+
+# Source task -> bronze table it loads and the dbt selector of everything built from it
+SOURCES = {
+    'stocks': {'table': 'bronze.stocks', 'dbt_select': 'source:bronze.stocks+'},
+    'insider_transactions': {'table': 'bronze.insider_transactions', 'dbt_select': 'source:bronze.insider_transactions+'},
+    'news_sentiment': {'table': 'bronze.news', 'dbt_select': 'source:bronze.news+'},
+}
+
+DBT_TARGET = os.getenv('DBT_TARGET')
+
+
+def _run_stocks(tickers: list, options: dict):
+    from stocks import get_multiple_stocks
+    get_multiple_stocks(tickers, period=options.get('period', '1d'), save_to_db=True, incremental=True)
+
+
+def _run_insider(tickers: list, options: dict):
+    from insider_transactions import get_insider_transactions
+    get_insider_transactions(tickers, save_to_db=True)
+
+
+def _run_news(tickers: list, options: dict):
+    import news_sentiment_integrated
+    news_sentiment_integrated.companies = [UNIVERSE[ticker] for ticker in tickers]
+    if not news_sentiment_integrated.main(
+        async_mode=options.get('news_async', False),
+        fan_in=options.get('news_fan_in') or news_sentiment_integrated.NEWS_FETCH_MODE == 'fan_in'
+    ):
+        raise RuntimeError("database connection check failed")
+
+
+SOURCE_TASKS = {
+    'stocks': _run_stocks,
+    'insider_transactions': _run_insider,
+    'news_sentiment': _run_news,
+}
+
+
+def _raise_on_write_failures():
+    """
+    The scripts catch their bronze write errors (and keep a CSV backup), counting them as
+    write_failures; a source with any of them must not report success
+    """
+    failures = counter_total(metrics.run_report(), 'write_failures')
+    if failures:
+        raise RuntimeError(f"{failures:.0f} bronze write(s) failed")
+
+
+def run_source(name: str, tickers: list, options: dict) -> dict:
+    """
+    Runs one source task under its own run metrics (child process entry point).
+    Errors are reported in the returned run report instead of raised, so rows a failed
+    source already committed still trigger their dbt models.
+    """
+    try:
+        with run_metrics(name):
+            SOURCE_TASKS[name](tickers, options)
+            _raise_on_write_failures()
+    except Exception as e:
+        print(f"ERROR - {name} failed: {e}")
+    return metrics.last_report
+
+
+def run_sources(names: list, tickers: list, options: dict) -> dict:
+    """
+    Runs the source tasks in parallel processes; returns {name: run report or None if the process died}
+    """
+    reports = {}
+    # spawn: children start clean instead of inheriting the parent's threads and connections
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=len(names), mp_context=context) as executor:
+        futures = {executor.submit(run_source, name, tickers, options): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                reports[name] = future.result()
+            except Exception as e:
+                print(f"ERROR - {name} process crashed: {e}")
+                reports[name] = None
+    return reports
+
+
+def changed_sources(reports: dict) -> list:
+    """
+    Sources whose run inserted at least one new bronze row
+    """
+    return [
+        name for name, report in reports.items()
+        if report is not None and counter_total(report, 'rows_inserted') > 0
+    ]
+
+
+def run_dbt(selectors: list, target: str = DBT_TARGET, full_refresh: bool = False, command: str = 'run') -> int:
+    """
+    Runs dbt for the given selectors from the dbt project folder; returns the exit code
+    """
+    args = ['dbt', command, '--select', *selectors]
+    if target:
+        args += ['--target', target]
+    if full_refresh:
+        args.append('--full-refresh')
+    print(f"\nRunning: {' '.join(args)}")
+    return subprocess.run(args, cwd=DBT_PROJECT_DIR).returncode
+
+
+def _print_summary(reports: dict):
+    print(f"\n{'='*60}")
+    print(f"{'source':<24}{'status':<10}{'inserted':>10}{'skipped':>10}{'seconds':>10}")
+    for name, report in sorted(reports.items()):
+        if report is None:
+            print(f"{name:<24}{'crashed':<10}")
+            continue
+        print(f"{name:<24}{report['status']:<10}"
+              f"{counter_total(report, 'rows_inserted'):>10.0f}"
+              f"{counter_total(report, 'rows_skipped'):>10.0f}"
+              f"{report['duration_seconds']:>10.1f}")
+
+
+def main(sources: list, tickers: list, options: dict, skip_dbt: bool = False, dbt_command: str = 'run',
+         target: str = DBT_TARGET, full_refresh: bool = False) -> bool:
+    """
+    Runs the pipeline DAG; returns True if every source and the dbt step succeeded
+    """
+    print(f"Running {', '.join(sources)} for {len(tickers)} tickers in parallel...")
+    with span('sources'):
+        reports = run_sources(sources, tickers, options)
+    _print_summary(reports)
+
+    ok = all(report is not None and report['status'] == 'success' for report in reports.values())
+    if skip_dbt:
+        return ok
+
+    changed = list(SOURCES) if full_refresh else changed_sources(reports)
+    if not changed:
+        print("\nNo new bronze rows: dbt is skipped")
+        return ok
+
+    with span('dbt', command=dbt_command):
+        return_code = run_dbt([SOURCES[name]['dbt_select'] for name in changed], target, full_refresh, dbt_command)
+    if return_code != 0:
+        increment('dbt_failures')
+        print(f"ERROR - dbt exited with code {return_code}")
+    return ok and return_code == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Runs the ingestion sources in parallel, then the dbt models fed by the ones that changed")
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES), help="Sources to run (default: all)")
+    parser.add_argument('--tickers', nargs='+', help="Subset of the configured universe (default: all of it)")
+    parser.add_argument('--period', default='1d', help="yfinance period for tickers without stored prices")
+    parser.add_argument('--news-async', action='store_true', help="Run the news source with concurrent stages")
+    parser.add_argument('--news-fan-in', action='store_true', help="Fetch news with OR-queries over many companies, routed to tickers locally")
+    parser.add_argument('--skip-dbt', action='store_true', help="Only load the bronze tables")
+    parser.add_argument('--dbt-command', choices=['run', 'build'], default='run', help="'build' also runs the dbt tests")
+    parser.add_argument('--target', default=DBT_TARGET, help="dbt target (default: the profile's default)")
+    parser.add_argument('--full-refresh', action='store_true', help="Rebuild every Silver/Gold model from scratch")
+    args = parser.parse_args()
+
+    tickers = [ticker.upper() for ticker in args.tickers] if args.tickers else list(UNIVERSE)
+    unknown = [ticker for ticker in tickers if ticker not in UNIVERSE]
+    if unknown:
+        parser.error(f"Tickers not in the configured universe: {', '.join(unknown)}")
+
+    with run_metrics('pipeline'):
+        success = main(
+            args.sources,
+            tickers,
+            {'period': args.period, 'news_async': args.news_async, 'news_fan_in': args.news_fan_in},
+            skip_dbt=args.skip_dbt,
+            dbt_command=args.dbt_command,
+            target=args.target,
+            full_refresh=args.full_refresh
+        )
+    sys.exit(0 if success else 1)
@@ -0,0 +1,179 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+for module in ('pandas', 'numpy', 'requests', 'dotenv', 'groq', 'psycopg2'):
+    pytest.importorskip(module)
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'get_data'))
+# The Groq client refuses to build without a key; no request is sent in these tests
+os.environ.setdefault('API_GROQ', 'test-key')
+
+import news_sentiment_integrated as news
+from rate_limiter import QuotaExceededError
+
+
+def reply(content, finish_reason='stop'):
+    return SimpleNamespace(choices=[SimpleNamespace(finish_reason=finish_reason,
+                                                    message=SimpleNamespace(content=content))])
+
+
+def batch_reply(labels):
+    items = ", ".join(f'{{"i": {i}, "label": "{label}"}}' for i, label in enumerate(labels))
+    return reply(f'{{"labels": [{items}]}}')
+
+
+class FakeCompletion:
+    """
+    Stands in for _chat_completion: answers each prompt with `respond(prompt, headlines)`
+    and counts the calls
+    """
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.calls = 0
+
+    def __call__(self, prompt, **kwargs):
+        self.calls += 1
+        if 'Headlines:' in prompt:
+            headlines = prompt.split('Headlines:\n', 1)[1].splitlines()
+        else:
+            headlines = [prompt]
+        return self.respond(prompt, headlines)
+
+
+# --- _parse_batch_labels ---
+
+def test_parse_batch_labels_orders_by_index():
+    content = '```json\n{"labels": [{"i": 1, "label": "Bad"}, {"i": 0, "label": " good "}]}\n```'
+    assert news._parse_batch_labels(content, 2) == ['good', 'bad']
+
+
+@pytest.mark.parametrize('content', [
+    '{"labels": [{"i": 0, "label": "good"}]}',                                                  # missing index
+    '{"labels": [{"i": 0, "label": "good"}, {"i": 0, "label": "bad"}]}',                        # duplicate index
+    '{"labels": [{"i": 0, "label": "good"}, {"i": 2, "label": "bad"}]}',                        # out of range
+    '{"labels": [{"i": -1, "label": "good"}, {"i": 0, "label": "bad"}]}',                       # negative index
+    '{"labels": [{"i": "0", "label": "good"}, {"i": 1, "label": "bad"}]}',                      # index not an int
+    '{"labels": [{"i": 0, "label": "good"}, {"i": 1, "label": "positive"}]}',                   # invalid label
+    '{"labels": [{"i": 0, "label": "good"}, {"i": 1}]}',                                        # missing label
+    '{"labels": [{"i": 0, "label": "good"}, {"i": 1, "label": "bad"}',                          # truncated JSON
+    '{"labels": "good, bad"}',
+    'good, bad',
+    '',
+    None,
+])
+def test_parse_batch_labels_rejects_invalid_replies(content):
+    assert news._parse_batch_labels(content, 2) is None
+
+
+# --- analyze_news_sentiment_batch ---
+
+def test_valid_batch_uses_one_call(monkeypatch):
+    fake = FakeCompletion(lambda prompt, headlines: batch_reply(['good'] * len(headlines)))
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    assert news.analyze_news_sentiment_batch([f"h{i}" for i in range(20)], batch_size=20) == ['good'] * 20
+    assert fake.calls == 1
+
+
+def test_malformed_reply_is_split(monkeypatch):
+    # Batches of more than 5 headlines get a reply with a label missing
+    def respond(prompt, headlines):
+        if len(headlines) > 5:
+            return batch_reply(['bad'] * (len(headlines) - 1))
+        return batch_reply(['bad'] * len(headlines))
+
+    fake = FakeCompletion(respond)
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    assert news.analyze_news_sentiment_batch([f"h{i}" for i in range(20)], batch_size=20) == ['bad'] * 20
+    # 20 -> 10 + 10 -> 4 x 5
+    assert fake.calls == 7
+
+
+def test_truncated_reply_is_split(monkeypatch):
+    def respond(prompt, headlines):
+        if len(headlines) > 1:
+            return reply('{"labels": [{"i": 0, "label": "good"}', finish_reason='length')
+        return reply('neutral')
+
+    fake = FakeCompletion(respond)
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    assert news.analyze_news_sentiment_batch(["a", "b"], batch_size=2, fallback=None) == ['neutral', 'neutral']
+    assert fake.calls == 3
+
+
+def test_api_error_fails_the_batch_without_splitting(monkeypatch):
+    def respond(prompt, headlines):
+        raise ConnectionError("503 Service Unavailable")
+
+    fake = FakeCompletion(respond)
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    labels = news.analyze_news_sentiment_batch([f"h{i}" for i in range(40)], batch_size=20, fallback=None)
+    assert labels == [None] * 40
+    # One call per batch, no halving
+    assert fake.calls == 2
+
+
+def test_api_error_after_a_split_keeps_the_labels_already_classified(monkeypatch):
+    def respond(prompt, headlines):
+        if fake.calls == 1:
+            return reply('not json')
+        if fake.calls == 2:
+            return batch_reply(['good'] * len(headlines))
+        raise ConnectionError("timeout")
+
+    fake = FakeCompletion(respond)
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    labels = news.analyze_news_sentiment_batch(["a", "b", "c", "d"], batch_size=4, fallback=None)
+    assert labels == ['good', 'good', None, None]
+    assert fake.calls == 3
+
+
+def test_exhausted_quota_stops_the_classification(monkeypatch):
+    def respond(prompt, headlines):
+        if fake.calls == 1:
+            return batch_reply(['bad'] * len(headlines))
+        raise QuotaExceededError("groq: daily cap of 1000 requests reached")
+
+    fake = FakeCompletion(respond)
+    monkeypatch.setattr(news, '_chat_completion', fake)
+    labels = news.analyze_news_sentiment_batch([f"h{i}" for i in range(10)], batch_size=2)
+    assert labels == ['bad', 'bad'] + ['neutral'] * 8
+    assert fake.calls == 2
+
+
+# --- NewsAPI pagination ---
+
+def test_pages_stop_at_the_plan_results_limit(monkeypatch):
+    requested = []
+
+    def fetch_page(url, query, api_key, page=1, page_size=100):
+        requested.append((page, page_size))
+        articles = news.pd.DataFrame({
+            'url': [f"https://x/{page}/{i}" for i in range(page_size)], 'company': query, 'ticket': None,
+            'publishedAt': '2024-06-03T12:00:00Z', 'title': 't', 'description': 'd', 'content': None,
+        })
+        return articles, 450
+
+    monkeypatch.setattr(news, '_fetch_news_page', fetch_page)
+    pages = list(news.iter_news_pages('url', 'Apple', 'key', page_size=100, max_pages=5, max_results=100))
+    assert len(pages) == 1
+    assert requested == [(1, 100)]
+
+
+def test_pages_follow_the_total_results_within_the_limit(monkeypatch):
+    requested = []
+
+    def fetch_page(url, query, api_key, page=1, page_size=100):
+        requested.append(page)
+        articles = news.pd.DataFrame({
+            'url': ['https://x'], 'company': query, 'ticket': None,
+            'publishedAt': '2024-06-03T12:00:00Z', 'title': 't', 'description': 'd', 'content': None,
+        })
+        return articles, 120
+
+    monkeypatch.setattr(news, '_fetch_news_page', fetch_page)
+    list(news.iter_news_pages('url', 'Apple', 'key', page_size=50, max_pages=5, max_results=500))
+    assert requested == [1, 2, 3]
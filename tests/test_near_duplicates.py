@@ -0,0 +1,67 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'get_data'))
+
+import near_duplicates
+from near_duplicates import NearDuplicateIndex
+
+TITLE = "Nvidia shares climb after record data center revenue beats analyst expectations"
+DESCRIPTION = ("The chipmaker reported quarterly data center sales well above estimates and raised its "
+               "outlook for the coming quarter as demand for artificial intelligence accelerators keeps growing")
+# Same story from another outlet: one word of the title reworded
+REWORDED_TITLE = "Nvidia shares jump after record data center revenue beats analyst expectations"
+OTHER_TITLE = "Netflix adds fewer subscribers than expected as competition from rival streaming services intensifies"
+OTHER_DESCRIPTION = "The streaming company said price increases in several markets slowed growth during the quarter"
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(path=str(tmp_path / 'index.sqlite3'), threshold=0.7, window_hours=72)
+    yield index
+    index.close()
+
+
+def test_reworded_copy_joins_the_cluster(index):
+    clusters = index.assign(['a', 'b', 'c'], [TITLE, REWORDED_TITLE, OTHER_TITLE],
+                            [DESCRIPTION, DESCRIPTION, OTHER_DESCRIPTION],
+                            ['2024-06-03T12:00:00Z', '2024-06-03T15:00:00Z', '2024-06-03T16:00:00Z'])
+    assert clusters == ['a', 'a', 'c']
+    assert index.stats == {'articles': 3, 'duplicates': 1}
+
+
+def test_known_articles_keep_their_cluster_across_runs(index):
+    index.assign(['a'], [TITLE], [DESCRIPTION], ['2024-06-03T12:00:00Z'])
+    index.set_labels([('a', 'good', 0.9)])
+    assert index.assign(['a', 'b'], [TITLE, REWORDED_TITLE], [DESCRIPTION, DESCRIPTION],
+                        ['2024-06-03T12:00:00Z', '2024-06-04T09:00:00Z']) == ['a', 'a']
+    assert index.labels(['a']) == {'a': ('good', 0.9)}
+
+
+def test_copy_outside_the_time_window_starts_a_new_cluster(index):
+    clusters = index.assign(['a', 'b'], [TITLE, TITLE], [DESCRIPTION, DESCRIPTION],
+                            ['2024-06-03T12:00:00Z', '2024-06-10T12:00:00Z'])
+    assert clusters == ['a', 'b']
+
+
+def test_evict_drops_old_articles_and_orphaned_clusters(index, monkeypatch):
+    clock = [1_700_000_000.0]
+    monkeypatch.setattr(near_duplicates, 'time', SimpleNamespace(time=lambda: clock[0]))
+
+    index.assign(['a'], [TITLE], [DESCRIPTION], ['2024-06-03T12:00:00Z'])
+    index.set_labels([('a', 'good', 0.9)])
+    clock[0] += 31 * 86400
+    index.assign(['c'], [OTHER_TITLE], [OTHER_DESCRIPTION], ['2024-07-04T12:00:00Z'])
+    index.set_labels([('c', 'bad', 0.8)])
+
+    index.evict()
+    assert index.labels(['a', 'c']) == {'c': ('bad', 0.8)}
+    # The evicted article is indexed again as a new story, the recent one is still known
+    assert index.assign(['b', 'c'], [REWORDED_TITLE, OTHER_TITLE], [DESCRIPTION, OTHER_DESCRIPTION],
+                        ['2024-06-03T15:00:00Z', '2024-07-04T12:00:00Z']) == ['b', 'c']
@@ -0,0 +1,104 @@
+import hashlib
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+np = pytest.importorskip('numpy')
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'get_data'))
+
+from row_prep import hash_columns, prepare_stock_rows, prepare_news_rows, prepare_insider_rows
+
+# Hashes are primary keys of the bronze tables: the columnar preparation must produce exactly
+# the keys of the per-row loops it replaced (DataFrame.iterrows + each script's generate_hash).
+
+
+def _md5(*values) -> str:
+    return hashlib.md5("_".join(f"{value}" for value in values).encode()).hexdigest()
+
+
+def legacy_stock_hashes(df):
+    return [_md5(row['Ticket'], str(row['Date'])) for _, row in df.iterrows()]
+
+
+def legacy_news_hashes(df):
+    return [_md5(row['company'], row['title'], str(row['publishedAt'])) for _, row in df.iterrows()]
+
+
+def legacy_insider_hashes(df):
+    return [_md5(row['symbol'], row['name'], row['transactionDate'], row['change'], row['share'])
+            for _, row in df.iterrows()]
+
+
+def stock_frame():
+    return pd.DataFrame({
+        'Ticket': ['AAPL', 'AAPL', 'MSFT'],
+        'Date': pd.to_datetime(['2024-06-03', '2024-06-04', '2024-06-04']).tz_localize('America/New_York'),
+        'Close': [194.03, np.nan, 416.07],
+        'High': [194.99, 195.32, np.nan],
+        'Low': [192.52, 193.03, 409.51],
+        'Open': [192.9, 194.64, 412.43],
+        'Volume': [50080500.0, np.nan, 16960000.0],
+    })
+
+
+def news_frame():
+    return pd.DataFrame({
+        'company': ['Apple', 'Apple', 'Microsoft', 'Microsoft'],
+        'title': ['Apple unveils "Vision" – 2.0', None, np.nan, 'Azure growth 31.5%'],
+        'description': ['desc', None, 'desc', np.nan],
+        'url': ['https://a', 'https://b', 'https://c', None],
+        'publishedAt': ['2024-06-03T12:00:00Z', '2024-06-03T13:30:00Z', None, '2024-06-04T08:15:00Z'],
+        'sentiment': ['positive', 'neutral', 'neutral', 'positive'],
+    })
+
+
+def insider_frame():
+    return pd.DataFrame({
+        'symbol': ['AAPL', 'AAPL', 'MSFT', 'MSFT'],
+        'name': ['COOK TIMOTHY D', None, 'NADELLA SATYA', 'SMITH BRAD'],
+        'share': [3280180, 1500.0, np.nan, 0],
+        'change': [-59162, np.nan, 2500.5, 0],
+        'filingDate': ['2024-04-03', None, '2024-05-01', 'not a date'],
+        'transactionDate': ['2024-04-01', '2024-04-02', None, '2024-05-02'],
+        'transactionPrice': [169.38, np.nan, 0.0, 411.1],
+        'transactionCode': ['S', 'M', None, 'G'],
+    })
+
+
+@pytest.mark.parametrize('frame', [stock_frame, news_frame, insider_frame])
+def test_hash_columns_matches_fstring_of_each_value(frame):
+    df = frame()
+    expected = [_md5(*row) for row in df.itertuples(index=False, name=None)]
+    assert hash_columns(*(df[column] for column in df.columns)).tolist() == expected
+
+
+def test_prepare_stock_rows_hashes_match_per_row_loop():
+    df = stock_frame()
+    rows = prepare_stock_rows(df)
+    assert rows['hash'].tolist() == legacy_stock_hashes(df)
+    assert rows['Volume'].isna().tolist() == [False, True, False]
+
+
+def test_prepare_news_rows_hashes_match_per_row_loop():
+    df = news_frame()
+    rows = prepare_news_rows(df)
+    assert rows['hash'].tolist() == legacy_news_hashes(df)
+    assert 'ticket' not in rows.columns
+
+
+def test_prepare_news_rows_keeps_recorded_columns():
+    df = news_frame().assign(ticket='AAPL', sentiment_tier='llm', sentiment_confidence=0.9, cluster_id='c1')
+    rows = prepare_news_rows(df)
+    assert rows['hash'].tolist() == legacy_news_hashes(df)
+    assert rows['ticket'].tolist() == ['AAPL'] * len(df)
+
+
+def test_prepare_insider_rows_hashes_match_per_row_loop():
+    df = insider_frame()
+    rows = prepare_insider_rows(df)
+    assert rows['hash'].tolist() == legacy_insider_hashes(df)
+    assert rows['transaction_date'].isna().tolist() == [False, False, True, False]
+    assert rows['filing_date'].isna().tolist() == [False, True, False, True]
@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'get_data'))
+
+import ticker_router
+from ticker_router import TickerRouter, build_query_batches, build_router, load_names
+
+COMPANIES = {'BAC': 'Bank of America', 'AAL': 'American Airlines', 'META': 'Meta',
+             'GOOGL': 'Alphabet', 'GOOG': 'Alphabet'}
+
+
+def make_router():
+    names = {
+        'Bank of America': {'BAC'},
+        'America': {'AAL'},
+        'American Airlines': {'AAL'},
+        'Meta': {'META'},
+        'Facebook': {'META'},
+        'Alphabet': {'GOOGL', 'GOOG'},
+        'Google': {'GOOGL', 'GOOG'},
+    }
+    return TickerRouter(names, COMPANIES)
+
+
+# --- TickerRouter ---
+
+def test_route_finds_overlapping_names():
+    # 'Bank of America' contains 'America': both names match in one pass
+    assert make_router().route("Bank of America cuts its forecast") == ['AAL', 'BAC']
+
+
+def test_route_matches_whole_words_only():
+    router = make_router()
+    assert router.route("New metadata standard for Americans") == []
+    assert router.route("META: shares jump", None) == ['META']
+    assert router.route("Shares of Facebook-owner rise") == ['META']
+
+
+def test_route_is_case_insensitive_across_parts():
+    assert make_router().route("Earnings", "GOOGLE beats estimates", float('nan')) == ['GOOG', 'GOOGL']
+
+
+def test_route_articles_explodes_multi_ticker_articles_and_drops_unrouted():
+    df = pd.DataFrame({
+        'title': ['Meta and Alphabet race on AI', 'Weather report', 'Bank of America earnings'],
+        'description': [None, 'Sunny', None],
+        'content': [None, None, None],
+        'url': ['u1', 'u2', 'u3'],
+    })
+    routed = make_router().route_articles(df)
+    assert routed[['url', 'ticket']].values.tolist() == [
+        ['u1', 'GOOG'], ['u1', 'GOOGL'], ['u1', 'META'], ['u3', 'AAL'], ['u3', 'BAC'],
+    ]
+    assert routed['company'].tolist() == ['Alphabet', 'Alphabet', 'Meta', 'American Airlines', 'Bank of America']
+
+
+# --- load_names / build_router ---
+
+def test_load_names_keeps_every_ticker_of_a_shared_name(monkeypatch):
+    monkeypatch.setattr(ticker_router, 'UNIVERSE', {'GOOGL': 'Alphabet', 'GOOG': 'Alphabet'})
+    monkeypatch.setattr(ticker_router, 'ALIASES', {'GOOGL': ['Google'], 'GOOG': ['Google']})
+    assert load_names() == {'Alphabet': {'GOOGL', 'GOOG'}, 'Google': {'GOOGL', 'GOOG'}}
+
+
+def test_load_names_of_no_tickers_is_empty(monkeypatch):
+    monkeypatch.setattr(ticker_router, 'UNIVERSE', {'META': 'Meta'})
+    assert load_names(tickers=[]) == {}
+
+
+def test_build_router_rejects_companies_outside_the_universe(monkeypatch):
+    monkeypatch.setattr(ticker_router, 'UNIVERSE', {'META': 'Meta'})
+    with pytest.raises(ValueError):
+        build_router(['Unknown Corp'])
+    assert build_router(['Meta', 'Unknown Corp']).route("Meta unveils glasses") == ['META']
+
+
+# --- build_query_batches ---
+
+def test_query_batches_fit_the_length_limit_and_keep_every_company():
+    companies = [f"Company number {i}" for i in range(100)]
+    batches = build_query_batches(companies, max_length=500)
+    assert len(batches) > 1
+    assert all(len(batch) <= 500 for batch in batches)
+    assert [term.strip('"') for batch in batches for term in batch.split(' OR ')] == companies
+
+
+def test_query_batches_quote_names_and_skip_the_ones_too_long():
+    batches = build_query_batches(['Say "Hi" Inc', 'x' * 600, 'Meta'], max_length=500)
+    assert batches == ['"Say Hi Inc" OR "Meta"']